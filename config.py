@@ -1,7 +1,33 @@
 import os
-from cranio.model import DistractorType
+from cranio.model import DistractorType, MeasurementStorage
+from cranio.producer import TransportType
+
+
+def getenv_bool(name: str, default: bool = False) -> bool:
+    """
+    Read a boolean flag from an environment variable. "1", "true" and "yes" (case-insensitive) are true,
+    other values are false.
+
+    :param name: Environment variable name
+    :param default: Value if the variable is not set
+    :return:
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes')
 
 
 class Config:
     DEFAULT_DISTRACTOR = os.getenv('CRANIO_DEFAULT_DISTRACTOR', DistractorType.KLS_RED)
-    ENABLE_DUMMY_SENSOR = os.getenv('CRANIO_ENABLE_DUMMY_SENSOR', False)
+    ENABLE_DUMMY_SENSOR = getenv_bool('CRANIO_ENABLE_DUMMY_SENSOR')
+    PRODUCER_TRANSPORT = os.getenv('CRANIO_PRODUCER_TRANSPORT', TransportType.QUEUE)
+    # Read each sensor in its own thread
+    CONCURRENT_SENSOR_READS = getenv_bool('CRANIO_CONCURRENT_SENSOR_READS')
+    # Read the sensors in an asyncio event loop (see AsyncProducerProcess)
+    ASYNC_SENSOR_READS = getenv_bool('CRANIO_ASYNC_SENSOR_READS')
+    MEASUREMENT_STORAGE = os.getenv(
+        'CRANIO_MEASUREMENT_STORAGE', MeasurementStorage.ROWS
+    )
+    # Number of display value requests in flight when reading the Imada sensor
+    IMADA_PIPELINE_DEPTH = int(os.getenv('CRANIO_IMADA_PIPELINE_DEPTH', 1))
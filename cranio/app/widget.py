@@ -1,12 +1,16 @@
 """
 GUI widgets.
 """
+import math
+import time
 import pyqtgraph as pg
+import numpy as np
 import pandas as pd
 from enum import Enum
-from typing import Tuple, List, Iterable, Union
+from collections import namedtuple
+from typing import Tuple, List, Iterable, Union, Dict, Callable
 from functools import partial
-from PyQt5 import QtCore
+from PyQt5 import QtCore, QtGui
 from PyQt5.QtWidgets import (
     QLineEdit,
     QInputDialog,
@@ -34,12 +38,14 @@ from cranio.model import (
     session_scope,
     Patient,
     EventType,
-    Measurement,
     Session,
     Database,
 )
-from cranio.utils import logger
-from cranio.producer import get_all_from_queue, datetime_to_seconds
+from cranio.utils import logger, RingBuffer
+from cranio.producer import TIME_FIELD
+from cranio.writer import MeasurementWriter
+from cranio.lod import MinMaxPyramid
+from cranio.series_index import SeriesIndex, RegionStats
 
 # Plot style settings
 pg.setConfigOption('background', 'w')
@@ -62,6 +68,40 @@ def filter_last_n_seconds(x_arr, n: float):
         yield x >= (last - n)
 
 
+def window_last_n_seconds(x_arr: np.ndarray, n: float) -> Tuple[int, int]:
+    """
+    Return slice bounds of the x values that are within n seconds of the last x value.
+
+    :param x_arr: Monotonically increasing x values
+    :param n: Window length in seconds
+    :return: Slice bounds (start, stop) as a tuple
+    """
+    stop = len(x_arr)
+    if stop == 0:
+        return 0, 0
+    return int(np.searchsorted(x_arr, x_arr[-1] - n, side='left')), stop
+
+
+def window_from_filter(filter_func):
+    """
+    Adapt a filter function to a window function.
+    The filter function takes the x values as input argument and yields a boolean for each x value.
+    The returned window function spans the x values from the first to the last included value.
+
+    :param filter_func: Filter function
+    :return: Window function that returns slice bounds (start, stop) as a tuple
+    """
+
+    def window_func(x_arr: np.ndarray) -> Tuple[int, int]:
+        mask = np.fromiter(filter_func(x_arr), dtype=bool, count=len(x_arr))
+        included = np.flatnonzero(mask)
+        if len(included) == 0:
+            return 0, 0
+        return int(included[0]), int(included[-1]) + 1
+
+    return window_func
+
+
 def remove_widget_from_layout(layout: QLayout, widget: QWidget):
     """
     Remove widget from a layout.
@@ -97,6 +137,144 @@ class PlotMode(Enum):
     APPEND = 'a'
 
 
+# Redraw statistics: number of drawn frames, number of dropped frames (refresh periods missed by frames
+# longer than the frame budget), number of frames skipped while not visible, mean and maximum frame time
+# in seconds and the current redraw interval in seconds
+FrameStats = namedtuple(
+    'FrameStats',
+    [
+        'frames',
+        'dropped_frames',
+        'skipped_frames',
+        'mean_frame_time_s',
+        'max_frame_time_s',
+        'interval_s',
+    ],
+)
+
+
+def display_refresh_rate() -> float:
+    """ Return the refresh rate (Hz) of the primary screen, or 60 Hz if unknown. """
+    screen = QtGui.QGuiApplication.primaryScreen()
+    if screen is None or screen.refreshRate() <= 0:
+        return 60.0
+    return screen.refreshRate()
+
+
+class RedrawScheduler(QtCore.QObject):
+    """
+    Coalesce redraw requests of a widget to the display refresh rate.
+
+    request() may be called as often as data arrives; render() is called at most once per redraw interval.
+    The frame budget is one display refresh period. Frames are not drawn while the widget is hidden or
+    its window is minimized. If drawing takes longer than max_load of the redraw interval (e.g., on a slow
+    computer), the interval is increased so that the GUI thread is left time for data ingestion and
+    user input, and decreased back to the frame budget when drawing is fast again.
+    """
+
+    def __init__(
+        self,
+        widget: QWidget,
+        render: Callable[[], None],
+        refresh_rate_hz: float = None,
+        max_load: float = 0.5,
+        max_interval: float = 0.5,
+    ):
+        """
+
+        :param widget: Widget that is redrawn
+        :param render: Function that draws the widget
+        :param refresh_rate_hz: Redraw rate. None for the display refresh rate.
+        :param max_load: Maximum fraction of the redraw interval spent drawing
+        :param max_interval: Maximum redraw interval in seconds when throttled
+        """
+        super().__init__(widget)
+        if refresh_rate_hz is None:
+            refresh_rate_hz = display_refresh_rate()
+        self.widget = widget
+        self.render = render
+        self.frame_budget = 1 / refresh_rate_hz
+        self.max_load = max_load
+        self.max_interval = max(max_interval, self.frame_budget)
+        self.pending = False
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(QtCore.Qt.PreciseTimer)
+        self.timer.timeout.connect(self.redraw)
+        self.reset()
+
+    def reset(self) -> None:
+        """ Reset the redraw interval and statistics. """
+        self.interval = self.frame_budget
+        self._last_frame = -float('inf')
+        self._frame_time_average = 0.0
+        self._frames = 0
+        self._dropped_frames = 0
+        self._skipped_frames = 0
+        self._frame_time_sum = 0.0
+        self._frame_time_max = 0.0
+
+    def is_visible(self) -> bool:
+        """ Return True if the widget is visible on screen. """
+        return self.widget.isVisible() and not self.widget.window().isMinimized()
+
+    def request(self) -> None:
+        """ Request a redraw. Requests are coalesced until the next frame is due. """
+        self.pending = True
+        if self.timer.isActive():
+            return
+        delay = self._last_frame + self.interval - time.perf_counter()
+        self.timer.start(math.ceil(max(delay, 0) * 1000))
+
+    def redraw(self) -> None:
+        """ Draw the widget if a redraw is pending and the widget is visible. """
+        if not self.pending:
+            return
+        if not self.is_visible():
+            # Stays pending until requested again when visible
+            self._skipped_frames += 1
+            return
+        self.pending = False
+        t_start = time.perf_counter()
+        self.render()
+        t_stop = time.perf_counter()
+        self._last_frame = t_start
+        self._record(t_stop - t_start)
+
+    def _record(self, frame_time: float) -> None:
+        """ Update statistics and adapt the redraw interval to the frame time. """
+        self._frames += 1
+        self._frame_time_sum += frame_time
+        self._frame_time_max = max(self._frame_time_max, frame_time)
+        # Each started frame budget is a refresh period spent on the frame
+        self._dropped_frames += max(0, math.ceil(frame_time / self.frame_budget) - 1)
+        # Exponential moving average smooths out single slow frames
+        if self._frames == 1:
+            self._frame_time_average = frame_time
+        else:
+            self._frame_time_average += 0.2 * (frame_time - self._frame_time_average)
+        # Redraw on whole refresh periods
+        periods = math.ceil(
+            self._frame_time_average / self.max_load / self.frame_budget
+        )
+        self.interval = min(max(periods, 1) * self.frame_budget, self.max_interval)
+
+    def stats(self) -> FrameStats:
+        """
+        Return redraw statistics since the last reset.
+
+        :return: FrameStats
+        """
+        return FrameStats(
+            self._frames,
+            self._dropped_frames,
+            self._skipped_frames,
+            self._frame_time_sum / max(self._frames, 1),
+            self._frame_time_max,
+            self.interval,
+        )
+
+
 class EditWidget(QWidget):
     """ Line edit and label widgets in a horizontal layout. """
 
@@ -449,8 +627,11 @@ class MeasurementWidget(QWidget):
         self.start_button = QPushButton('Start')
         self.distractor_widget = SpinEditWidget('Distractor', parent=self)
         self.stop_button = QPushButton('Stop')
+        # Data is read from the producer process at update_interval and drawn by the redraw scheduler
         self.update_timer = QtCore.QTimer()
         self.update_interval = 0.05  # seconds
+        self.redraw_scheduler = RedrawScheduler(self, self.multiplot_widget.redraw)
+        self.writer = MeasurementWriter(database)
         self.distractor_widget.set_range(1, 10)
         self.init_ui()
 
@@ -489,6 +670,24 @@ class MeasurementWidget(QWidget):
         """
         self.multiplot_widget.plot(df, mode=mode)
 
+    def append(self, data: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        """
+        Append samples to the multiplot widget. The plots are drawn by the redraw scheduler.
+
+        :param data: Dictionary of plot label -> (x array, y array)
+        :return:
+        """
+        self.multiplot_widget.append(data, redraw=False)
+        self.redraw_scheduler.request()
+
+    def frame_stats(self) -> FrameStats:
+        """
+        Return plot redraw statistics (see RedrawScheduler).
+
+        :return: FrameStats
+        """
+        return self.redraw_scheduler.stats()
+
     def add_plot(self, label: str):
         """
         Add a plot to the multiplot widget.
@@ -509,33 +708,23 @@ class MeasurementWidget(QWidget):
 
     def update(self):
         """
-        Read data from the producer process and append to the plot.
+        Read data from the producer process, insert it to the database and append it to the plot.
+        The plot is redrawn separately (see RedrawScheduler).
 
         :return:
         """
-        index_arr, value_dict_arr = get_all_from_queue(self.producer_process.queue)
+        batch = self.producer_process.get_all()
         # No data available
-        if not index_arr:
+        if len(batch) == 0:
             return
-        # Convert UTC+0 datetime to seconds
-        time_arr = datetime_to_seconds(
-            index_arr, self.producer_process.document.started_at
+        time_arr = self.producer_process.seconds_since_document_start(batch[TIME_FIELD])
+        torque_arr = batch['torque (Nm)']
+        # Insert to database in the background
+        self.writer.submit(
+            self.producer_process.document.document_id, time_arr, torque_arr
         )
-        # Create measurements and insert to database
-        measurements = []
-        for time_s, value_dict in zip(time_arr, value_dict_arr):
-            m = Measurement(
-                time_s=time_s,
-                torque_Nm=value_dict['torque (Nm)'],
-                document_id=self.producer_process.document.document_id,
-            )
-            measurements.append(m)
-        self.database.bulk_insert(measurements)
-        # Convert data to DataFrame
-        x, y = zip(*[(float(m.time_s), float(m.torque_Nm)) for m in measurements])
-        df = pd.DataFrame({'torque (Nm)': y}, index=x)
         # Append to plot
-        self.plot(df, mode=PlotMode.APPEND)
+        self.append({'torque (Nm)': (time_arr, torque_arr)})
 
     def clear(self):
         """
@@ -545,6 +734,12 @@ class MeasurementWidget(QWidget):
         """
         self.multiplot_widget.clear()
 
+    def showEvent(self, event):
+        # Draw the data appended while hidden
+        if self.redraw_scheduler.pending:
+            self.redraw_scheduler.request()
+        return super().showEvent(event)
+
     def keyPressEvent(self, event):
         # Increase active distractor when up arrow is pressed
         if event.key() == QtCore.Qt.Key_Up:
@@ -567,17 +762,51 @@ class PlotWidget(pg.PlotWidget):
     # Default plot configuration
     plot_configuration = {'antialias': True, 'pen': pg.mkPen(color_palette[0])}
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, capacity: int = None):
+        """
+
+        :param parent:
+        :param capacity: Maximum number of buffered samples. None for no limit.
+        """
         super(PlotWidget, self).__init__(parent)
-        self.x_arr = []
-        self.y_arr = []
+        self.buffer = RingBuffer(capacity=capacity, columns=2)
+        # Persistent plot item that is updated in place
+        self.curve = self.getPlotItem().plot(**self.plot_configuration)
+        self._x_visible = np.empty(0)
+        self._y_visible = np.empty(0)
+        # True if the plotted data has changed since it was last drawn
+        self.stale = False
         self.init_ui()
-        self.filters = []
+        self.windows = []
 
     def init_ui(self):
         """ Initialize UI elements. """
         self.showGrid(True, True, 0.1)
         self.enable_interaction(False)
+        # Decimate data for display (acquisition is not throttled for the plot)
+        self.getPlotItem().setDownsampling(auto=True, mode='peak')
+        self.getPlotItem().setClipToView(True)
+
+    @property
+    def x_arr(self) -> np.ndarray:
+        """ Plotted x values. """
+        return self._x_visible
+
+    @property
+    def y_arr(self) -> np.ndarray:
+        """ Plotted y values. """
+        return self._y_visible
+
+    @property
+    def capacity(self) -> int:
+        """ Maximum number of buffered samples. None for no limit. """
+        return self.buffer.capacity
+
+    @capacity.setter
+    def capacity(self, value: int):
+        buffer = RingBuffer(capacity=value, columns=2)
+        buffer.extend(*self.buffer.columns)
+        self.buffer = buffer
 
     @property
     def x_label(self):
@@ -617,15 +846,18 @@ class PlotWidget(pg.PlotWidget):
 
         :return:
         """
-        self.x_arr = []
-        self.y_arr = []
-        return self.getPlotItem().clear()
+        self.buffer.clear()
+        self._x_visible = np.empty(0)
+        self._y_visible = np.empty(0)
+        self.stale = False
+        self.curve.setData([], [])
 
     def plot(
         self,
         x: Iterable[float],
         y: Iterable[float],
         mode: PlotMode = PlotMode.OVERWRITE,
+        redraw: bool = True,
     ):
         """
         Plot (x, y) data.
@@ -633,57 +865,145 @@ class PlotWidget(pg.PlotWidget):
         :param x:
         :param y:
         :param mode:
+        :param redraw: Draw the data. If False, the data is drawn on the next redraw().
         :return:
         :raises ValueError: if invalid plot mode argument
         """
         if mode == PlotMode.OVERWRITE:
-            self.x_arr = list(x)
-            self.y_arr = list(y)
-        elif mode == PlotMode.APPEND:
-            self.x_arr += list(x)
-            self.y_arr += list(y)
-        else:
+            self.buffer.clear()
+        elif mode != PlotMode.APPEND:
             raise ValueError('Invalid mode {}'.format(mode))
+        self.buffer.extend(x, y)
         # Apply filters
         self.apply_filters()
-        self.getPlotItem().plot(
-            self.x_arr, self.y_arr, clear=True, **self.plot_configuration
-        )
+        self.stale = True
+        if redraw:
+            self.redraw()
         return self
 
+    def redraw(self):
+        """ Draw the plotted data if it has changed since it was last drawn. """
+        if self.stale:
+            self.stale = False
+            self.update_curve()
+
+    def update_curve(self):
+        """ Draw the plotted data. """
+        # The curve keeps the arrays until the next draw, whereas the buffer is modified in place
+        # by appends in between (see RingBuffer) -> draw copies
+        self.curve.setData(self._x_visible.copy(), self._y_visible.copy())
+
     def apply_filters(self):
         """
-        Apply filters to x and y data in the order the filters were added.
+        Apply windows to x and y data in the order the windows were added.
+        The plotted data are views to the buffer, i.e., no data is copied.
+
+        :return:
+        """
+        x_arr, y_arr = self.buffer.columns
+        start, stop = 0, len(x_arr)
+        for window_func in self.windows:
+            if start == stop:
+                break
+            window_start, window_stop = window_func(x_arr[start:stop])
+            start, stop = start + window_start, start + window_stop
+        self._x_visible, self._y_visible = x_arr[start:stop], y_arr[start:stop]
+
+    def add_window(self, window_func):
+        """
+        Add a window function that limits the plotted data.
 
+        :param window_func: Window function with x values (NumPy array) as input argument.
+            Returns slice bounds (start, stop) as a tuple.
         :return:
         """
-        for filter_func in self.filters:
-            i_arr = [i for i, x in enumerate(list(filter_func(self.x_arr))) if x]
-            self.x_arr = [self.x_arr[i] for i in i_arr]
-            self.y_arr = [self.y_arr[i] for i in i_arr]
+        self.windows.append(window_func)
 
     def add_filter(self, filter_func):
         """
+        Add a filter function that limits the plotted data.
+
+        .. note:: Prefer add_window() as filters are evaluated one x value at a time.
 
         :param filter_func: Filter function with x values as input argument
         :return:
         """
-        self.filters.append(filter_func)
+        self.add_window(window_from_filter(filter_func))
+
+
+class DecimatedPlotWidget(PlotWidget):
+    """
+    Plot widget for long recordings. Only the min/max envelope of the visible x range is drawn with about
+    two points per pixel column (see MinMaxPyramid), and the envelope is refined when zoomed in.
+    """
+
+    def __init__(self, parent=None):
+        self.pyramid = MinMaxPyramid(np.empty(0), np.empty(0))
+        super().__init__(parent)
+        view_box = self.getViewBox()
+        view_box.sigXRangeChanged.connect(self.update_level_of_detail)
+        view_box.sigResized.connect(self.update_level_of_detail)
+
+    def init_ui(self):
+        """ Initialize UI elements. """
+        super().init_ui()
+        # Decimated in update_level_of_detail()
+        self.getPlotItem().setDownsampling(ds=1, auto=False)
+        self.getPlotItem().setClipToView(False)
+
+    def update_curve(self):
+        """ Draw the plotted data. """
+        self.pyramid = MinMaxPyramid(self._x_visible, self._y_visible)
+        self.update_level_of_detail()
+
+    def plot_pyramid(self, pyramid):
+        """
+        Plot a time series from its min/max pyramid without the samples (e.g., DocumentPyramid).
+        The plotted x and y values (x_arr and y_arr) are empty.
+
+        :param pyramid: Object implementing len(), x_range() and window() of MinMaxPyramid
+        :return:
+        """
+        self.buffer.clear()
+        self.apply_filters()
+        self.pyramid = pyramid
+        self.update_level_of_detail()
+        return self
+
+    def update_level_of_detail(self):
+        """ Draw the visible x range at the resolution of the plot. """
+        if len(self.pyramid) == 0:
+            self.curve.setData([], [])
+            return
+        view_box = self.getViewBox()
+        if view_box.autoRangeEnabled()[0]:
+            # Draw everything so that the automatic range fits the data
+            x_start, x_stop = self.pyramid.x_range()
+        else:
+            (x_start, x_stop), _ = view_box.viewRange()
+        max_points = 2 * max(int(view_box.width()), 1)
+        self.curve.setData(*self.pyramid.window(x_start, x_stop, max_points))
 
 
 class RegionEditWidget(QGroupBox):
     """ Widget for editing a LinearRegionItem and editing event meta data. """
 
-    def __init__(self, parent: pg.LinearRegionItem, event_number: int):
+    def __init__(
+        self,
+        parent: pg.LinearRegionItem,
+        event_number: int,
+        series_index: SeriesIndex = None,
+    ):
         """
 
         :param parent:
         :param event_number:
-        :param document: Data parent document
+        :param series_index: Index of the plotted time series for region statistics. None for no statistics.
         """
         super(RegionEditWidget, self).__init__()
         self.parent = parent
         self.event_number = event_number
+        self.series_index = series_index
         # layouts
         self.main_layout = QVBoxLayout()
         self.boundary_layout = QHBoxLayout()
@@ -692,6 +1012,7 @@ class RegionEditWidget(QGroupBox):
         self.recorded_widget = CheckBoxEditWidget('Recorded')
         self.minimum_edit = QDoubleSpinBox()
         self.maximum_edit = QDoubleSpinBox()
+        self.stats_label = QLabel()
         self.remove_button = QPushButton('Remove')
         self.init_ui()
 
@@ -704,6 +1025,7 @@ class RegionEditWidget(QGroupBox):
         self.main_layout.addWidget(self.done_widget)
         self.main_layout.addWidget(self.recorded_widget)
         self.main_layout.addLayout(self.boundary_layout)
+        self.main_layout.addWidget(self.stats_label)
         self.main_layout.addWidget(self.remove_button)
         # Set recorded to True
         self.set_recorded(True)
@@ -725,6 +1047,7 @@ class RegionEditWidget(QGroupBox):
         )
         self.parent.sigRegionChanged.connect(self.region_changed)
         # responsibility for connecting the remove button lies in the RegionWidget
+        self.update_stats()
 
     def is_done(self) -> bool:
         """
@@ -792,7 +1115,7 @@ class RegionEditWidget(QGroupBox):
         """
         # only distraction events are supported
         # NOTE: document_is is left empty (i.e,. None)
-        return AnnotatedEvent(
+        event = AnnotatedEvent(
             event_type=EventType.distraction_event_type().event_type,
             event_num=self.event_number,
             document_id=None,
@@ -801,6 +1124,54 @@ class RegionEditWidget(QGroupBox):
             annotation_done=self.is_done(),
             recorded=self.is_recorded(),
         )
+        stats = self.stats()
+        if stats is not None:
+            # NaN (no samples in the region) is stored as NULL
+            values = [None if np.isnan(v) else float(v) for v in stats]
+            (
+                event.peak_torque_Nm,
+                event.mean_torque_Nm,
+                event.torque_integral_Nms,
+                event.duration_s,
+            ) = values
+        return event
+
+    def stats(self) -> Union[RegionStats, None]:
+        """
+        Return statistics of the plotted time series in the region.
+
+        :return: RegionStats, or None if no series index has been set
+        """
+        if self.series_index is None:
+            return None
+        return self.series_index.stats(*self.region())
+
+    def set_series_index(self, series_index: SeriesIndex):
+        """
+        Set index of the plotted time series for region statistics.
+
+        :param series_index: None for no statistics
+        :return:
+        """
+        self.series_index = series_index
+        self.update_stats()
+
+    def update_stats(self):
+        """
+        Show region statistics.
+
+        :return:
+        """
+        stats = self.stats()
+        if stats is None:
+            self.stats_label.setText('')
+            return
+        self.stats_label.setText(
+            f'Peak: {stats.peak:.2f} Nm\n'
+            f'Mean: {stats.mean:.2f} Nm\n'
+            f'Torque-time: {stats.integral:.2f} Nms\n'
+            f'Duration: {stats.duration:.2f} s'
+        )
 
     def set_region(self, edges: Tuple[float, float]):
         """
@@ -847,6 +1218,7 @@ class RegionEditWidget(QGroupBox):
         new_edges = self.region()
         self.minimum_edit.setValue(min(new_edges))
         self.maximum_edit.setValue(max(new_edges))
+        self.update_stats()
 
 
 class RegionPlotWidget(QWidget):
@@ -854,12 +1226,14 @@ class RegionPlotWidget(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.plot_widget = PlotWidget()
+        self.plot_widget = DecimatedPlotWidget()
         self.main_layout = QHBoxLayout()
         self.edit_layout = QVBoxLayout()
         self.add_layout = QGridLayout()
         # region items mapped as {LinearRegionItem: RegionEditWidget}
         self.region_edit_map = dict()
+        # Index of the plotted time series for region statistics
+        self.series_index = None
         self.add_groupbox = QGroupBox('Add/remove events')
         self.add_count = QSpinBox()
         self.add_button = QPushButton('Add')
@@ -869,6 +1243,8 @@ class RegionPlotWidget(QWidget):
     def init_ui(self):
         """ Initialize UI elements. """
         self.setLayout(self.main_layout)
+        # Zoom and pan in time
+        self.plot_widget.setMouseEnabled(x=True, y=False)
         self.main_layout.addWidget(self.plot_widget)
         self.main_layout.addLayout(self.edit_layout)
         self.add_layout.addWidget(self.add_count, 0, 0)
@@ -900,6 +1276,30 @@ class RegionPlotWidget(QWidget):
         """
         return self.plot_widget.plot(x_arr, y_arr, mode)
 
+    def plot_pyramid(self, pyramid):
+        """
+        Plot a time series from its min/max pyramid (see DecimatedPlotWidget.plot_pyramid()).
+
+        :param pyramid:
+        :return:
+        """
+        return self.plot_widget.plot_pyramid(pyramid)
+
+    def x_range(self) -> Tuple[float, float]:
+        """ Return the first and the last plotted x value. """
+        return self.plot_widget.pyramid.x_range()
+
+    def set_series_index(self, series_index: SeriesIndex):
+        """
+        Set index of the plotted time series for region statistics (see RegionEditWidget).
+
+        :param series_index: None for no statistics
+        :return:
+        """
+        self.series_index = series_index
+        for edit_widget in self.region_edit_map.values():
+            edit_widget.set_series_index(series_index)
+
     def region_count(self) -> int:
         """
         Return number of regions.
@@ -967,7 +1367,7 @@ class RegionPlotWidget(QWidget):
         :return:
         """
         if bounds is None:
-            bounds = [min(self.x_arr), max(self.x_arr)]
+            bounds = list(self.x_range())
         alpha = 125
         color = list(color_palette[len(self.region_edit_map)]) + [alpha]
         item = pg.LinearRegionItem(
@@ -975,7 +1375,9 @@ class RegionPlotWidget(QWidget):
         )
         self.plot_widget.addItem(item)
         # Event numbering by insertion order
-        edit_widget = RegionEditWidget(item, event_number=self.region_count() + 1)
+        edit_widget = RegionEditWidget(
+            item, event_number=self.region_count() + 1, series_index=self.series_index
+        )
         edit_widget.remove_button.clicked.connect(
             partial(self.remove_region, edit_widget)
         )
@@ -1015,12 +1417,12 @@ class RegionPlotWidget(QWidget):
         """
         count = self.get_add_count()
         logger.debug(f'{type(self).__name__} add button clicked (add count={count})')
-        if len(self.x_arr) == 0:
+        if len(self.plot_widget.pyramid) == 0:
             logger.error('Unable to add region to empty plot')
             return 0
         if count > 0:
-            x_min = min(self.x_arr)
-            interval = (max(self.x_arr) - x_min) / count
+            x_min, x_max = self.x_range()
+            interval = (x_max - x_min) / count
             for i in range(count):
                 # insert at uniform intervals
                 low = x_min + i * interval
@@ -1054,6 +1456,8 @@ class VMultiPlotWidget(QWidget):
     def __init__(self, parent=None):
         super(VMultiPlotWidget, self).__init__(parent=parent)
         self.plot_widgets = []
+        # Plot widgets by label for constant time lookup
+        self._plot_widgets_by_label = {}
         self.title_label = QLabel()
         self.main_layout = QVBoxLayout()
         self.init_ui()
@@ -1083,9 +1487,7 @@ class VMultiPlotWidget(QWidget):
         :param label: Plot label, or y-axis name
         :return:
         """
-        for p in self.plot_widgets:
-            if p.y_label == label:
-                return p
+        return self._plot_widgets_by_label.get(label)
 
     def add_plot_widget(self, label: str):
         """
@@ -1095,7 +1497,7 @@ class VMultiPlotWidget(QWidget):
         :return:
         :raises ValueError: if a plot with the specified label already exists
         """
-        from cranio.constants import PLOT_N_SECONDS
+        from cranio.constants import PLOT_N_SECONDS, SAMPLE_RATE_HZ
 
         if self.find_plot_widget_by_label(label) is not None:
             raise ValueError('A plot widget with label {} already exists'.format(label))
@@ -1111,8 +1513,11 @@ class VMultiPlotWidget(QWidget):
         plot_widget.y_label = label
         # Add filter defined by PLOT_N_SECONDS
         if PLOT_N_SECONDS is not None:
-            plot_widget.add_filter(partial(filter_last_n_seconds, n=PLOT_N_SECONDS))
+            # Buffer twice the nominal number of samples to allow for sample rate variation
+            plot_widget.capacity = int(2 * PLOT_N_SECONDS * SAMPLE_RATE_HZ)
+            plot_widget.add_window(partial(window_last_n_seconds, n=PLOT_N_SECONDS))
         self.plot_widgets.append(plot_widget)
+        self._plot_widgets_by_label[label] = plot_widget
         return plot_widget
 
     def plot(
@@ -1130,18 +1535,41 @@ class VMultiPlotWidget(QWidget):
         # The DataFrame is appended during recording
         # The real-time plot is updated at specified intervals
         self.title = title
-        # Find already initialized columns
-        initialized_columns = [p.y_label for p in self.plot_widgets if p.y_label in df]
-        # Leftover columns need to be initialized
-        non_initialized_columns = filter(
-            lambda c: c not in initialized_columns, df.columns
-        )
-        for c in non_initialized_columns:
-            self.add_plot_widget(c)
-        # Plot each column
+        x_arr = np.asarray(df.index)
         for c in df:
-            plot_widget = self.find_plot_widget_by_label(c)
-            plot_widget.plot(x=df.index, y=df[c], mode=mode)
+            self.get_or_add_plot_widget(c).plot(x=x_arr, y=df[c].values, mode=mode)
+
+    def append(
+        self, data: Dict[str, Tuple[np.ndarray, np.ndarray]], redraw: bool = True
+    ):
+        """
+        Append samples to the plots. Plots are added for new labels.
+
+        :param data: Dictionary of plot label -> (x array, y array)
+        :param redraw: Draw the plots. If False, the plots are drawn on the next redraw().
+        :return:
+        """
+        for label, (x_arr, y_arr) in data.items():
+            self.get_or_add_plot_widget(label).plot(
+                x=x_arr, y=y_arr, mode=PlotMode.APPEND, redraw=redraw
+            )
+
+    def redraw(self):
+        """ Draw the plots that have changed since they were last drawn. """
+        for p in self.plot_widgets:
+            p.redraw()
+
+    def get_or_add_plot_widget(self, label: str):
+        """
+        Return plot widget by label. The plot is added if it does not exist.
+
+        :param label: Plot label, or y-axis name
+        :return:
+        """
+        plot_widget = self._plot_widgets_by_label.get(label)
+        if plot_widget is None:
+            plot_widget = self.add_plot_widget(label)
+        return plot_widget
 
     def clear(self):
         """
@@ -1161,3 +1589,4 @@ class VMultiPlotWidget(QWidget):
         for p in self.plot_widgets:
             remove_widget_from_layout(self.main_layout, p)
         self.plot_widgets = []
+        self._plot_widgets_by_label = {}
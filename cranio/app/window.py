@@ -12,7 +12,8 @@ from PyQt5.QtWidgets import (
     QPushButton,
 )
 from cranio.producer import ProducerProcess, create_dummy_sensor
-from cranio.imada import Imada
+from cranio.imada import Imada, AsyncImada
+from cranio.async_producer import create_dummy_async_sensor
 from cranio.model import AnnotatedEvent, Database
 from cranio.app.widget import (
     PatientWidget,
@@ -24,6 +25,7 @@ from cranio.app.widget import (
     SessionWidget,
 )
 from cranio.utils import logger
+from config import Config
 
 
 def create_document():
@@ -102,6 +104,14 @@ class RegionPlotWindow(QDialog):
         """ Overload method. """
         return self.region_plot_widget.plot(x, y)
 
+    def plot_pyramid(self, pyramid):
+        """ Overload method. """
+        return self.region_plot_widget.plot_pyramid(pyramid)
+
+    def set_series_index(self, series_index):
+        """ Overload method. """
+        return self.region_plot_widget.set_series_index(series_index)
+
     def get_add_count(self) -> int:
         return self.region_plot_widget.get_add_count()
 
@@ -305,11 +315,17 @@ class MainWindow(QMainWindow):
         return self.measurement_widget.ok_button.clicked.emit(True)
 
     def connect_dummy_sensor(self):
-        self.sensor = create_dummy_sensor()
+        if Config.ASYNC_SENSOR_READS:
+            self.sensor = create_dummy_async_sensor()
+        else:
+            self.sensor = create_dummy_sensor()
         logger.debug('Connected dummy sensor')
 
     def connect_imada_sensor(self):
-        self.sensor = Imada()
+        if Config.ASYNC_SENSOR_READS:
+            self.sensor = AsyncImada()
+        else:
+            self.sensor = Imada(pipeline_depth=Config.IMADA_PIPELINE_DEPTH)
         logger.debug(
             f'Connected Imada sensor with serial number "{self.sensor.sensor_info.sensor_serial_number}"'
         )
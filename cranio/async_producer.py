@@ -0,0 +1,319 @@
+"""
+Asyncio sensor interface and a producer that reads many sensors in one event loop.
+The application records with an AsyncProducerProcess if Config.ASYNC_SENSOR_READS is set.
+"""
+import time
+import asyncio
+import multiprocessing as mp
+from typing import Tuple, List
+from cranio.producer import (
+    ChannelInfo,
+    Producer,
+    AcquisitionScheduler,
+    get_nan,
+    SensorError,
+    ProducerProcess,
+)
+from cranio.model import SensorInfo, Database
+from cranio.constants import SAMPLE_RATE_HZ
+from cranio.utils import monotonic_ns, logger, random_value_generator
+
+
+class AsyncSensor:
+    """
+    Sensor with coroutine open(), close() and read() methods for reading in an asyncio event loop.
+    The methods must be overloaded. The base class is a dummy sensor (see Sensor).
+    """
+
+    sensor_info = SensorInfo(
+        sensor_serial_number='DUMMY53N50RFTW', turns_in_full_turn=3
+    )
+    # Target read rate (Hz) when recorded by an AsyncProducer. None to read as fast as possible.
+    rate_hz = SAMPLE_RATE_HZ
+
+    def __init__(self):
+        self.channels = []
+        self.value_generator = get_nan
+
+    async def open(self):
+        """ Dummy method. """
+        pass
+
+    async def close(self):
+        """ Dummy method. """
+        pass
+
+    def register_channel(self, channel_info: ChannelInfo) -> None:
+        """
+        Register an input channel with the sensor.
+
+        :param channel_info: Channel to be registered
+        :return: None
+        """
+        return self.channels.append(channel_info)
+
+    async def read(self) -> Tuple[int, dict]:
+        """
+        Read values from the registered input channels.
+
+        :return: Timestamp (see monotonic_ns()) and value dictionary as a tuple
+        """
+        return monotonic_ns(), {str(c): self.value_generator() for c in self.channels}
+
+    @classmethod
+    def enter_info_to_database(cls, database: Database) -> SensorInfo:
+        """ Enter copy of self.sensor_info to a database. """
+        logger.debug(f'Enter sensor info: {str(cls.sensor_info)}')
+        database.insert(cls.sensor_info, insert_if_exists=False)
+        return cls.sensor_info
+
+
+class AsyncProducer(Producer):
+    """
+    Data producer for recording AsyncSensors in an asyncio event loop. The open(), close() and read()
+    methods are coroutines.
+
+    In run(), each sensor is read in its own task at its target rate, so a slow sensor does not delay
+    the others. The samples are batched as in Producer. While paused, the tasks wait on an event
+    and use no CPU. If a sensor read fails, run() stops and raises SensorError.
+
+    Example:
+
+        >>> producer = AsyncProducer()
+        >>> producer.register_sensor(sensor)
+        >>> task = asyncio.ensure_future(producer.run(queue))
+        >>> producer.resume()
+        >>> ...
+        >>> await producer.pause()  # all read samples have been pushed to the queue
+        >>> await producer.stop()
+        >>> await task
+    """
+
+    def __init__(self, concurrent: bool = True):
+        """
+
+        :param concurrent: Ignored. The sensors are always read concurrently in their own tasks.
+        """
+        super().__init__()
+        self.queue = None
+        # Asyncio events are created in the event loop (see _events())
+        self._running = None
+        self._stopping = None
+        self._idle = None
+        self._in_flight = 0
+        # Exception raised by AsyncSensor.read() in run() and the failed sensor
+        self.error = None
+        self._error_sensor = None
+
+    def register_sensor(self, sensor: AsyncSensor) -> None:
+        """
+        Register an input sensor with the producer.
+
+        :param sensor: Input sensor
+        :return: None
+        """
+        self.sensors.append(sensor)
+        self.schedulers.append(AcquisitionScheduler(sensor.rate_hz))
+
+    async def open(self):
+        """ Open all sensor ports. """
+        await asyncio.gather(*(s.open() for s in self.sensors))
+
+    async def close(self):
+        """ Close all sensor ports. """
+        await asyncio.gather(*(s.close() for s in self.sensors))
+
+    async def read(self, queue: mp.Queue = None) -> List[Tuple[int, dict]]:
+        """
+        Wait until a sensor read is due and read the sensors that are due concurrently.
+        If a queue is specified, the read values are added to the current batch and the batch is pushed
+        to the queue when it is full or old enough.
+
+        :param queue:
+        :return: List of timestamp and value dictionary tuples
+        """
+        if not self.sensors:
+            return []
+        delay = min(s.deadline for s in self.schedulers) - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        now = time.perf_counter()
+        due = []
+        for sensor, scheduler in zip(self.sensors, self.schedulers):
+            if scheduler.deadline <= now:
+                scheduler.tick(now)
+                due.append(sensor)
+        indices_and_values = await asyncio.gather(*(s.read() for s in due))
+        if queue is not None:
+            for index, value_dict in indices_and_values:
+                self._append_to_batch(index, value_dict, queue)
+            if (
+                self._batch_length > 0
+                and time.monotonic() - self._batch_started >= self.batch_interval
+            ):
+                self.flush(queue)
+        return list(indices_and_values)
+
+    def _events(self) -> None:
+        """ Create the asyncio events in the running event loop if needed. """
+        if self._running is None:
+            self._running = asyncio.Event()
+            self._stopping = asyncio.Event()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._in_flight = 0
+
+    async def run(self, queue: mp.Queue) -> None:
+        """
+        Open the sensors and read them while running (see resume() and pause()) until stopped.
+        The producer is paused initially unless resume() has been called.
+
+        :param queue: Queue (or transport) to which the sample batches are pushed
+        :return: None
+        :raises SensorError: if a sensor read failed
+        """
+        self._events()
+        self.queue = queue
+        self.error = self._error_sensor = None
+        await self.open()
+        tasks = [
+            asyncio.ensure_future(self._read_sensor(sensor, scheduler))
+            for sensor, scheduler in zip(self.sensors, self.schedulers)
+        ]
+        tasks.append(asyncio.ensure_future(self._flush_periodically()))
+        try:
+            await self._stopping.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.flush(queue)
+            await self.close()
+            self._running = self._stopping = self._idle = None
+        if self.error is not None:
+            raise SensorError(
+                f'{type(self._error_sensor).__name__} read failed'
+            ) from self.error
+
+    def resume(self) -> None:
+        """ Start (or continue) reading the sensors in run(). """
+        self._events()
+        self.reset_schedulers()
+        self._running.set()
+
+    async def pause(self) -> None:
+        """ Stop reading the sensors in run() and wait until all read samples have been pushed to the queue. """
+        self._events()
+        self._running.clear()
+        await self._idle.wait()
+        if self.queue is not None:
+            self.flush(self.queue)
+
+    async def stop(self) -> None:
+        """ Pause and stop run(). """
+        await self.pause()
+        self._stopping.set()
+
+    async def _read_sensor(
+        self, sensor: AsyncSensor, scheduler: AcquisitionScheduler
+    ) -> None:
+        """ Read a sensor at its target rate while running. Stop run() if the read fails. """
+        while True:
+            await self._running.wait()
+            delay = scheduler.deadline - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                if not self._running.is_set():
+                    continue
+            scheduler.tick()
+            self._in_flight += 1
+            self._idle.clear()
+            try:
+                index, value_dict = await sensor.read()
+                self._append_to_batch(index, value_dict, self.queue)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f'{type(sensor).__name__} read failed')
+                self.error, self._error_sensor = e, sensor
+                self._stopping.set()
+                return
+            finally:
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self._idle.set()
+
+    async def _flush_periodically(self) -> None:
+        """ Push the current batch to the queue every batch_interval seconds while running. """
+        while True:
+            await self._running.wait()
+            await asyncio.sleep(self.batch_interval)
+            self.flush(self.queue)
+
+
+class AsyncProducerProcess(ProducerProcess):
+    """
+    Process for recording data from an AsyncProducer. The producer runs in an asyncio event loop
+    of the process, while the control events are waited on in an executor thread.
+    """
+
+    producer_class = AsyncProducer
+
+    def run(self) -> None:
+        """
+        Run the producer in a new event loop until self.stop_event is triggered.
+
+        :return: None
+        :raises SensorError: if a sensor read failed
+        """
+        logger.info('Running producer process "{}"'.format(str(self)))
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._run())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+        logger.info('Stopping producer process "{}"'.format(str(self)))
+
+    async def _run(self) -> None:
+        """ Resume and pause the producer according to start_event until stopped or a sensor read fails. """
+        loop = asyncio.get_event_loop()
+        task = asyncio.ensure_future(self.producer.run(self.transport))
+        # Wake up the control loop if run() stops on a read error
+        task.add_done_callback(lambda _: self._wakeup_sender.send_bytes(b'\x00'))
+        running = False
+        while not self.stop_event.is_set() and not task.done():
+            if self.start_event.is_set():
+                if self._new_recording.is_set():
+                    self._anchor_recording()
+                if not running:
+                    self.idle_event.clear()
+                    self.producer.resume()
+                    running = True
+            elif running or not self.idle_event.is_set():
+                self.log_scheduler_stats()
+                await self.producer.pause()
+                running = False
+                self.transport.mark(self._pause_count.value)
+                self.idle_event.set()
+            else:
+                # Acknowledge pause() calls made while already paused
+                self.transport.mark(self._pause_count.value)
+            await loop.run_in_executor(None, self._wait_for_wakeup)
+        if not task.done():
+            await self.producer.stop()
+        await task
+
+
+def create_dummy_async_sensor() -> AsyncSensor:
+    """
+    Create a dummy torque (Nm) sensor for an AsyncProducer.
+
+    :return: AsyncSensor object
+    """
+    logger.debug('Initialize dummy async torque sensor')
+    sensor = AsyncSensor()
+    sensor.value_generator = random_value_generator
+    sensor.register_channel(ChannelInfo('torque', 'Nm'))
+    return sensor
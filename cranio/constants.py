@@ -5,3 +5,5 @@ DEFAULT_LOGGING_CONFIG_PATH = Path(__file__).parent.parent / 'logging.yml'
 SQLITE_FILENAME = 'cranio.db'
 # Seconds to include in plot. None for no filtering.
 PLOT_N_SECONDS = 10
+# Target sensor sample rate (Hz). Used for scheduling sensor reads and sizing the real-time plot buffers.
+SAMPLE_RATE_HZ = 100
@@ -2,17 +2,23 @@
 Interface for Imada HTG2-4 digital torque gauge.
 """
 import re
+import time
+import asyncio
 import serial.tools.list_ports
-import datetime
-from collections import namedtuple
-from typing import Tuple
+import numpy as np
+from collections import namedtuple, deque
+from typing import Tuple, List, Union, Iterable, Optional
 from serial.tools.list_ports_common import ListPortInfo
 from cranio.producer import Sensor, ChannelInfo
+from cranio.async_producer import AsyncSensor
 from cranio.model import SensorInfo
-from cranio.utils import logger, utc_datetime
+from cranio.utils import logger, monotonic_ns
 from cranio.exc import DeviceDetectionError, TelegramError
 
 IMADA_EOL = '\r'
+IMADA_EOL_BYTES = IMADA_EOL.encode('utf-8')
+# Display value request
+IMADA_REQUEST_BYTES = ('D' + IMADA_EOL).encode('utf-8')
 
 
 def find_serial_device(serial_number: str) -> ListPortInfo:
@@ -46,7 +52,23 @@ def get_com_port(serial_number: str) -> str:
     return find_serial_device(serial_number).device
 
 
-def decode_telegram(telegram: str) -> Tuple[str, str, str, str]:
+# Telegram: value followed by unit, mode and condition characters (e.g., "-1.234KTO")
+TELEGRAM_PATTERN = re.compile(
+    r'\s*([-+]?(?:\d+\.?\d*|\.\d+))([A-Za-z])([A-Za-z])([A-Za-z])' + IMADA_EOL + '?'
+)
+# Classes of the value characters in TELEGRAM_PATTERN by byte: other, whitespace (\s), sign, digit or dot
+_OTHER, _WHITESPACE, _SIGN, _DIGIT_OR_DOT = range(4)
+_VALUE_CHAR_CLASS = np.full(256, _OTHER, dtype=np.uint8)
+_VALUE_CHAR_CLASS[list(b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f')] = _WHITESPACE
+_VALUE_CHAR_CLASS[list(b'+-')] = _SIGN
+_VALUE_CHAR_CLASS[list(b'0123456789.')] = _DIGIT_OR_DOT
+# Decoded telegrams
+TELEGRAM_DTYPE = np.dtype(
+    [('value', np.float64), ('unit', 'U1'), ('mode', 'U1'), ('condition', 'U1')]
+)
+
+
+def decode_telegram(telegram: str) -> Tuple[float, str, str, str]:
     """
     Decode a telegram string and return a tuple (value, unit, mode, condition).
 
@@ -54,16 +76,109 @@ def decode_telegram(telegram: str) -> Tuple[str, str, str, str]:
     :return: Tuple (value, unit, mode, condition)
     :raises TelegramError: if telegram is invalid
     """
-    str_ = telegram.replace(IMADA_EOL, '')
+    match = TELEGRAM_PATTERN.fullmatch(telegram)
+    if match is None:
+        raise TelegramError('Invalid telegram: ' + telegram.rstrip(IMADA_EOL))
+    value, unit, mode, condition = match.groups()
+    return float(value), unit, mode, condition
+
+
+def decode_telegrams(telegrams: Union[bytes, Iterable[str]]) -> np.ndarray:
+    """
+    Decode telegrams in one call.
+
+    Invalid telegrams (see TELEGRAM_PATTERN and decode_telegram()) are decoded as NaN values with empty unit,
+    mode and condition.
+
+    :param telegrams: Buffer of EOL-terminated telegrams or an iterable of telegram strings (e.g., pandas.Series)
+    :return: Structured array of TELEGRAM_DTYPE
+    """
+    if isinstance(telegrams, (bytes, bytearray)):
+        telegrams = bytes(telegrams).split(IMADA_EOL_BYTES)
+        if not telegrams[-1]:
+            telegrams.pop()
+    elif not isinstance(telegrams, (list, np.ndarray)):
+        telegrams = np.asarray(telegrams)
     try:
-        value = float(re.findall(r'[-+]?\d*\.\d+|\d+', str_)[0])
-    except IndexError:
-        raise TelegramError('Invalid telegram: ' + str_)
+        # Fixed-width byte strings (a copy that is modified below)
+        arr = np.array(telegrams, dtype=bytes).ravel()
+    except UnicodeEncodeError:
+        # Non-ASCII telegrams are invalid
+        return _decode_telegrams_one_by_one(telegrams)
+    decoded = np.zeros(len(arr), dtype=TELEGRAM_DTYPE)
+    decoded['value'] = np.nan
+    width = arr.dtype.itemsize
+    if len(arr) == 0 or width < 4:
+        return decoded
+    # Characters of each telegram as a row (zero-padded)
+    chars = arr.view(np.uint8).reshape(len(arr), width)
+    lengths = width - np.argmax(chars[:, ::-1] != 0, axis=1)
+    lengths[~chars.any(axis=1)] = 0
+    rows = np.arange(len(arr))[:, None]
+    # Strip a trailing EOL
+    eol = chars[rows[:, 0], np.maximum(lengths - 1, 0)] == IMADA_EOL_BYTES[0]
+    eol &= lengths > 0
+    chars[rows[eol, 0], lengths[eol] - 1] = 0
+    lengths[eol] -= 1
+    code_columns = np.maximum(lengths[:, None] + np.arange(-3, 0), 0)
+    codes = chars[rows, code_columns]
+    lower_codes = codes | 0x20
+    valid = (lengths >= 4) & np.all(
+        (lower_codes >= ord('a')) & (lower_codes <= ord('z')), axis=1
+    )
+    valid &= _valid_value_characters(chars, lengths - 3)
+    # Truncate unit, mode and condition so that only the value remains
+    chars[rows[valid], code_columns[valid]] = 0
     try:
-        unit, mode, condition = str_[-3:]
+        decoded['value'][valid] = arr[valid].astype(np.float64)
     except ValueError:
-        raise TelegramError('Invalid telegram: ' + str_)
-    return value, unit, mode, condition
+        for i in np.flatnonzero(valid):
+            try:
+                decoded['value'][i] = float(arr[i])
+            except ValueError:
+                valid[i] = False
+    for i, name in enumerate(('unit', 'mode', 'condition')):
+        decoded[name][valid] = codes[valid, i].astype(np.uint32).view('U1')
+    return decoded
+
+
+def _valid_value_characters(chars: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Check that the value characters of each telegram are leading whitespace followed by an optional sign
+    and digits or dots, as in TELEGRAM_PATTERN. Float parsing rejects the remaining invalid values
+    (e.g., multiple dots), but not values such as "nan", "inf" or "1e3".
+
+    :param chars: Characters of each telegram as a row
+    :param lengths: Number of value characters of each telegram
+    :return: Boolean array
+    """
+    columns = np.arange(chars.shape[1])
+    in_value = columns < lengths[:, None]
+    classes = _VALUE_CHAR_CLASS[chars]
+    whitespace = (classes == _WHITESPACE) & in_value
+    non_whitespace = in_value & ~whitespace
+    first = np.argmax(non_whitespace, axis=1)[:, None]
+    return (
+        non_whitespace.any(axis=1)
+        & ~np.any(whitespace & (columns > first), axis=1)
+        & np.all(
+            ~non_whitespace
+            | (classes == _DIGIT_OR_DOT)
+            | ((classes == _SIGN) & (columns == first)),
+            axis=1,
+        )
+    )
+
+
+def _decode_telegrams_one_by_one(telegrams: Iterable[str]) -> np.ndarray:
+    """ Decode telegrams with decode_telegram(). Invalid telegrams are decoded as in decode_telegrams(). """
+    decoded = []
+    for telegram in telegrams:
+        try:
+            decoded.append(decode_telegram(telegram))
+        except (TelegramError, TypeError):
+            decoded.append((np.nan, '', '', ''))
+    return np.array(decoded, dtype=TELEGRAM_DTYPE)
 
 
 # RS232 communication protocol configuration
@@ -73,17 +188,46 @@ RS232Configuration = namedtuple(
 
 
 class Imada(Sensor):
-    """ Imada HTG2-4 digital torque gauge with USB serial (RS-232) interface. """
+    """
+    Imada HTG2-4 digital torque gauge with USB serial (RS-232) interface.
+
+    The display value is requested with a request-response protocol. To increase the sample rate,
+    read() can keep several requests in flight (pipeline_depth > 1) so that the round trip times overlap.
+    The replies arrive in request order. Replies to requests in flight when the producer pauses are
+    discarded (see reset()).
+    """
 
     rs232_config = RS232Configuration(
         19200, serial.EIGHTBITS, serial.PARITY_NONE, serial.STOPBITS_ONE, 1 / 50
     )
     sensor_info = SensorInfo(sensor_serial_number='FTSLQ6QIA', turns_in_full_turn=3)
+    # Read as fast as the sensor replies (the sample rate is set by pipeline_depth)
+    rate_hz = None
+    # Maximum time (in seconds) to wait for the replies to requests in flight in reset()
+    reset_timeout = 0.1
 
-    def __init__(self):
+    def __init__(self, serial_port: serial.Serial = None, pipeline_depth: int = 1):
+        """
+        :param serial_port: Serial port (e.g., ImadaEmulator for testing).
+            None to find the serial port of the sensor by serial number.
+        :param pipeline_depth: Maximum number of display value requests in flight in read()
+        """
         super().__init__()
-        self.serial = serial.Serial(port=None, **self.rs232_config._asdict())
-        self.serial.port = get_com_port(self.sensor_info.sensor_serial_number)
+        if pipeline_depth < 1:
+            raise ValueError(f'Invalid pipeline depth: {pipeline_depth}')
+        self.pipeline_depth = pipeline_depth
+        # Number of display value requests without a reply
+        self._in_flight = 0
+        if serial_port is None:
+            serial_port = serial.Serial(port=None, **self.rs232_config._asdict())
+            serial_port.port = get_com_port(self.sensor_info.sensor_serial_number)
+        self.serial = serial_port
+        # Received bytes not yet terminated by EOL
+        self._buffer = bytearray()
+        # Received complete telegrams as (telegram, arrival timestamp) tuples
+        self._telegrams = deque()
+        # Bytes not yet read from the serial port have arrived after this time (see monotonic_ns())
+        self._unread_since = monotonic_ns()
         self.register_channel(ChannelInfo('torque', 'Nm'))
 
     def open(self):
@@ -96,47 +240,212 @@ class Imada(Sensor):
 
     def close(self):
         """
-        Close the serial port.
+        Close the serial port and discard partially received telegrams.
 
         :return:
         """
+        self._buffer.clear()
+        self._telegrams.clear()
+        self._in_flight = 0
         return self.serial.close()
 
+    def reset(self):
+        """
+        Discard the replies to display value requests in flight and all received bytes so that the next
+        read() is not replied to by an earlier request (e.g., after a pause).
+
+        :return:
+        """
+        deadline = time.perf_counter() + self.reset_timeout
+        while self._in_flight > 0 and time.perf_counter() < deadline:
+            if self._telegrams:
+                self._telegrams.popleft()
+                self._in_flight -= 1
+            else:
+                self._receive()
+        self.serial.reset_input_buffer()
+        self._buffer.clear()
+        self._telegrams.clear()
+        self._in_flight = 0
+        self._unread_since = monotonic_ns()
+
     def readline(self) -> str:
         """
         Read bytes from the serial port until an EOL character and returns a string.
 
         :return: String
         """
-        line = []
-        while True:
-            c = self.serial.read().decode('utf-8')
-            if c == IMADA_EOL:
-                break
-            line.append(c)
-        return ''.join(line)
+        telegram, _ = self.read_telegram()
+        return telegram
+
+    def read_telegram(self, wait: bool = True) -> Optional[Tuple[str, int]]:
+        """
+        Read the next telegram and its arrival time.
+
+        :param wait: Wait until a telegram is received. If False, only bytes already waiting in the serial port
+            are read.
+        :return: Telegram and arrival timestamp (see monotonic_ns()) as a tuple
+            (None if not waiting and no complete telegram received). Telegrams received by the same serial port
+            read are stamped at even intervals since the previous read.
+        """
+        if not wait and not self._telegrams and self.serial.in_waiting:
+            self._receive()
+        while wait and not self._telegrams:
+            self._receive()
+        if not self._telegrams:
+            return None
+        return self._telegrams.popleft()
+
+    def readlines(self) -> List[str]:
+        """
+        Read all complete telegrams available without waiting.
+
+        :return: List of strings
+        """
+        if self.serial.in_waiting:
+            self._receive()
+        telegrams = [telegram for telegram, _ in self._telegrams]
+        self._telegrams.clear()
+        return telegrams
+
+    def _receive(self) -> None:
+        """
+        Read all bytes waiting in the serial port (or wait for at least one byte) and split complete telegrams.
+
+        :return: None
+        """
+        data = self.serial.read(max(1, self.serial.in_waiting))
+        received_at = monotonic_ns()
+        self._buffer += data
+        if IMADA_EOL_BYTES in data:
+            *lines, rest = self._buffer.split(IMADA_EOL_BYTES)
+            self._buffer = bytearray(rest)
+            # The telegrams arrived after the previous read. Space them evenly over that time so that
+            # pipelined replies read together are not stamped at the same time.
+            step = (received_at - self._unread_since) // len(lines)
+            self._telegrams.extend(
+                (line.decode('utf-8'), received_at - (len(lines) - 1 - i) * step)
+                for i, line in enumerate(lines)
+            )
+        self._unread_since = received_at
 
     def poll(self) -> str:
         """
         Poll the display value from the sensor. To decode the display value string, use decode_telegram().
+        Do not mix with pipelined read() calls (the reply would be to an earlier request).
 
         :return: Display value as a string
         """
         # request display value
-        self.serial.write(('D' + IMADA_EOL).encode('utf-8'))
+        self.serial.write(IMADA_REQUEST_BYTES)
         # return display value
         return self.readline()
 
-    def read(self) -> Tuple[datetime.datetime, dict]:
+    def read(self) -> Tuple[int, dict]:
+        """
+        Read a single value from the sensor. Keeps up to pipeline_depth display value requests in flight.
+
+        :return: Arrival timestamp (see monotonic_ns()) and value dictionary as a tuple
+        """
+        if self._in_flight < self.pipeline_depth:
+            if self._in_flight == 0:
+                # Replies cannot arrive before the request
+                self._unread_since = monotonic_ns()
+            self.serial.write(
+                IMADA_REQUEST_BYTES * (self.pipeline_depth - self._in_flight)
+            )
+            self._in_flight = self.pipeline_depth
+        telegram, received_at = self.read_telegram()
+        self._in_flight -= 1
+        try:
+            value, _, _, _ = decode_telegram(telegram)
+        except TelegramError as e:
+            logger.error('Decode telegram failed! {}'.format(str(e)))
+            value = None
+        return received_at, {str(self.channels[0]): value}
+
+
+class AsyncImada(AsyncSensor):
+    """
+    Imada HTG2-4 digital torque gauge for reading in an asyncio event loop (see AsyncProducer).
+
+    If the serial port has a file descriptor (POSIX), replies are received in an event loop reader callback
+    without blocking. Otherwise (e.g., Windows COM ports and serial port stand-ins), the serial port is
+    polled every poll_interval seconds while waiting for a reply.
+    """
+
+    sensor_info = Imada.sensor_info
+    # Time (in seconds) between checks for a reply when the serial port cannot be watched by the event loop
+    poll_interval = 0.001
+
+    def __init__(self, serial_port: serial.Serial = None):
+        """
+        :param serial_port: Serial port (e.g., serial.Serial(PtyImadaEmulator.port) for testing).
+            None to find the serial port of the sensor by serial number.
+        """
+        super().__init__()
+        self.imada = Imada(serial_port)
+        self.channels = self.imada.channels
+        self._fileno = None
+        self._received = None
+
+    @property
+    def serial(self):
+        return self.imada.serial
+
+    async def open(self):
+        """ Open the serial port and watch it in the event loop if possible. """
+        if not self.serial.is_open:
+            self.serial.open()
+        self._received = asyncio.Event()
+        try:
+            fileno = self.serial.fileno()
+        except (AttributeError, OSError, NotImplementedError):
+            return
+        # Return immediately from read()
+        self.serial.timeout = 0
+        asyncio.get_event_loop().add_reader(fileno, self._on_readable)
+        self._fileno = fileno
+
+    async def close(self):
+        """ Stop watching and close the serial port. """
+        if self._fileno is not None:
+            asyncio.get_event_loop().remove_reader(self._fileno)
+            self._fileno = None
+        self.imada.close()
+
+    def _on_readable(self) -> None:
+        """ Event loop reader callback. Receive the waiting bytes so that the callback is not called again. """
+        self.imada._receive()
+        self._received.set()
+
+    async def read_telegram(self) -> Tuple[str, int]:
+        """
+        Wait for the next telegram.
+
+        :return: Telegram and arrival timestamp (see monotonic_ns()) as a tuple
+        """
+        while True:
+            telegram = self.imada.read_telegram(wait=False)
+            if telegram is not None:
+                return telegram
+            if self._fileno is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            self._received.clear()
+            await self._received.wait()
+
+    async def read(self) -> Tuple[int, dict]:
         """
         Read a single value from the sensor.
 
-        :return: Datetime and value dictionary as a tuple
+        :return: Arrival timestamp (see monotonic_ns()) and value dictionary as a tuple
         """
+        self.serial.write(IMADA_REQUEST_BYTES)
+        telegram, received_at = await self.read_telegram()
         try:
-            telegram = self.poll()
             value, _, _, _ = decode_telegram(telegram)
         except TelegramError as e:
             logger.error('Decode telegram failed! {}'.format(str(e)))
             value = None
-        return utc_datetime(), {str(self.channels[0]): value}
+        return received_at, {str(self.channels[0]): value}
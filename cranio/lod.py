@@ -0,0 +1,189 @@
+"""
+Level-of-detail decimation for plotting long time series.
+"""
+import numpy as np
+from typing import Tuple, List
+
+# Decimated bin: x range of the bin and the minimum and maximum y value with their x values
+BIN_DTYPE = np.dtype(
+    [
+        ('x_start', '<f8'),
+        ('x_stop', '<f8'),
+        ('x_of_min', '<f8'),
+        ('y_min', '<f8'),
+        ('x_of_max', '<f8'),
+        ('y_max', '<f8'),
+    ]
+)
+
+
+def samples_to_bins(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Convert samples to single-sample bins.
+
+    :param x: Monotonically increasing x values
+    :param y: y values
+    :return: Structured array (see BIN_DTYPE)
+    """
+    bins = np.empty(len(x), dtype=BIN_DTYPE)
+    for name in ('x_start', 'x_stop', 'x_of_min', 'x_of_max'):
+        bins[name] = x
+    bins['y_min'] = y
+    bins['y_max'] = y
+    return bins
+
+
+def merge_bins(bins: np.ndarray, factor: int) -> np.ndarray:
+    """
+    Merge each factor consecutive bins into one. The last bin may contain less than factor bins.
+    NaN y values are ignored (a bin of NaN values has NaN minimum and maximum).
+
+    :param bins: Structured array (see BIN_DTYPE)
+    :param factor: Number of bins merged into one
+    :return: Structured array (see BIN_DTYPE)
+    """
+    n = -(-len(bins) // factor)
+    pad = n * factor - len(bins)
+
+    def reshape(name: str, fill=None) -> np.ndarray:
+        values = bins[name]
+        if fill is None:
+            values = np.pad(values, (0, pad), mode='edge')
+        else:
+            values = np.pad(values, (0, pad), mode='constant', constant_values=fill)
+        return values.reshape(n, factor)
+
+    merged = np.empty(n, dtype=BIN_DTYPE)
+    merged['x_start'] = reshape('x_start')[:, 0]
+    merged['x_stop'] = reshape('x_stop')[:, -1]
+    rows = np.arange(n)
+    for extremum, fill, arg in (
+        ('min', np.inf, np.argmin),
+        ('max', -np.inf, np.argmax),
+    ):
+        y = reshape(f'y_{extremum}', fill)
+        y = np.where(np.isnan(y), fill, y)
+        i = arg(y, axis=1)
+        y = y[rows, i]
+        merged[f'y_{extremum}'] = np.where(y == fill, np.nan, y)
+        merged[f'x_of_{extremum}'] = reshape(f'x_of_{extremum}')[rows, i]
+    return merged
+
+
+def bins_to_points(bins: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert bins to plotted points: the minimum and the maximum of each bin in x order.
+
+    :param bins: Structured array (see BIN_DTYPE)
+    :return: x and y arrays as a tuple
+    """
+    min_first = bins['x_of_min'] <= bins['x_of_max']
+    x = np.empty(2 * len(bins))
+    y = np.empty(2 * len(bins))
+    x[0::2] = np.where(min_first, bins['x_of_min'], bins['x_of_max'])
+    x[1::2] = np.where(min_first, bins['x_of_max'], bins['x_of_min'])
+    y[0::2] = np.where(min_first, bins['y_min'], bins['y_max'])
+    y[1::2] = np.where(min_first, bins['y_max'], bins['y_min'])
+    return x, y
+
+
+def level_for(count: int, max_points: int, factor: int, level_count: int) -> int:
+    """
+    Return the finest pyramid level at which count samples are drawn with at most max_points points.
+
+    :param count: Number of samples
+    :param max_points: Maximum number of points
+    :param factor: Number of bins merged into one between consecutive levels
+    :param level_count: Number of decimated levels
+    :return: Level (0 for samples)
+    """
+    if count <= max_points or level_count == 0:
+        return 0
+    max_bins = max(1, max_points // 2)
+    level = 1
+    while level < level_count and -(-count // factor ** level) > max_bins:
+        level += 1
+    return level
+
+
+def window_bins(bins: np.ndarray, x_start: float, x_stop: float) -> np.ndarray:
+    """
+    Return the bins overlapping the x range [x_start, x_stop] and one bin beyond the range on both sides.
+
+    :param bins: Structured array in x order (see BIN_DTYPE)
+    :param x_start: Start of the x range
+    :param x_stop: End of the x range
+    :return: Structured array (see BIN_DTYPE)
+    """
+    first = max(int(np.searchsorted(bins['x_stop'], x_start, side='left')) - 1, 0)
+    last = int(np.searchsorted(bins['x_start'], x_stop, side='right')) + 1
+    return bins[first:last]
+
+
+class MinMaxPyramid:
+    """
+    Multi-resolution min/max envelope of a time series for drawing it at any zoom level.
+
+    Level k consists of bins of factor ** k samples. For an x range, window() returns the minimum and
+    maximum of each bin of the finest level that fits the requested number of points. Peaks are never
+    dropped, and the number of returned points is bounded by max_points, not by the number of samples.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, factor: int = 4):
+        """
+        :param x: Monotonically increasing x values
+        :param y: y values
+        :param factor: Number of bins merged into one between consecutive levels
+        :raises ValueError: if factor is less than 2 or x and y differ in length
+        """
+        if factor < 2:
+            raise ValueError(f'Invalid factor {factor}')
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        if self.x.shape != self.y.shape:
+            raise ValueError('x and y must be of equal length')
+        self.factor = factor
+        # Decimated levels 1, 2, ... (level 0 is the samples)
+        self.levels = []  # type: List[np.ndarray]
+        bins = samples_to_bins(self.x, self.y)
+        # The top level consists of a single bin
+        while len(bins) > 1 or (len(bins) == 1 and not self.levels):
+            bins = merge_bins(bins, factor)
+            self.levels.append(bins)
+
+    def __len__(self):
+        return len(self.x)
+
+    def x_range(self) -> Tuple[float, float]:
+        """ Return the first and the last x value. """
+        return self.x[0], self.x[-1]
+
+    def level_for(self, count: int, max_points: int) -> int:
+        """
+        Return the finest level at which count samples are drawn with at most max_points points.
+
+        :param count: Number of samples
+        :param max_points: Maximum number of points
+        :return: Level (0 for samples)
+        """
+        return level_for(count, max_points, self.factor, len(self.levels))
+
+    def window(
+        self, x_start: float, x_stop: float, max_points: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return points for drawing the x range [x_start, x_stop]. One point (or bin) beyond the range is
+        included on both sides so that the drawn line continues to the edges.
+
+        :param x_start: Start of the x range
+        :param x_stop: End of the x range
+        :param max_points: Maximum number of points (roughly two per pixel column)
+        :return: x and y arrays as a tuple
+        """
+        start = int(np.searchsorted(self.x, x_start, side='left'))
+        stop = int(np.searchsorted(self.x, x_stop, side='right'))
+        level = self.level_for(stop - start, max_points)
+        if level == 0:
+            start, stop = max(start - 1, 0), min(stop + 1, len(self.x))
+            return self.x[start:stop], self.y[start:stop]
+        return bins_to_points(window_bins(self.levels[level - 1], x_start, x_stop))
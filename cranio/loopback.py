@@ -0,0 +1,274 @@
+"""
+Serial port stand-ins for testing and benchmarking sensors without hardware.
+"""
+import os
+import time
+import select
+import threading
+from collections import deque
+from typing import Iterable, Callable
+
+
+class ReplaySerial:
+    """
+    Serial port stand-in that replays recorded bytes.
+
+    Implements the subset of the serial.Serial interface used by the sensors. Written bytes are recorded
+    in ``written``.
+    """
+
+    def __init__(self, data: bytes, chunk_size: int = None, loop: bool = False):
+        """
+        :param data: Bytes to be replayed
+        :param chunk_size: Maximum number of bytes available at once (i.e., emulate bytes arriving in pieces).
+            None for all bytes available immediately.
+        :param loop: Replay data endlessly
+        """
+        if loop and not data:
+            raise ValueError('Cannot loop empty data')
+        self.data = bytes(data)
+        self.chunk_size = chunk_size
+        self.loop = loop
+        self.position = 0
+        self.written = bytearray()
+        self.is_open = True
+
+    @classmethod
+    def from_telegrams(cls, telegrams: Iterable[str], eol: str = '\r', **kwargs):
+        """
+        Create a replay serial port from telegram strings.
+
+        :param telegrams: Telegrams without EOL characters
+        :param eol: EOL character appended to each telegram
+        :param kwargs: Keyword arguments passed to the constructor
+        :return: ReplaySerial
+        """
+        return cls(''.join(t + eol for t in telegrams).encode('utf-8'), **kwargs)
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def reset_input_buffer(self):
+        """ Discard the bytes available for reading (see in_waiting). """
+        self.read(self.in_waiting)
+
+    @property
+    def in_waiting(self) -> int:
+        """ Number of bytes available for reading. """
+        remaining = len(self.data) - self.position
+        if self.loop:
+            remaining = len(self.data)
+        if self.chunk_size is not None:
+            return min(remaining, self.chunk_size)
+        return remaining
+
+    def read(self, size: int = 1) -> bytes:
+        """
+        Read up to size bytes. Returns less bytes when the replayed data has been exhausted.
+
+        :param size: Number of bytes to read
+        :return: Bytes
+        """
+        if self.chunk_size is not None:
+            size = min(size, self.chunk_size)
+        if not self.loop:
+            data = self.data[self.position : self.position + size]
+            self.position += len(data)
+            return data
+        chunks = []
+        while size > 0:
+            data = self.data[self.position : self.position + size]
+            self.position = (self.position + len(data)) % len(self.data)
+            size -= len(data)
+            chunks.append(data)
+        return b''.join(chunks)
+
+    def write(self, data: bytes) -> int:
+        """
+        Record written bytes.
+
+        :param data: Bytes
+        :return: Number of written bytes
+        """
+        self.written += data
+        return len(data)
+
+
+class ImadaEmulator:
+    """
+    Serial port stand-in emulating an Imada torque gauge that replies to display value requests (``D\\r``).
+
+    A reply is available latency seconds after the request, but the device processes one request at a time
+    (processing_time seconds each). Reading blocks until bytes are available or timeout expires.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.005,
+        processing_time: float = 0.0005,
+        timeout: float = 1 / 50,
+        value_func: Callable[[int], float] = None,
+    ):
+        """
+        :param latency: Round trip time from request to reply in seconds
+        :param processing_time: Minimum time between replies in seconds
+        :param timeout: Read timeout in seconds
+        :param value_func: Function returning the display value for the n-th request (n by default)
+        """
+        self.latency = latency
+        self.processing_time = processing_time
+        self.timeout = timeout
+        self.value_func = value_func or float
+        self.request_count = 0
+        self.is_open = True
+        self._request = bytearray()
+        # Scheduled replies as (time available, bytes) tuples in time order
+        self._replies = deque()
+        self._output = bytearray()
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+        self._request.clear()
+        self._replies.clear()
+        self._output.clear()
+
+    def write(self, data: bytes) -> int:
+        """
+        Receive requests and schedule the replies.
+
+        :param data: Bytes
+        :return: Number of written bytes
+        """
+        now = time.perf_counter()
+        self._request += data
+        *requests, rest = self._request.split(b'\r')
+        self._request = bytearray(rest)
+        for request in requests:
+            if request != b'D':
+                continue
+            available_at = now + self.latency
+            if self._replies:
+                available_at = max(
+                    available_at, self._replies[-1][0] + self.processing_time
+                )
+            telegram = f'{self.value_func(self.request_count):.3f}KTO\r'
+            self._replies.append((available_at, telegram.encode('utf-8')))
+            self.request_count += 1
+        return len(data)
+
+    def _deliver(self) -> None:
+        """ Move replies that have arrived to the output buffer. """
+        now = time.perf_counter()
+        while self._replies and self._replies[0][0] <= now:
+            self._output += self._replies.popleft()[1]
+
+    def reset_input_buffer(self):
+        """ Discard the bytes available for reading. Replies that have not arrived yet are kept. """
+        self._deliver()
+        self._output.clear()
+
+    @property
+    def in_waiting(self) -> int:
+        """ Number of bytes available for reading. """
+        self._deliver()
+        return len(self._output)
+
+    def read(self, size: int = 1) -> bytes:
+        """
+        Read up to size bytes. Waits until at least one byte is available or the timeout expires.
+
+        :param size: Maximum number of bytes to read
+        :return: Bytes (empty if the timeout expired)
+        """
+        deadline = time.perf_counter() + self.timeout
+        while True:
+            self._deliver()
+            now = time.perf_counter()
+            if self._output or now >= deadline:
+                break
+            next_reply_at = self._replies[0][0] if self._replies else deadline
+            time.sleep(max(0, min(next_reply_at, deadline) - now))
+        data = bytes(self._output[:size])
+        del self._output[:size]
+        return data
+
+
+class PtyImadaEmulator:
+    """
+    Imada torque gauge emulator on a pseudo terminal (POSIX only).
+
+    Replies to display value requests written to the terminal (``port``) in a thread, so that the emulated
+    sensor can be opened with serial.Serial like a real device. Use as a context manager or call
+    start() and stop().
+    """
+
+    def __init__(
+        self, latency: float = 0.005, value_func: Callable[[int], float] = None
+    ):
+        """
+        :param latency: Time from request to reply in seconds
+        :param value_func: Function returning the display value for the n-th request (n by default)
+        """
+        self.latency = latency
+        self.value_func = value_func or float
+        self.request_count = 0
+        self.port = None
+        self._master = None
+        self._slave = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self) -> None:
+        """ Open the pseudo terminal and start replying to requests. """
+        import tty
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            name='Imada emulator', target=self._run, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Stop replying and close the pseudo terminal. """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def _run(self) -> None:
+        """ Emulator thread main loop. """
+        request = bytearray()
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if not readable:
+                continue
+            request += os.read(self._master, 1024)
+            *requests, rest = request.split(b'\r')
+            request = bytearray(rest)
+            for r in requests:
+                if r != b'D':
+                    continue
+                time.sleep(self.latency)
+                telegram = f'{self.value_func(self.request_count):.3f}KTO\r'
+                os.write(self._master, telegram.encode('utf-8'))
+                self.request_count += 1
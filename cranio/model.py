@@ -1,7 +1,10 @@
 """
 Relational database definitions and classes/functions for database management.
 """
-from typing import Tuple, List, Iterable
+import time
+import zlib
+import numpy as np
+from typing import Tuple, List, Iterable, Iterator
 from contextlib import contextmanager, closing
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -13,18 +16,54 @@ from sqlalchemy import (
     String,
     DateTime,
     Numeric,
+    Float,
+    LargeBinary,
     Boolean,
     ForeignKey,
     create_engine,
     CheckConstraint,
     event,
     Table,
+    Index,
+    select,
+    inspect,
 )
 from cranio.utils import generate_unique_id, utc_datetime, logger
+from cranio.lod import (
+    MinMaxPyramid,
+    BIN_DTYPE,
+    bins_to_points,
+    level_for,
+    window_bins,
+)
 from cranio import __version__
 from cranio.constants import SQLITE_FILENAME
 
 
+class SQLiteProfile:
+    """ SQLite pragmas applied on each new connection. """
+
+    # Rollback journal and fsync on every commit
+    DURABLE = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+    # Write-ahead log so that readers do not block the writer (and vice versa) and fsync only on checkpoints.
+    # A power loss may roll back the latest commits but does not corrupt the database.
+    PERFORMANCE = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        # Negative value is in KiB
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 ** 2,
+        'temp_store': 'MEMORY',
+    }
+
+
+class MeasurementStorage:
+    # One fact_measurement row per sample
+    ROWS = 'rows'
+    # Compressed fixed-duration chunks in fact_measurement_chunk
+    CHUNKS = 'chunks'
+
+
 class Database:
     def __init__(
         self,
@@ -34,11 +73,43 @@ class Database:
         host: str = None,
         port: int = None,
         database: str = None,
+        sqlite_profile: dict = None,
+        measurement_storage: str = MeasurementStorage.ROWS,
     ):
+        """
+        :param drivername:
+        :param username:
+        :param password:
+        :param host:
+        :param port:
+        :param database:
+        :param sqlite_profile: SQLite pragmas (SQLiteProfile.DURABLE by default)
+        :param measurement_storage: Storage of inserted measurements (MeasurementStorage)
+        :raises ValueError: if measurement_storage is invalid
+        """
         self.url = URL(drivername, username, password, host, port, database)
+        self.sqlite_profile = (
+            SQLiteProfile.DURABLE if sqlite_profile is None else sqlite_profile
+        )
+        self.measurement_storage = measurement_storage
         self.engine = None
         self.initialized = False
 
+    @property
+    def measurement_storage(self) -> str:
+        """ Storage of inserted measurements (MeasurementStorage). """
+        return self._measurement_storage
+
+    @measurement_storage.setter
+    def measurement_storage(self, value: str):
+        """
+        :param value:
+        :raises ValueError: if value is not a MeasurementStorage value
+        """
+        if value not in (MeasurementStorage.ROWS, MeasurementStorage.CHUNKS):
+            raise ValueError(f'Invalid measurement storage: {value}')
+        self._measurement_storage = value
+
     @classmethod
     def from_str(cls, url_str: str):
         url = make_url(url_str)
@@ -62,8 +133,33 @@ class Database:
         self.engine = create_engine(self.url)
         # Enforce sqlite foreign keys
         event.listen(self.engine, 'connect', _fk_pragma_on_connect)
+        if self.url.drivername.startswith('sqlite'):
+            event.listen(self.engine, 'connect', self._profile_pragma_on_connect)
         return self.engine
 
+    def _profile_pragma_on_connect(self, dbapi_con, con_record):
+        """
+        Apply SQLite profile pragmas.
+
+        :param dbapi_con:
+        :param con_record:
+        :return:
+        """
+        for name, value in self.sqlite_profile.items():
+            dbapi_con.execute(f'pragma {name}={value}')
+
+    def is_in_memory(self) -> bool:
+        """
+        Return boolean indicating if the database is an in-memory SQLite database.
+
+        :return:
+        """
+        return self.url.drivername.startswith('sqlite') and self.url.database in (
+            None,
+            '',
+            ':memory:',
+        )
+
     def populate_lookup_tables(self):
         logger.info(f'Populate lookup tables in {self.url}')
         with session_scope(self) as s:
@@ -74,14 +170,79 @@ class Database:
 
     def init(self):
         """
-        Create declarative tables and populate lookup tables.
+        Create declarative tables, migrate existing tables and populate lookup tables.
         :return:
         """
         logger.info(f'Create declarative tables in {self.url}')
         Base.metadata.create_all(self.engine)
+        self.migrate()
         self.populate_lookup_tables()
         self.initialized = True
 
+    def migrate(self):
+        """
+        Migrate tables created by an earlier version to the current schema.
+        Add missing nullable columns, rebuild SQLite tables with Numeric columns that are now Float
+        (SQLite does not support altering column types) and create missing indexes (create_all() creates
+        indexes only for new tables).
+
+        :return:
+        """
+        inspector = inspect(self.engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    self._add_column(table, column)
+        inspector = inspect(self.engine)
+        if self.url.drivername.startswith('sqlite'):
+            for table in Base.metadata.sorted_tables:
+                if _has_changed_to_float(table, inspector.get_columns(table.name)):
+                    self._rebuild_sqlite_table(table)
+            inspector = inspect(self.engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    logger.info(f'Create index {index.name} in {self.url}')
+                    index.create(self.engine)
+
+    def _add_column(self, table: Table, column: Column) -> None:
+        """
+        Add a nullable column to an existing table.
+
+        :param table:
+        :param column:
+        :return: None
+        """
+        logger.info(f'Add column {table.name}.{column.name} in {self.url}')
+        column_type = column.type.compile(dialect=self.engine.dialect)
+        with self.engine.begin() as con:
+            con.execute(
+                f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+            )
+
+    def _rebuild_sqlite_table(self, table: Table) -> None:
+        """
+        Recreate SQLite table with the current schema and copy the existing rows.
+
+        :param table:
+        :return: None
+        """
+        logger.info(f'Rebuild table {table.name} in {self.url}')
+        old_name = f'_{table.name}_old'
+        columns = ', '.join(c.name for c in table.columns)
+        with self.engine.begin() as con:
+            # Indexes keep their names when the table is renamed
+            for index in inspect(con).get_indexes(table.name):
+                con.execute(f'DROP INDEX {index["name"]}')
+            con.execute(f'ALTER TABLE {table.name} RENAME TO {old_name}')
+            table.create(con)
+            con.execute(
+                f'INSERT INTO {table.name} ({columns}) SELECT {columns} FROM {old_name}'
+            )
+            con.execute(f'DROP TABLE {old_name}')
+
     def session_scope(self):
         return session_scope(self)
 
@@ -112,6 +273,36 @@ class Database:
                 s.add(row)
         return rows
 
+    def insert_measurements(
+        self, document_id: str, time_s: Iterable[float], torque_Nm: Iterable[float]
+    ) -> int:
+        """
+        Insert torque as a function of time as a single transaction.
+        Unlike bulk_insert(), the rows are inserted with Core statements without creating ORM objects.
+        The measurements are stored as defined by measurement_storage.
+
+        :param document_id: Related document identifier
+        :param time_s: Time since start of data collection in seconds
+        :param torque_Nm: Torque values
+        :return: Number of inserted measurements
+        """
+        time_s = np.asarray(time_s, dtype=np.float64)
+        torque_Nm = np.asarray(torque_Nm, dtype=np.float64)
+        if len(time_s) == 0:
+            return 0
+        t_start = time.perf_counter()
+        with self.engine.begin() as con:
+            if self.measurement_storage == MeasurementStorage.CHUNKS:
+                _insert_measurement_chunks(con, document_id, time_s, torque_Nm)
+            else:
+                _insert_measurement_rows(con, document_id, time_s, torque_Nm)
+        elapsed = time.perf_counter() - t_start
+        logger.debug(
+            f'Inserted {len(time_s)} measurements in {elapsed:.3f} s '
+            f'({len(time_s) / elapsed:.0f} measurements/s)'
+        )
+        return len(time_s)
+
     def clear(self) -> None:
         """
         Truncate all database tables.
@@ -129,7 +320,15 @@ class Database:
 
 
 class DefaultDatabase:
-    SQLITE = Database('sqlite', None, None, None, None, SQLITE_FILENAME)
+    SQLITE = Database(
+        'sqlite',
+        None,
+        None,
+        None,
+        None,
+        SQLITE_FILENAME,
+        sqlite_profile=SQLiteProfile.PERFORMANCE,
+    )
 
 
 Base = declarative_base()
@@ -148,6 +347,111 @@ def _fk_pragma_on_connect(dbapi_con, con_record):
     dbapi_con.execute('pragma foreign_keys=ON')
 
 
+def _insert_measurement_rows(
+    con, document_id: str, time_s: np.ndarray, torque_Nm: np.ndarray
+) -> None:
+    """ Insert measurements as fact_measurement rows with a single executemany() statement. """
+    rows = [
+        {'document_id': document_id, 'time_s': x, 'torque_Nm': y}
+        for x, y in zip(time_s.tolist(), torque_Nm.tolist())
+    ]
+    con.execute(Measurement.__table__.insert(), rows)
+
+
+def _insert_measurement_chunks(
+    con, document_id: str, time_s: np.ndarray, torque_Nm: np.ndarray
+) -> None:
+    """ Insert measurements to fact_measurement_chunk and merge them with existing chunks. """
+    table = MeasurementChunk.__table__
+    order = np.argsort(time_s, kind='stable')
+    time_s, torque_Nm = time_s[order], torque_Nm[order]
+    chunk_indices = np.floor(time_s / MeasurementChunk.duration_s).astype(np.int64)
+    splits = np.flatnonzero(np.diff(chunk_indices)) + 1
+    unique_indices = chunk_indices[np.r_[0, splits]].tolist()
+    existing = {
+        row.chunk_index: row
+        for row in con.execute(
+            table.select().where(
+                (table.c.document_id == document_id)
+                & table.c.chunk_index.in_(unique_indices)
+            )
+        )
+    }
+    for chunk_index, x, y in zip(
+        unique_indices, np.split(time_s, splits), np.split(torque_Nm, splits)
+    ):
+        if chunk_index not in existing:
+            con.execute(
+                table.insert(),
+                document_id=document_id,
+                **MeasurementChunk.encode(chunk_index, x, y),
+            )
+            continue
+        x_old, y_old = MeasurementChunk.decode(existing[chunk_index])
+        x, y = np.concatenate((x_old, x)), np.concatenate((y_old, y))
+        order = np.argsort(x, kind='stable')
+        con.execute(
+            table.update()
+            .where(
+                (table.c.document_id == document_id)
+                & (table.c.chunk_index == chunk_index)
+            )
+            .values(**MeasurementChunk.encode(chunk_index, x[order], y[order]))
+        )
+
+
+def _merge_time_series(
+    *time_series: Tuple[np.ndarray, np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge time series into a single time series in time order.
+
+    :param time_series: Time and torque array tuples, each in time order
+    :return: Time and torque arrays as a tuple
+    """
+    time_series = [(x, y) for x, y in time_series if len(x)]
+    if not time_series:
+        return np.empty(0), np.empty(0)
+    if len(time_series) == 1:
+        return time_series[0]
+    x, y = (np.concatenate(a) for a in zip(*time_series))
+    order = np.argsort(x, kind='stable')
+    return x[order], y[order]
+
+
+def _has_changed_to_float(table: Table, reflected_columns: List[dict]) -> bool:
+    """
+    Return boolean indicating if a table has Float columns that are not Float in the database.
+
+    :param table: Declared table
+    :param reflected_columns: Columns reflected from the database
+    :return:
+    """
+    reflected_types = {c['name']: c['type'] for c in reflected_columns}
+    return any(
+        isinstance(c.type, Float)
+        and c.name in reflected_types
+        and not isinstance(reflected_types[c.name], Float)
+        for c in table.columns
+    )
+
+
+def _rows_to_arrays(rows: List[tuple]) -> Tuple[np.ndarray, ...]:
+    """
+    Convert query result rows to one float64 array per column.
+
+    :param rows: Query result rows
+    :return: Column arrays as a tuple
+    """
+    if not rows:
+        return np.empty(0), np.empty(0)
+    # np.array() is slow with result row objects
+    return tuple(
+        np.fromiter((row[i] for row in rows), dtype=np.float64, count=len(rows))
+        for i in range(len(rows[0]))
+    )
+
+
 def enter_if_not_exists(session: SQLSession, row: Base):
     """
     Enter row to database if it doesn't already exist.
@@ -327,26 +631,127 @@ class Document(Base, DictMixin):
         Numeric, comment='Number of performed full turns (decimals supported)'
     )
 
+    def _time_series_query(self, start_s: float = None, stop_s: float = None):
+        """ Return Core query for time and torque of the related measurements within a time range in time order. """
+        condition = Measurement.document_id == self.document_id
+        if start_s is not None:
+            condition &= Measurement.time_s >= start_s
+        if stop_s is not None:
+            condition &= Measurement.time_s <= stop_s
+        return (
+            select([Measurement.time_s, Measurement.torque_Nm])
+            .where(condition)
+            .order_by(Measurement.time_s)
+        )
+
+    def _chunk_query(self, start_s: float = None, stop_s: float = None):
+        """ Return Core query for the related measurement chunks overlapping a time range in time order. """
+        table = MeasurementChunk.__table__
+        condition = table.c.document_id == self.document_id
+        if start_s is not None:
+            condition &= table.c.time_end_s >= start_s
+        if stop_s is not None:
+            condition &= table.c.time_begin_s <= stop_s
+        return table.select().where(condition).order_by(table.c.chunk_index)
+
     def get_related_time_series(
-        self, database: Database
-    ) -> Tuple[List[float], List[float]]:
+        self, database: Database, start_s: float = None, stop_s: float = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
         Return torque as a function of time related to the document.
+        Measurements from both measurement storages (MeasurementStorage) are returned.
 
         :param database:
-        :return:
+        :param start_s: Return only measurements at or after this time. None for no limit.
+        :param stop_s: Return only measurements at or before this time. None for no limit.
+        :return: Time and torque arrays as a tuple
         """
-        x, y = list(), list()
-        with session_scope(database) as s:
-            measurements = (
-                s.query(Measurement)
-                .filter(Measurement.document_id == self.document_id)
-                .all()
+        with closing(database.engine.connect()) as con:
+            rows = con.execute(self._time_series_query(start_s, stop_s)).fetchall()
+            chunks = [
+                MeasurementChunk.decode(row)
+                for row in con.execute(self._chunk_query(start_s, stop_s)).fetchall()
+            ]
+        if not chunks:
+            return _rows_to_arrays(rows)
+        # Chunks are in time order
+        x, y = (np.concatenate(a) for a in zip(*chunks))
+        if start_s is not None or stop_s is not None:
+            start = 0 if start_s is None else np.searchsorted(x, start_s, side='left')
+            stop = (
+                len(x) if stop_s is None else np.searchsorted(x, stop_s, side='right')
+            )
+            x, y = x[start:stop], y[start:stop]
+        return _merge_time_series(_rows_to_arrays(rows), (x, y))
+
+    def iter_related_time_series(
+        self, database: Database, chunk_size: int = 100000
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Iterate over torque as a function of time related to the document in chunks.
+        Measurements from fact_measurement are iterated first, followed by the stored measurement chunks
+        (one stored chunk at a time).
+
+        :param database:
+        :param chunk_size: Maximum number of measurements from fact_measurement in a chunk
+        :return: Iterator of time and torque array tuples
+        """
+        with closing(database.engine.connect()) as con:
+            result = con.execution_options(stream_results=True).execute(
+                self._time_series_query()
             )
-            if len(measurements) == 0:
-                return x, y
-            x, y = zip(*[(float(m.time_s), float(m.torque_Nm)) for m in measurements])
-        return x, y
+            while True:
+                rows = result.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield _rows_to_arrays(rows)
+            for row in con.execution_options(stream_results=True).execute(
+                self._chunk_query()
+            ):
+                yield MeasurementChunk.decode(row)
+
+    def build_pyramid(
+        self, database: Database, time_series: Tuple[np.ndarray, np.ndarray] = None,
+    ) -> int:
+        """
+        Build the min/max pyramid of the related time series (see MeasurementPyramid) and store it in the
+        database, replacing an existing pyramid. Call after all measurements have been inserted.
+
+        :param database:
+        :param time_series: Related time series (see get_related_time_series()). None to read from the database.
+        :return: Number of stored pyramid blocks
+        """
+        t_start = time.perf_counter()
+        if time_series is None:
+            time_series = self.get_related_time_series(database)
+        pyramid = MinMaxPyramid(*time_series, factor=MeasurementPyramid.factor)
+        table = MeasurementPyramid.__table__
+        rows = [
+            dict(document_id=self.document_id, **block)
+            for level, bins in enumerate(pyramid.levels, start=1)
+            for block in MeasurementPyramid.encode(level, bins, len(pyramid))
+        ]
+        with database.engine.begin() as con:
+            con.execute(table.delete().where(table.c.document_id == self.document_id))
+            if rows:
+                con.execute(table.insert(), rows)
+        logger.debug(
+            f'Built pyramid of {len(pyramid)} measurements ({len(rows)} blocks) '
+            f'in {time.perf_counter() - t_start:.3f} s'
+        )
+        return len(rows)
+
+    def get_related_pyramid(self, database: Database) -> 'DocumentPyramid':
+        """
+        Return the stored min/max pyramid of the related time series. The pyramid is built if needed.
+
+        :param database:
+        :return: DocumentPyramid
+        """
+        pyramid = DocumentPyramid(database, self)
+        if pyramid.sample_count == 0 and self.build_pyramid(database):
+            pyramid = DocumentPyramid(database, self)
+        return pyramid
 
     def get_related_events(self, database: Database) -> List['AnnotatedEvent']:
         """
@@ -378,22 +783,17 @@ class Document(Base, DictMixin):
 
     def insert_time_series(
         self, database: Database, time_s: Iterable[float], torque_Nm: Iterable[float]
-    ) -> List['Measurement']:
+    ) -> int:
         """
         Insert torque as a function of time to database.
 
         :param database:
         :param time_s:
         :param torque_Nm:
-        :return:
+        :return: Number of inserted measurements
         """
         # Insert entire time series in one transaction
-        measurements = [
-            Measurement(document_id=self.document_id, time_s=x, torque_Nm=y)
-            for x, y in zip(time_s, torque_Nm)
-        ]
-        database.bulk_insert(measurements)
-        return measurements
+        return database.insert_measurements(self.document_id, time_s, torque_Nm)
 
 
 class AnnotatedEvent(Base, DictMixin):
@@ -420,17 +820,300 @@ class AnnotatedEvent(Base, DictMixin):
         'If false, the event did occur but the operator failed to record it.',
         nullable=False,
     )
+    peak_torque_Nm = Column(Float, comment='Maximum torque in the event region')
+    mean_torque_Nm = Column(Float, comment='Mean torque in the event region')
+    torque_integral_Nms = Column(
+        Float, comment='Integral of torque over time in the event region'
+    )
+    duration_s = Column(Float, comment='Duration of the event region in seconds')
 
 
 class Measurement(Base, DictMixin):
     __tablename__ = 'fact_measurement'
+    __table_args__ = (
+        # Covering index for reading the time series of a document in time order
+        Index(
+            'ix_fact_measurement_document_id_time_s',
+            'document_id',
+            'time_s',
+            'torque_Nm',
+        ),
+    )
     measurement_id = Column(Integer, primary_key=True, autoincrement=True)
     document_id = Column(String, ForeignKey(Document.document_id), nullable=False)
     time_s = Column(
-        Numeric,
-        nullable=False,
-        comment='Time since start of data collection in seconds',
+        Float, nullable=False, comment='Time since start of data collection in seconds'
     )
     torque_Nm = Column(
-        Numeric, nullable=False, comment='Torque measured from the torque sensor'
+        Float, nullable=False, comment='Torque measured from the torque sensor'
+    )
+
+
+class MeasurementChunk(Base, DictMixin):
+    """
+    Compressed measurements of a document within a fixed-duration time window.
+
+    Time is stored as delta-encoded integer microseconds from the start of the window (int32) and
+    torque as float32 with the bytes of the values shuffled (i.e., the n-th bytes of all values stored together).
+    Both are compressed with zlib.
+    """
+
+    __tablename__ = 'fact_measurement_chunk'
+    # Duration of the time window of each chunk (in seconds). Changing it invalidates stored chunks.
+    duration_s = 10
+    document_id = Column(String, ForeignKey(Document.document_id), primary_key=True)
+    chunk_index = Column(
+        Integer,
+        primary_key=True,
+        comment='Time window number (window begins at chunk_index * duration_s seconds)',
+    )
+    sample_count = Column(Integer, nullable=False, comment='Number of measurements')
+    time_begin_s = Column(
+        Float, nullable=False, comment='Time of the first measurement'
+    )
+    time_end_s = Column(Float, nullable=False, comment='Time of the last measurement')
+    torque_min_Nm = Column(Float, comment='Minimum torque')
+    torque_max_Nm = Column(Float, comment='Maximum torque')
+    time_data = Column(
+        LargeBinary, nullable=False, comment='Compressed delta-encoded time (us)'
+    )
+    torque_data = Column(
+        LargeBinary, nullable=False, comment='Compressed byte-shuffled torque (float32)'
+    )
+
+    @classmethod
+    def encode(
+        cls, chunk_index: int, time_s: np.ndarray, torque_Nm: np.ndarray
+    ) -> dict:
+        """
+        Encode measurements within a time window.
+
+        :param chunk_index: Time window number
+        :param time_s: Time in seconds in time order
+        :param torque_Nm: Torque values
+        :return: Column values (except document_id) as a dictionary
+        """
+        time_us = np.round((time_s - chunk_index * cls.duration_s) * 1e6).astype(
+            np.int64
+        )
+        time_delta_us = np.diff(time_us, prepend=0).astype('<i4')
+        torque_bytes = (
+            np.asarray(torque_Nm, dtype='<f4').view(np.uint8).reshape(-1, 4).T
+        )
+        return {
+            'chunk_index': chunk_index,
+            'sample_count': len(time_s),
+            'time_begin_s': float(time_s[0]),
+            'time_end_s': float(time_s[-1]),
+            'torque_min_Nm': float(np.nanmin(torque_Nm)),
+            'torque_max_Nm': float(np.nanmax(torque_Nm)),
+            'time_data': zlib.compress(time_delta_us.tobytes()),
+            'torque_data': zlib.compress(np.ascontiguousarray(torque_bytes).tobytes()),
+        }
+
+    @classmethod
+    def decode(cls, chunk) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Decode measurements of a chunk.
+
+        :param chunk: MeasurementChunk or a fact_measurement_chunk row
+        :return: Time and torque arrays (float64) as a tuple
+        """
+        time_delta_us = np.frombuffer(zlib.decompress(chunk.time_data), dtype='<i4')
+        time_us = np.cumsum(time_delta_us, dtype=np.int64)
+        time_s = chunk.chunk_index * cls.duration_s + time_us * 1e-6
+        torque_bytes = np.frombuffer(zlib.decompress(chunk.torque_data), dtype=np.uint8)
+        torque_Nm = np.ascontiguousarray(torque_bytes.reshape(4, -1).T).view('<f4')
+        return time_s, torque_Nm.ravel().astype(np.float64)
+
+
+class MeasurementPyramid(Base, DictMixin):
+    """
+    Block of the min/max pyramid of the time series of a document (see cranio.lod.MinMaxPyramid).
+
+    Each decimated level is stored in blocks of up to block_size bins (zlib-compressed BIN_DTYPE records),
+    so that a time window of a level is read without reading the whole level.
+    """
+
+    __tablename__ = 'fact_measurement_pyramid'
+    # Number of bins merged into one between consecutive levels
+    factor = 4
+    # Maximum number of bins in a block
+    block_size = 1024
+    document_id = Column(String, ForeignKey(Document.document_id), primary_key=True)
+    level = Column(
+        Integer,
+        primary_key=True,
+        comment='Pyramid level (level n bins consist of factor ** n measurements)',
+    )
+    block_index = Column(
+        Integer, primary_key=True, comment='Block number in time order'
     )
+    bin_count = Column(Integer, nullable=False, comment='Number of bins')
+    sample_count = Column(
+        Integer, nullable=False, comment='Number of measurements in the bins'
+    )
+    time_begin_s = Column(Float, nullable=False, comment='Start time of the first bin')
+    time_end_s = Column(Float, nullable=False, comment='End time of the last bin')
+    bin_data = Column(LargeBinary, nullable=False, comment='Compressed bins')
+
+    @classmethod
+    def encode(cls, level: int, bins: np.ndarray, sample_count: int) -> List[dict]:
+        """
+        Encode the bins of a level in blocks.
+
+        :param level: Pyramid level
+        :param bins: Structured array in time order (see cranio.lod.BIN_DTYPE)
+        :param sample_count: Number of measurements in the level
+        :return: Column values (except document_id) of each block as a list of dictionaries
+        """
+        samples_per_bin = cls.factor ** level
+        blocks = []
+        for block_index, start in enumerate(range(0, len(bins), cls.block_size)):
+            block = bins[start : start + cls.block_size]
+            stop = start + len(block)
+            blocks.append(
+                {
+                    'level': level,
+                    'block_index': block_index,
+                    'bin_count': len(block),
+                    # The last bin of a level may contain less measurements
+                    'sample_count': min(stop * samples_per_bin, sample_count)
+                    - start * samples_per_bin,
+                    'time_begin_s': float(block['x_start'][0]),
+                    'time_end_s': float(block['x_stop'][-1]),
+                    'bin_data': zlib.compress(block.tobytes()),
+                }
+            )
+        return blocks
+
+    @classmethod
+    def decode(cls, block) -> np.ndarray:
+        """
+        Decode the bins of a block.
+
+        :param block: MeasurementPyramid or a fact_measurement_pyramid row
+        :return: Structured array (see cranio.lod.BIN_DTYPE)
+        """
+        return np.frombuffer(zlib.decompress(block.bin_data), dtype=BIN_DTYPE)
+
+
+class DocumentPyramid:
+    """
+    Stored min/max pyramid of the time series of a document for drawing it at any zoom level.
+    Implements the drawing interface of cranio.lod.MinMaxPyramid, but only the blocks of the level and the
+    time window needed are read from the database. When zoomed in beyond level 1, the measurements within
+    the time window are read instead.
+    """
+
+    # Maximum number of decoded blocks kept in memory (more if a single time range needs more blocks)
+    cache_size = 64
+
+    def __init__(self, database: Database, document: Document):
+        """
+        :param database:
+        :param document:
+        """
+        self.database = database
+        self.document = document
+        self.factor = MeasurementPyramid.factor
+        self._cache = {}
+        table = MeasurementPyramid.__table__
+        # The top level consists of a single bin
+        with closing(database.engine.connect()) as con:
+            top = con.execute(
+                select(
+                    [
+                        table.c.level,
+                        table.c.sample_count,
+                        table.c.time_begin_s,
+                        table.c.time_end_s,
+                    ]
+                )
+                .where(table.c.document_id == document.document_id)
+                .order_by(table.c.level.desc())
+                .limit(1)
+            ).first()
+        if top is None:
+            self.level_count, self.sample_count = 0, 0
+            self.time_begin_s = self.time_end_s = None
+        else:
+            self.level_count, self.sample_count = top.level, top.sample_count
+            self.time_begin_s, self.time_end_s = top.time_begin_s, top.time_end_s
+
+    def __len__(self):
+        return self.sample_count
+
+    def x_range(self) -> Tuple[float, float]:
+        """ Return the time of the first and the last measurement. """
+        return self.time_begin_s, self.time_end_s
+
+    def _get_bins(self, level: int, start_s: float, stop_s: float) -> np.ndarray:
+        """ Return the bins of a level in the blocks overlapping a time range. """
+        table = MeasurementPyramid.__table__
+        with closing(self.database.engine.connect()) as con:
+            keys = con.execute(
+                select([table.c.block_index])
+                .where(
+                    (table.c.document_id == self.document.document_id)
+                    & (table.c.level == level)
+                    & (table.c.time_end_s >= start_s)
+                    & (table.c.time_begin_s <= stop_s)
+                )
+                .order_by(table.c.block_index)
+            ).fetchall()
+            keys = [(level, row.block_index) for row in keys]
+            missing = [
+                block_index
+                for _, block_index in keys
+                if (level, block_index) not in self._cache
+            ]
+            if missing:
+                if len(self._cache) + len(missing) > self.cache_size:
+                    # Keep the cached blocks of this time range
+                    self._cache = {
+                        key: bins for key, bins in self._cache.items() if key in keys
+                    }
+                for row in con.execute(
+                    table.select().where(
+                        (table.c.document_id == self.document.document_id)
+                        & (table.c.level == level)
+                        & table.c.block_index.in_(missing)
+                    )
+                ):
+                    self._cache[(level, row.block_index)] = MeasurementPyramid.decode(
+                        row
+                    )
+        if not keys:
+            return np.empty(0, dtype=BIN_DTYPE)
+        return np.concatenate([self._cache[key] for key in keys])
+
+    def window(
+        self, x_start: float, x_stop: float, max_points: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return points for drawing the time range [x_start, x_stop] (see cranio.lod.MinMaxPyramid.window()).
+
+        :param x_start: Start of the time range in seconds
+        :param x_stop: End of the time range in seconds
+        :param max_points: Maximum number of points (roughly two per pixel column)
+        :return: Time and torque arrays as a tuple
+        """
+        if self.sample_count == 0:
+            return np.empty(0), np.empty(0)
+        x_start, x_stop = max(x_start, self.time_begin_s), min(x_stop, self.time_end_s)
+        if x_start > x_stop:
+            return np.empty(0), np.empty(0)
+        # Assume a constant sample rate
+        duration = self.time_end_s - self.time_begin_s
+        fraction = (x_stop - x_start) / duration if duration > 0 else 1
+        count = int(np.ceil(fraction * self.sample_count))
+        level = level_for(count, max_points, self.factor, self.level_count)
+        if level == 0:
+            # Include one sample period beyond the range on both sides
+            margin = duration / max(self.sample_count - 1, 1)
+            return self.document.get_related_time_series(
+                self.database, x_start - margin, x_stop + margin
+            )
+        bins = self._get_bins(level, x_start, x_stop)
+        return bins_to_points(window_bins(bins, x_start, x_stop))
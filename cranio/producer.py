@@ -1,58 +1,350 @@
 """
 Data producers and processes.
 """
+import bisect
 import datetime
 import time
+import threading
+import queue as queue_module
 import multiprocessing as mp
-import pandas as pd
 import numpy as np
-from typing import Iterable, List, Tuple
+from collections import namedtuple
+from typing import Iterable, List, Tuple, Optional
 from contextlib import contextmanager
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # Python < 3.8
+    shared_memory = None
 from cranio.utils import (
     random_value_generator,
     logger,
     generate_unique_id,
-    utc_datetime,
+    monotonic_ns,
+    monotonic_to_utc_offset_ns,
+    datetime_to_ns,
 )
 from cranio.model import SensorInfo, Document, Database
+from cranio.constants import SAMPLE_RATE_HZ
+
+
+# Name of the sample time field in sample batches. Sensors stamp samples with monotonic_ns(), and
+# ProducerProcess.utc_offset_ns converts the stamps to UTC+0 nanoseconds since epoch.
+TIME_FIELD = 'time_ns'
+# Recording start time (see ProducerProcess) before the process has started reading: all samples are discarded
+NOT_ANCHORED_NS = np.iinfo(np.int64).max
 
 
 class SensorError(Exception):
     pass
 
 
-def get_all_from_queue(queue) -> Tuple[List, List]:
+def sample_dtype(channels: Iterable[str]) -> np.dtype:
     """
+    Return structured data type for a sample batch with one value per channel.
+
+    :param channels: Channel names
+    :return: Structured data type with a time field and a value field for each channel
+    """
+    return np.dtype([(TIME_FIELD, np.int64)] + [(str(c), np.float64) for c in channels])
+
+
+def get_all_from_queue(queue) -> np.ndarray:
+    """
+    Get all sample batches currently available in a queue.
 
     :param queue:
-    :return: Index and value arrays as a tuple
+    :return: Sample batches concatenated into a single structured array
     """
-    index_arr, value_arr = [], []
-    while not queue.empty():
-        index, value = queue.get()
-        index_arr.append(index)
-        value_arr.append(value)
-    return index_arr, value_arr
+    batches = []
+    while True:
+        try:
+            item = queue.get_nowait()
+        except queue_module.Empty:
+            break
+        # Skip pause markers (see QueueTransport.mark())
+        if isinstance(item, np.ndarray):
+            batches.append(item)
+    if not batches:
+        return np.empty(0, dtype=sample_dtype([]))
+    return np.concatenate(batches)
+
+
+class TransportType:
+    QUEUE = 'queue'
+    SHARED_MEMORY = 'shared_memory'
+
+
+class QueueTransport:
+    """ Transport sample batches from a producer process to a consumer via a multiprocessing queue. """
 
+    # Maximum time (in seconds) a sample is kept in a batch before it is pushed to the transport
+    batch_interval = 0.02
 
-def datetime_to_seconds(
-    array: Iterable[datetime.datetime], t0: datetime.datetime
-) -> Iterable[float]:
+    def __init__(self):
+        self.queue = mp.Queue()
+        # Batches received while waiting for a pause marker (see wait_for_mark())
+        self._received = []
+
+    def create(self, dtype: np.dtype) -> None:
+        """ Dummy method. """
+        pass
+
+    def put(self, batch: np.ndarray) -> None:
+        """
+        Push a sample batch to the transport.
+
+        :param batch: Structured array
+        :return: None
+        """
+        self.queue.put(batch)
+
+    def mark(self, number: int) -> None:
+        """
+        Push a pause marker after the batches pushed so far. A batch put to a multiprocessing queue is sent
+        by a feeder thread of the producer process, so the batches may still be in transit when the
+        producer has paused. The consumer receives the marker after all of them (see wait_for_mark()).
+
+        :param number: Pause number
+        :return: None
+        """
+        self.queue.put(number)
+
+    def wait_for_mark(self, number: int, timeout: float) -> bool:
+        """
+        Receive batches until a pause marker with at least the specified number has been received.
+        The received batches are returned by the next get_all() call.
+
+        :param number: Pause number
+        :param timeout: Wait timeout in seconds
+        :return: True if the marker was received, False on timeout
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue_module.Empty:
+                return False
+            if isinstance(item, np.ndarray):
+                self._received.append(item)
+            elif item >= number:
+                return True
+
+    def get_all(self) -> np.ndarray:
+        """
+        Get all sample batches currently available in the transport.
+
+        :return: Structured array
+        """
+        batch = get_all_from_queue(self.queue)
+        if not self._received:
+            return batch
+        batches, self._received = self._received, []
+        if len(batch) > 0:
+            batches.append(batch)
+        return np.concatenate(batches)
+
+    def close(self) -> None:
+        """ Dummy method. """
+        pass
+
+
+class SharedMemoryTransport:
     """
-    Convert datetime to difference in seconds between a reference datetime.
+    Transport samples from a producer process to a consumer via a ring buffer in shared memory.
 
-    :param array: Datetime iterable
-    :param t0: Reference datetime against which the time difference is calculated
-    :return: Float iterable
+    The shared memory block starts with two int64 counters, head (total number of samples written) and
+    tail (total number of samples read), followed by the sample records. The producer is the only writer
+    of head and the consumer the only writer of tail, and each counter is updated only after the
+    corresponding records have been written or read. Therefore, no locks are needed for a single producer
+    and a single consumer.
     """
-    # Conversion to pd.Timestamp for datetime and np.datetime support
-    def to_total_seconds(x):
-        return (pd.Timestamp(x) - t0).total_seconds()
 
+    # Samples are pushed to shared memory immediately
+    batch_interval = 0
+    # Time (in seconds) to wait for free space before checking again
+    wait_interval = 0.001
+
+    def __init__(self, capacity: int = 2 ** 16):
+        """
+
+        :param capacity: Number of sample records in the ring buffer
+        """
+        if shared_memory is None:
+            raise RuntimeError('Shared memory transport requires Python 3.8 or newer')
+        self.capacity = capacity
+        self.dtype = None
+        self._shm = None
+        self._counters = None
+        self._records = None
+        self._read_until = None
+
+    def __getstate__(self):
+        # Shared memory is attached by name in the unpickled copy
+        state = self.__dict__.copy()
+        state.update(_shm=None, _counters=None, _records=None)
+        state['_name'] = None if self._shm is None else self._shm.name
+        return state
+
+    def __setstate__(self, state):
+        name = state.pop('_name')
+        self.__dict__.update(state)
+        if name is not None:
+            self._attach(shared_memory.SharedMemory(name=name))
+
+    def _attach(self, shm) -> None:
+        self._shm = shm
+        self._counters = np.ndarray((2,), dtype=np.int64, buffer=shm.buf)
+        self._records = np.ndarray(
+            (self.capacity,), dtype=self.dtype, buffer=shm.buf, offset=16
+        )
+
+    def create(self, dtype: np.dtype) -> None:
+        """
+        Allocate the shared memory block for samples of specified data type.
+        Needs to be called before the producer process is started.
+
+        :param dtype: Structured data type (see sample_dtype)
+        :return: None
+        """
+        if self._shm is not None:
+            if dtype == self.dtype:
+                return
+            self.close()
+        self.dtype = np.dtype(dtype)
+        size = 16 + self.capacity * self.dtype.itemsize
+        self._attach(shared_memory.SharedMemory(create=True, size=size))
+        self._counters[:] = 0
+        self._read_until = None
+
+    def put(self, batch: np.ndarray) -> None:
+        """
+        Write a sample batch to the ring buffer. If the ring buffer is full, wait until the consumer
+        has read enough samples.
+
+        :param batch: Structured array
+        :return: None
+        """
+        for start in range(0, len(batch), self.capacity):
+            self._put(batch[start : start + self.capacity])
+
+    def _put(self, batch: np.ndarray) -> None:
+        n = len(batch)
+        head = int(self._counters[0])
+        warned = False
+        while self.capacity - (head - int(self._counters[1])) < n:
+            if not warned:
+                logger.warning(
+                    'Shared memory ring buffer is full. Waiting for consumer'
+                )
+                warned = True
+            time.sleep(self.wait_interval)
+        i = head % self.capacity
+        first = min(n, self.capacity - i)
+        self._records[i : i + first] = batch[:first]
+        self._records[: n - first] = batch[first:]
+        # Publish the samples
+        self._counters[0] = head + n
+
+    def mark(self, number: int) -> None:
+        """ Dummy method. Samples are available to the consumer as soon as put() returns. """
+        pass
+
+    def wait_for_mark(self, number: int, timeout: float) -> bool:
+        """ Dummy method (see mark()). """
+        return True
+
+    def get_all(self) -> np.ndarray:
+        """
+        Get all samples currently available in the ring buffer.
+        The returned array is a view to shared memory if the samples are contiguous in the ring buffer.
+        The view is valid until the next call.
+
+        :return: Structured array
+        """
+        self.release()
+        tail = int(self._counters[1])
+        head = int(self._counters[0])
+        i = tail % self.capacity
+        n = head - tail
+        if i + n <= self.capacity:
+            batch = self._records[i : i + n]
+        else:
+            batch = np.concatenate(
+                (self._records[i:], self._records[: n - (self.capacity - i)])
+            )
+        self._read_until = head
+        return batch
+
+    def release(self) -> None:
+        """
+        Release the samples returned by the previous get_all() call so that they can be overwritten.
+
+        :return: None
+        """
+        if self._read_until is not None:
+            self._counters[1] = self._read_until
+            self._read_until = None
+
+    def close(self) -> None:
+        """
+        Free the shared memory block.
+
+        :return: None
+        """
+        if self._shm is None:
+            return
+        self._counters = None
+        self._records = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+
+def create_transport(transport_type: str):
+    """
+    Create a transport for sample batches.
+
+    :param transport_type: Transport type (see TransportType)
+    :return: Transport object
+    :raises ValueError: if invalid transport type
+    """
+    transports = {
+        TransportType.QUEUE: QueueTransport,
+        TransportType.SHARED_MEMORY: SharedMemoryTransport,
+    }
     try:
-        return list(map(to_total_seconds, array))
-    except TypeError:
-        return to_total_seconds(array)
+        return transports[transport_type]()
+    except KeyError:
+        raise ValueError(f'Invalid transport type {transport_type}')
+
+
+def to_ns(value) -> np.ndarray:
+    """
+    Convert timestamps to nanoseconds since epoch.
+
+    :param value: Timestamp or array-like of timestamps (naive UTC+0 datetime, np.datetime64 or
+        nanoseconds since epoch)
+    :return: int64 array (0-d array for a single timestamp)
+    """
+    arr = np.asarray(value)
+    if arr.dtype.kind in 'iu':
+        return arr.astype(np.int64, copy=False)
+    return arr.astype('datetime64[ns]').view(np.int64)
+
+
+def datetime_to_seconds(array, t0) -> np.ndarray:
+    """
+    Convert timestamps to difference in seconds between a reference timestamp.
+
+    :param array: Timestamp or array-like of timestamps (naive UTC+0 datetime, np.datetime64 or
+        nanoseconds since epoch)
+    :param t0: Reference timestamp against which the time difference is calculated
+    :return: Float array (float for a single timestamp)
+    """
+    seconds = (to_ns(array) - to_ns(t0)) * 1e-9
+    return seconds[()] if seconds.ndim == 0 else seconds
 
 
 @contextmanager
@@ -91,6 +383,176 @@ class ChannelInfo:
         return self.strfmt.format(self=self)
 
 
+# Acquisition statistics: number of reads, number of overruns (reads started more than one period late)
+# and mean and maximum jitter (delay of read start from the deadline) in seconds
+SchedulerStats = namedtuple(
+    'SchedulerStats', ['reads', 'overruns', 'mean_jitter_s', 'max_jitter_s']
+)
+
+
+class AcquisitionScheduler:
+    """
+    Schedule reads at a target rate using a monotonic deadline clock.
+
+    Deadlines advance by exactly one period per read so that the rate does not drift with sleep and read
+    durations. After an overrun, the deadlines are resynchronized to the current time instead of
+    reading in a burst to catch up.
+    """
+
+    def __init__(self, rate_hz: Optional[float] = SAMPLE_RATE_HZ):
+        """
+
+        :param rate_hz: Target read rate. None to read as fast as possible.
+        """
+        self.period = 1 / rate_hz if rate_hz else 0
+        self.reset()
+
+    def reset(self) -> None:
+        """ Reset deadlines and statistics. The next read is due immediately. """
+        self.deadline = -float('inf')
+        self._reads = 0
+        self._overruns = 0
+        self._jitter_sum = 0.0
+        self._jitter_max = 0.0
+
+    def wait(self) -> None:
+        """ Sleep until the next read is due. """
+        delay = self.deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def tick(self, now: float = None) -> None:
+        """
+        Record a read and advance the deadline.
+
+        :param now: Read start time (time.perf_counter()). None for current time.
+        :return: None
+        """
+        if now is None:
+            now = time.perf_counter()
+        self._reads += 1
+        if self.deadline == -float('inf') or self.period == 0:
+            self.deadline = now + self.period
+            return
+        jitter = now - self.deadline
+        self._jitter_sum += jitter
+        self._jitter_max = max(self._jitter_max, jitter)
+        if jitter > self.period:
+            self._overruns += 1
+            self.deadline = now + self.period
+        else:
+            self.deadline += self.period
+
+    def stats(self) -> SchedulerStats:
+        """
+        Return acquisition statistics since the last reset.
+
+        :return: SchedulerStats
+        """
+        # The first read has no deadline
+        n = max(self._reads - 1, 1)
+        return SchedulerStats(
+            self._reads, self._overruns, self._jitter_sum / n, self._jitter_max
+        )
+
+
+# Sensor reader statistics: number of reads, read rate (Hz) since start and
+# mean and maximum duration of Sensor.read() in seconds
+ReaderStats = namedtuple(
+    'ReaderStats', ['reads', 'rate_hz', 'mean_latency_s', 'max_latency_s']
+)
+
+
+class SensorReader:
+    """ Read a sensor at its target rate in a thread and push the samples to a merge queue. """
+
+    def __init__(
+        self,
+        sensor: 'Sensor',
+        scheduler: AcquisitionScheduler,
+        samples: queue_module.Queue,
+    ):
+        """
+
+        :param sensor: Sensor to be read
+        :param scheduler: Acquisition scheduler of the sensor
+        :param samples: Merge queue for (timestamp, value dictionary) tuples
+        """
+        self.sensor = sensor
+        self.scheduler = scheduler
+        self.samples = samples
+        # Exception raised by Sensor.read(). The reader stops on exception.
+        self.error = None
+        # Stamp of the last sample put to the merge queue (see monotonic_ns()). The sensor stamps samples in
+        # time order, so later samples are stamped after it.
+        self.last_stamp = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started = None
+        self._reads = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+    def start(self) -> None:
+        """ Start reading in a thread. """
+        self._stop_event.clear()
+        self._started = time.perf_counter()
+        # Samples of this run are stamped after the start
+        self.last_stamp = monotonic_ns()
+        self._reads = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._thread = threading.Thread(
+            name=f'{type(self.sensor).__name__} reader', target=self._run, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """ Stop reading and wait for the thread to finish. """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        """ Reader thread main loop. """
+        while not self._stop_event.is_set():
+            self.scheduler.wait()
+            t_start = time.perf_counter()
+            self.scheduler.tick(t_start)
+            try:
+                sample = self.sensor.read()
+            except Exception as e:
+                logger.exception(f'{type(self.sensor).__name__} read failed')
+                self.error = e
+                break
+            latency = time.perf_counter() - t_start
+            self._reads += 1
+            self._latency_sum += latency
+            self._latency_max = max(self._latency_max, latency)
+            self.samples.put(sample)
+            self.last_stamp = sample[0]
+
+    def stats(self) -> ReaderStats:
+        """
+        Return reader statistics since start.
+
+        :return: ReaderStats
+        """
+        if self._started is None:
+            return ReaderStats(0, 0.0, 0.0, 0.0)
+        elapsed = time.perf_counter() - self._started
+        return ReaderStats(
+            self._reads,
+            self._reads / elapsed,
+            self._latency_sum / max(self._reads, 1),
+            self._latency_max,
+        )
+
+
 class Sensor:
     """
     Sensor for recording one or more input channels. Channels are stored as ChannelInfo objects.
@@ -101,6 +563,8 @@ class Sensor:
     sensor_info = SensorInfo(
         sensor_serial_number='DUMMY53N50RFTW', turns_in_full_turn=3
     )
+    # Target read rate (Hz) when recorded by a Producer. None to read as fast as possible.
+    rate_hz = SAMPLE_RATE_HZ
 
     def __init__(self):
         self.channels = []
@@ -114,6 +578,10 @@ class Sensor:
         """ Dummy method. """
         pass
 
+    def reset(self):
+        """ Discard pending input (e.g., replies to earlier requests) after a pause. Dummy method. """
+        pass
+
     def self_test(self) -> bool:
         """
         Self test the sensor by opening and closing the port.
@@ -144,23 +612,18 @@ class Sensor:
         """
         return self.channels.remove(channel_info)
 
-    def read(self) -> Tuple[datetime.datetime, dict]:
+    def read(self) -> Tuple[int, dict]:
         """
         Read values from the registered input channels.
 
-        :return: Datetime and value dictionary as a tuple
+        :return: Timestamp (see monotonic_ns()) and value dictionary as a tuple
         """
         if len(self.channels) == 0:
             return None
         values = {}
         for c in self.channels:
             values[str(c)] = self.value_generator()
-        # Sleep for 10 ms to slow down the sampling
-        # If there is no wait between consecutive read() calls,
-        # Too much data is generated for a plot widget to handle
-        time.sleep(0.01)
-        # Use UTC+0 time
-        return utc_datetime(), values
+        return monotonic_ns(), values
 
     @classmethod
     def enter_info_to_database(cls, database: Database) -> SensorInfo:
@@ -171,11 +634,40 @@ class Sensor:
 
 
 class Producer:
-    """ Data producer for recording one or more input sensors. """
+    """
+    Data producer for recording one or more input sensors.
+    Each sensor is read at its target rate (Sensor.rate_hz) with an AcquisitionScheduler.
+    The read samples are accumulated into a structured array (see sample_dtype) and
+    pushed to a queue in batches.
 
-    def __init__(self):
+    In concurrent mode, each sensor is read by its own SensorReader thread and read() merges the samples
+    from all readers in time order (see _merge()). Otherwise, the sensors are read sequentially in read().
+    """
+
+    # Maximum number of samples in a batch
+    batch_size = 256
+    # Maximum time (in seconds) a sample is kept in a batch before the batch is pushed to the queue
+    batch_interval = 0.02
+    # Maximum time (in seconds) read() waits for samples from the readers in concurrent mode
+    merge_timeout = 0.01
+
+    def __init__(self, concurrent: bool = False):
+        """
+
+        :param concurrent: Read each sensor in its own thread
+        """
         self.sensors = []
+        self.schedulers = []
+        self.concurrent = concurrent
+        self.readers = []
+        # Merge queue of the readers (created when the readers are started)
+        self._samples = None
+        # Merged samples held back until all readers have put the samples stamped before them (see _merge())
+        self._held = []
         self.id = generate_unique_id()
+        self._batch = None
+        self._batch_length = 0
+        self._batch_started = None
 
     def open(self):
         """ Open all sensor ports. """
@@ -183,10 +675,81 @@ class Producer:
             s.open()
 
     def close(self):
-        """ Close all sensor ports. """
+        """ Stop sensor readers and close all sensor ports. """
+        self.stop_readers()
         for s in self.sensors:
             s.close()
 
+    def start_readers(self) -> None:
+        """ Start a reader thread for each sensor (concurrent mode). """
+        self._samples = queue_module.Queue()
+        self._held = []
+        self.readers = [
+            SensorReader(sensor, scheduler, self._samples)
+            for sensor, scheduler in zip(self.sensors, self.schedulers)
+        ]
+        for reader in self.readers:
+            reader.start()
+
+    def stop_readers(self, queue: mp.Queue = None) -> None:
+        """
+        Stop the reader threads (concurrent mode). If a queue is specified, samples remaining in
+        the merge queue are added to the current batch (full batches are pushed to the queue).
+        Call flush() to push the rest of the batch to the queue.
+
+        :param queue:
+        :return: None
+        """
+        if not self.readers:
+            return
+        for reader in self.readers:
+            reader.stop()
+        remaining = self._merge(final=True)
+        if queue is not None:
+            for index, value_dict in remaining:
+                self._append_to_batch(index, value_dict, queue)
+        self.readers = []
+
+    def reader_stats(self) -> List[ReaderStats]:
+        """
+        Return statistics of the reader threads (concurrent mode).
+
+        :return: List of ReaderStats in sensor registration order
+        """
+        return [reader.stats() for reader in self.readers]
+
+    def _merge(
+        self, timeout: float = None, final: bool = False
+    ) -> List[Tuple[int, dict]]:
+        """
+        Get the samples from the merge queue in time order.
+
+        A reader may stamp a sample before the previous call but put it to the merge queue after the call.
+        Therefore, only samples stamped up to the watermark, i.e., the earliest of the last stamps put by
+        the readers, are returned. Later samples are held back until the next call, so the returned samples
+        are in time order across calls. The latency is at most the read period of the slowest reader.
+
+        :param timeout: Time to wait for the first sample in seconds. None for no waiting.
+        :param final: Return all samples (i.e., the readers have been stopped)
+        :return: List of timestamp and value dictionary tuples
+        """
+        # Take the watermark before draining: the samples stamped up to it have been put to the queue
+        watermark = min((reader.last_stamp for reader in self.readers), default=None)
+        samples, self._held = self._held, []
+        try:
+            if timeout is not None:
+                samples.append(self._samples.get(timeout=timeout))
+            while True:
+                samples.append(self._samples.get_nowait())
+        except queue_module.Empty:
+            pass
+        samples.sort(key=lambda sample: sample[0])
+        if final or watermark is None:
+            return samples
+        split = bisect.bisect_right([sample[0] for sample in samples], watermark)
+        self._held = samples[split:]
+        return samples[:split]
+
     def register_sensor(self, sensor: Sensor) -> None:
         """
         Register an input sensor with the producer.
@@ -199,6 +762,7 @@ class Producer:
         if not sensor.self_test():
             raise SensorError(f'{type(sensor).__name__} did not pass self test')
         self.sensors.append(sensor)
+        self.schedulers.append(AcquisitionScheduler(sensor.rate_hz))
 
     def unregister_sensor(self, sensor: Sensor):
         """
@@ -209,25 +773,102 @@ class Producer:
         :raises ValueError: if sensor is not registered
         """
         try:
-            self.sensors.remove(sensor)
+            i = self.sensors.index(sensor)
         except ValueError:
             raise ValueError(
                 f'{type(sensor).__name__} is not registered with the producer'
             )
+        del self.sensors[i]
+        del self.schedulers[i]
+
+    def reset_sensors(self) -> None:
+        """ Discard pending sensor input (e.g., when pausing). See Sensor.reset(). """
+        for sensor in self.sensors:
+            sensor.reset()
+
+    def reset_schedulers(self) -> None:
+        """ Reset acquisition schedulers (e.g., when resuming after a pause). """
+        for scheduler in self.schedulers:
+            scheduler.reset()
+
+    def scheduler_stats(self) -> List[SchedulerStats]:
+        """
+        Return acquisition statistics of each sensor.
 
-    def read(self, queue: mp.Queue = None) -> List[Tuple[datetime.datetime, dict]]:
+        :return: List of SchedulerStats in sensor registration order
         """
-        Read values from the registered input sensors. The read values are pushed to a queue if specified.
+        return [scheduler.stats() for scheduler in self.schedulers]
+
+    def read(self, queue: mp.Queue = None) -> List[Tuple[int, dict]]:
+        """
+        Wait until a sensor read is due and read values from the sensors that are due.
+        In concurrent mode, get the samples read by the reader threads instead (starting the readers if needed).
+        If a queue is specified, the read values are added to the current batch and the batch is pushed
+        to the queue when it is full or old enough.
 
         :param queue:
-        :return: List of datetime and value dictionary tuples
+        :return: List of timestamp and value dictionary tuples
+        :raises SensorError: if a reader thread failed (concurrent mode)
         """
-        indices_and_values = [s.read() for s in self.sensors]
+        if not self.sensors:
+            return []
+        if self.concurrent:
+            if not self.readers:
+                self.start_readers()
+            for reader in self.readers:
+                if reader.error is not None:
+                    raise SensorError(
+                        f'{type(reader.sensor).__name__} read failed'
+                    ) from reader.error
+            indices_and_values = self._merge(timeout=self.merge_timeout)
+        else:
+            min(self.schedulers, key=lambda s: s.deadline).wait()
+            now = time.perf_counter()
+            indices_and_values = []
+            for sensor, scheduler in zip(self.sensors, self.schedulers):
+                if scheduler.deadline <= now:
+                    scheduler.tick(now)
+                    indices_and_values.append(sensor.read())
         if queue is not None:
             for index, value_dict in indices_and_values:
-                queue.put((index, value_dict))
+                self._append_to_batch(index, value_dict, queue)
+            if (
+                self._batch_length > 0
+                and time.monotonic() - self._batch_started >= self.batch_interval
+            ):
+                self.flush(queue)
         return indices_and_values
 
+    def _append_to_batch(self, index: int, value_dict: dict, queue: mp.Queue) -> None:
+        """ Append a sample to the current batch. The batch is pushed to the queue when it is full. """
+        if self._batch_length == 0:
+            channels = [str(c) for s in self.sensors for c in s.channels]
+            if self._batch is None or list(self._batch.dtype.names[1:]) != channels:
+                self._batch = np.empty(self.batch_size, dtype=sample_dtype(channels))
+            self._batch_started = time.monotonic()
+        row = self._batch[self._batch_length]
+        if isinstance(index, datetime.datetime):
+            index = datetime_to_ns(index)
+        row[TIME_FIELD] = index
+        for name in self._batch.dtype.names[1:]:
+            value = value_dict.get(name)
+            row[name] = np.nan if value is None else value
+        self._batch_length += 1
+        if self._batch_length == self.batch_size:
+            self.flush(queue)
+
+    def flush(self, queue: mp.Queue) -> None:
+        """
+        Push the current batch to a queue. Nothing is pushed if the batch is empty.
+
+        :param queue:
+        :return: None
+        """
+        if self._batch_length == 0:
+            return
+        queue.put(self._batch[: self._batch_length].copy())
+        self._batch_length = 0
+
 
 class ProducerProcess:
     """ Process for recording data from a Producer. """
@@ -235,17 +876,50 @@ class ProducerProcess:
     # Default producer class
     producer_class = Producer
 
-    def __init__(self, name: str, document: Document):
-        self.queue = mp.Queue()
+    def __init__(
+        self,
+        name: str,
+        document: Document,
+        transport: str = TransportType.QUEUE,
+        concurrent: bool = False,
+    ):
+        """
+
+        :param name: Process name
+        :param document: Document
+        :param transport: Transport type for sample batches (see TransportType)
+        :param concurrent: Read each sensor in its own thread (see Producer)
+        """
+        self.transport = create_transport(transport)
         self.document = document
         self.start_event = mp.Event()
         self.stop_event = mp.Event()
-        self.producer = self.producer_class()
+        # Set by the process when it is paused and all read samples have been pushed to the queue
+        self.idle_event = mp.Event()
+        # Number of pause() calls. The process marks the end of the samples of each pause in the transport.
+        self._pause_count = mp.Value('i', 0)
+        # Recording anchor taken by the process when it starts reading for a new recording (see _anchor_recording()):
+        # samples stamped (see monotonic_ns()) before the start time are discarded, and the UTC+0 offset converts
+        # the stamps to UTC+0. The monotonic clock is not shared between processes on all platforms.
+        self._anchor = mp.Array('q', [NOT_ANCHORED_NS, 0])
+        # Set when the process should take a new anchor before the next read
+        self._new_recording = mp.Event()
+        # Offset from the sample stamps returned by the last get_all() call to UTC+0 nanoseconds since epoch
+        self.utc_offset_ns = 0
+        # Wakes up the paused process after start_event or stop_event has been changed (see _wake())
+        self._wakeup_receiver, self._wakeup_sender = mp.Pipe(duplex=False)
+        self.producer = self.producer_class(concurrent=concurrent)
+        self.producer.batch_interval = self.transport.batch_interval
         self._process = mp.Process(name=name, target=self.run)
 
     def __str__(self):
         return self.name
 
+    @property
+    def queue(self) -> mp.Queue:
+        """ Sample batch queue of the queue transport. """
+        return self.transport.queue
+
     @property
     def name(self) -> str:
         """
@@ -259,6 +933,45 @@ class ProducerProcess:
     def sensors(self) -> List[Sensor]:
         return self.producer.sensors
 
+    def channels(self) -> List[str]:
+        """
+        Return names of the channels recorded by the process.
+
+        :return:
+        """
+        return [str(c) for s in self.sensors for c in s.channels]
+
+    def get_all(self) -> np.ndarray:
+        """
+        Get all samples currently available from the process. The samples are not copied, i.e., the array
+        may be a view to the transport (see SharedMemoryTransport.get_all()).
+
+        The sample times are monotonic stamps of the process. Add utc_offset_ns, taken with the wall clock at
+        the start of the recording, to convert them to UTC+0 nanoseconds since epoch (see
+        seconds_since_document_start()). The times are therefore monotonic within a recording even if the wall
+        clock is adjusted.
+
+        :return: Structured array (see sample_dtype)
+        """
+        batch = self.transport.get_all()
+        if len(batch) == 0:
+            return batch
+        with self._anchor.get_lock():
+            started_at_ns, self.utc_offset_ns = self._anchor[:]
+        # Stamps are in time order
+        return batch[np.searchsorted(batch[TIME_FIELD], started_at_ns) :]
+
+    def seconds_since_document_start(self, time_ns: np.ndarray) -> np.ndarray:
+        """
+        Convert sample stamps returned by get_all() to seconds since the start of the document.
+
+        :param time_ns: Sample stamps
+        :return: Float array
+        """
+        return datetime_to_seconds(
+            time_ns, datetime_to_ns(self.document.started_at) - self.utc_offset_ns
+        )
+
     def is_alive(self) -> bool:
         """
         Return process is_alive status.
@@ -271,6 +984,8 @@ class ProducerProcess:
         """
         Open producer ports and start recording data in self.store (DataStore).
         Data is recorded until self.stop_event is triggered.
+        While paused, the process blocks on the wake-up pipe and uses no CPU. The first sample is read
+        within about a millisecond after resume() (see scripts/benchmark_producer_wakeup.py).
 
         :return: None
         """
@@ -280,9 +995,58 @@ class ProducerProcess:
             while not self.stop_event.is_set():
                 # Read only if started
                 if self.start_event.is_set():
-                    self.producer.read(queue=self.queue)
+                    if self._new_recording.is_set():
+                        self._anchor_recording()
+                    self.idle_event.clear()
+                    self.producer.read(queue=self.transport)
+                elif not self.idle_event.is_set():
+                    self.log_scheduler_stats()
+                    self.producer.stop_readers(self.transport)
+                    # Replies to requests in flight would be stale on resume
+                    self.producer.reset_sensors()
+                    self.producer.flush(self.transport)
+                    self.transport.mark(self._pause_count.value)
+                    # Do not count the pause as an overrun
+                    self.producer.reset_schedulers()
+                    self.idle_event.set()
+                else:
+                    self._wait_for_wakeup()
+                    # Acknowledge pause() calls made while already paused
+                    self.transport.mark(self._pause_count.value)
+            self.producer.stop_readers(self.transport)
+            self.producer.flush(self.transport)
         logger.info('Stopping producer process "{}"'.format(str(self)))
 
+    def _wake(self) -> None:
+        """ Wake up the paused process to check start_event and stop_event. Call after changing the events. """
+        if self.is_alive():
+            self._wakeup_sender.send_bytes(b'\x00')
+
+    def _wait_for_wakeup(self) -> None:
+        """ Block until woken up (see _wake()). Called in the process. """
+        self._wakeup_receiver.poll(None)
+        # Several wake-ups may have been sent while the process was running
+        while self._wakeup_receiver.poll():
+            self._wakeup_receiver.recv_bytes()
+
+    def log_scheduler_stats(self) -> None:
+        """ Log acquisition (and reader thread) statistics of each sensor. """
+        for sensor, stats in zip(self.sensors, self.producer.scheduler_stats()):
+            if stats.reads == 0:
+                continue
+            logger.info(
+                f'{type(sensor).__name__} ({sensor.sensor_info.sensor_serial_number}): '
+                f'{stats.reads} reads, {stats.overruns} overruns, '
+                f'mean jitter {stats.mean_jitter_s * 1e3:.3f} ms, '
+                f'max jitter {stats.max_jitter_s * 1e3:.3f} ms'
+            )
+        for reader, stats in zip(self.producer.readers, self.producer.reader_stats()):
+            logger.info(
+                f'{type(reader.sensor).__name__} reader: {stats.rate_hz:.1f} reads/s, '
+                f'mean latency {stats.mean_latency_s * 1e3:.3f} ms, '
+                f'max latency {stats.max_latency_s * 1e3:.3f} ms'
+            )
+
     def start(self) -> None:
         """
         Start the data producer process. If already running, only the producer is started.
@@ -290,17 +1054,66 @@ class ProducerProcess:
         :return: None
         """
         self.stop_event.clear()
+        self.idle_event.clear()
         if not self.is_alive():
+            self._start_recording()
+            self.transport.create(sample_dtype(self.channels()))
             self._process.start()
         self.start_event.set()
+        self._wake()
+
+    def set_document(self, document: Document, timeout: float = 1) -> None:
+        """
+        Record to a new document. The process is paused and samples read before the document was started
+        are discarded from now on (see get_all()). Sensor ports are kept open, so the process can be reused
+        for consecutive recordings by calling set_document() and start().
+
+        :param document: Document
+        :param timeout: Pause timeout in seconds
+        :return: None
+        """
+        self.pause(timeout)
+        self.document = document
+        self._start_recording()
+        # Samples of the previous document may still arrive from the transport
+        self.get_all()
+
+    def _start_recording(self) -> None:
+        """ Discard all samples until the process has anchored the new recording (see _anchor_recording()). """
+        with self._anchor.get_lock():
+            self._anchor[0] = NOT_ANCHORED_NS
+        self._new_recording.set()
+
+    def _anchor_recording(self) -> None:
+        """
+        Discard samples stamped before now and take the clock offset for the new recording.
+        Called in the process so that the anchor and the sample stamps are taken with the same clock.
+        """
+        with self._anchor.get_lock():
+            self._anchor[:] = [monotonic_ns(), monotonic_to_utc_offset_ns()]
+        self._new_recording.clear()
 
-    def pause(self) -> None:
+    def pause(self, timeout: float = 1) -> None:
         """
         Pause the process. To stop the process, call .join() after .pause().
+        If the process is running, wait until all read samples have been received from the transport,
+        so that the next get_all() call returns them.
 
+        :param timeout: Wait timeout in seconds
         :return:
         """
+        with self._pause_count.get_lock():
+            self._pause_count.value += 1
+            number = self._pause_count.value
         self.start_event.clear()
+        self._wake()
+        if not self.is_alive():
+            return
+        t_start = time.monotonic()
+        if not self.idle_event.wait(timeout) or not self.transport.wait_for_mark(
+            number, max(timeout - (time.monotonic() - t_start), 0)
+        ):
+            logger.error(f'Producer process "{self}" did not pause in {timeout} s')
 
     def resume(self) -> None:
         """
@@ -308,7 +1121,9 @@ class ProducerProcess:
 
         :return:
         """
+        self.idle_event.clear()
         self.start_event.set()
+        self._wake()
 
     def join(self, timeout=1) -> int:
         """
@@ -319,6 +1134,7 @@ class ProducerProcess:
         :return: Process exit code
         """
         self.stop_event.set()
+        self._wake()
         # Attempt to gracefully join the process
         # If it fails, terminate the process forcefully
         if self.is_alive():
@@ -330,6 +1146,7 @@ class ProducerProcess:
                 )
                 self._process.terminate()
                 self._process.join(timeout)
+        self.transport.close()
         logger.info('Producer process "{}" joined successfully'.format(str(self)))
         return self._process.exitcode
 
@@ -0,0 +1,171 @@
+"""
+Precomputed indexes for statistics of a time series over arbitrary x ranges.
+"""
+import numpy as np
+from collections import namedtuple
+from typing import Tuple
+
+# Statistics of a time series over an x range: maximum and mean y value of the samples in the range,
+# integral of y over the range (trapezoidal rule, linear interpolation at the range edges) and range length
+RegionStats = namedtuple('RegionStats', ['peak', 'mean', 'integral', 'duration'])
+
+
+def sparse_table(values: np.ndarray) -> list:
+    """
+    Build a sparse table for range maximum queries. Level k holds the maximum of each 2 ** k consecutive values.
+
+    :param values: Values
+    :return: List of arrays (level 0 is values)
+    """
+    table = [values]
+    width = 1
+    while 2 * width <= len(values):
+        previous = table[-1]
+        table.append(np.maximum(previous[:-width], previous[width:]))
+        width *= 2
+    return table
+
+
+def sparse_table_max(table: list, start: int, stop: int) -> float:
+    """
+    Return the maximum of values[start:stop] from a sparse table in constant time.
+
+    :param table: Sparse table (see sparse_table())
+    :param start: Start index
+    :param stop: Stop index (exclusive), greater than start
+    :return: Maximum value
+    """
+    level = (stop - start).bit_length() - 1
+    return max(table[level][start], table[level][stop - (1 << level)])
+
+
+class SeriesIndex:
+    """
+    Statistics of a time series over any x range in O(log n) time regardless of the series length.
+
+    Prefix sums give the mean and the integral over a range in constant time once the range edges have
+    been found by binary search. The maximum is taken from a sparse table of block maxima in constant time,
+    and the samples of the partial blocks at the range edges (at most 2 * block_size) are scanned. The
+    sparse table takes O(n / block_size * log n) memory instead of O(n log n) for all samples.
+    NaN samples are ignored.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, block_size: int = 64):
+        """
+        :param x: Monotonically increasing x values
+        :param y: y values
+        :param block_size: Number of samples per sparse table block
+        :raises ValueError: if block_size is less than 1 or x and y differ in length
+        """
+        if block_size < 1:
+            raise ValueError(f'Invalid block size {block_size}')
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if x.shape != y.shape:
+            raise ValueError('x and y must be of equal length')
+        valid = ~np.isnan(y)
+        self.x, self.y = x[valid], y[valid]
+        self.block_size = block_size
+        # Sum of y values and trapezoidal integral from the first sample to each sample
+        self._y_sum = np.concatenate(([0.0], np.cumsum(self.y)))
+        self._integral = np.concatenate(
+            ([0.0], np.cumsum(np.diff(self.x) * (self.y[1:] + self.y[:-1]) / 2))
+        )
+        block_count = -(-len(self.y) // block_size)
+        blocks = np.pad(
+            self.y,
+            (0, block_count * block_size - len(self.y)),
+            mode='constant',
+            constant_values=-np.inf,
+        )
+        self._block_max = sparse_table(
+            blocks.reshape(block_count, block_size).max(axis=1)
+        )
+
+    def __len__(self):
+        return len(self.x)
+
+    def range_max(self, start: int, stop: int) -> float:
+        """
+        Return the maximum of the samples start:stop.
+
+        :param start: Start index
+        :param stop: Stop index (exclusive)
+        :return: Maximum value, or NaN if there are no samples
+        """
+        if start >= stop:
+            return np.nan
+        first_block = start // self.block_size
+        last_block = (stop - 1) // self.block_size
+        if first_block == last_block:
+            return self.y[start:stop].max()
+        peak = max(
+            self.y[start : (first_block + 1) * self.block_size].max(),
+            self.y[last_block * self.block_size : stop].max(),
+        )
+        if last_block - first_block > 1:
+            peak = max(
+                peak, sparse_table_max(self._block_max, first_block + 1, last_block)
+            )
+        return peak
+
+    def range_mean(self, start: int, stop: int) -> float:
+        """
+        Return the mean of the samples start:stop.
+
+        :param start: Start index
+        :param stop: Stop index (exclusive)
+        :return: Mean value, or NaN if there are no samples
+        """
+        if start >= stop:
+            return np.nan
+        return (self._y_sum[stop] - self._y_sum[start]) / (stop - start)
+
+    def cumulative_integral(self, x: float) -> float:
+        """
+        Return the integral of y from the first sample to x. The series is linearly interpolated between the
+        samples, and the integral does not change outside the sampled x range.
+
+        :param x:
+        :return:
+        """
+        if len(self.x) < 2:
+            return 0.0
+        x = min(max(x, self.x[0]), self.x[-1])
+        i = min(int(np.searchsorted(self.x, x, side='right')) - 1, len(self.x) - 2)
+        dx = self.x[i + 1] - self.x[i]
+        y = self.y[i]
+        if dx > 0:
+            y += (self.y[i + 1] - self.y[i]) * (x - self.x[i]) / dx
+        return self._integral[i] + (x - self.x[i]) * (self.y[i] + y) / 2
+
+    def stats(self, x_start: float, x_stop: float) -> RegionStats:
+        """
+        Return statistics of the x range [x_start, x_stop].
+
+        :param x_start: Start of the x range
+        :param x_stop: End of the x range
+        :return: RegionStats
+        """
+        x_start, x_stop = min(x_start, x_stop), max(x_start, x_stop)
+        start, stop = self.indices(x_start, x_stop)
+        return RegionStats(
+            peak=self.range_max(start, stop),
+            mean=self.range_mean(start, stop),
+            integral=self.cumulative_integral(x_stop)
+            - self.cumulative_integral(x_start),
+            duration=x_stop - x_start,
+        )
+
+    def indices(self, x_start: float, x_stop: float) -> Tuple[int, int]:
+        """
+        Return the slice bounds of the samples in the x range [x_start, x_stop].
+
+        :param x_start: Start of the x range
+        :param x_stop: End of the x range
+        :return: Start and stop index as a tuple
+        """
+        return (
+            int(np.searchsorted(self.x, x_start, side='left')),
+            int(np.searchsorted(self.x, x_stop, side='right')),
+        )
@@ -23,6 +23,8 @@ from cranio.model import (
 )
 from cranio.utils import logger, utc_datetime
 from cranio.producer import ProducerProcess
+from cranio.async_producer import AsyncProducerProcess
+from cranio.series_index import SeriesIndex
 from config import Config
 
 
@@ -46,6 +48,16 @@ class StateMachineContextMixin:
     def document(self, value: Document):
         self.machine().document = value
 
+    @property
+    def series_index(self) -> SeriesIndex:
+        """
+        Context SeriesIndex of the document time series. Waits until the index has been built.
+
+        :return: None if the index is not being built
+        """
+        future = self.machine().series_index_future
+        return None if future is None else future.result()
+
     @property
     def annotated_events(self) -> List[AnnotatedEvent]:
         return self.machine().annotated_events
@@ -147,9 +159,26 @@ class ChangeSessionState(MyState):
         self.session_dialog.close()
 
 
+def index_document(database: Database, document: Document) -> SeriesIndex:
+    """
+    Read the related time series of a document once to store its min/max pyramid and to index it for
+    region statistics.
+
+    :param database:
+    :param document:
+    :return: SeriesIndex of the time series
+    """
+    time_series = document.get_related_time_series(database)
+    document.build_pyramid(database, time_series)
+    return SeriesIndex(*time_series)
+
+
 class MeasurementState(MyState):
     def __init__(self, name: str, parent=None):
         super().__init__(name=name, parent=parent)
+        self.error_dialog = QMessageBox()
+        self.error_dialog.setIcon(QMessageBox.Critical)
+        self.error_dialog.setWindowTitle('Error')
 
     def create_document(self) -> Document:
         """
@@ -174,24 +203,41 @@ class MeasurementState(MyState):
         sensor = self.machine().sensor
         # Create new document
         self.document = self.create_document()
+        self.machine().series_index_future = None
         self.main_window.measurement_widget.update_timer.start(
-            self.main_window.measurement_widget.update_interval * 1000
+            int(self.main_window.measurement_widget.update_interval * 1000)
         )
         # Clear plot
         logger.debug('Clear plot')
         self.main_window.measurement_widget.clear()
+        self.main_window.measurement_widget.redraw_scheduler.reset()
         # Insert sensor info and document to database
         sensor.enter_info_to_database(self.database)
         logger.debug(f'Enter document: {str(self.document)}')
         self.database.insert(self.document)
-        # Kill old producer process
-        if self.main_window.producer_process is not None:
-            self.main_window.producer_process.join()
-        # Create producer process and register connected sensor
-        self.main_window.producer_process = ProducerProcess(
-            'Torque producer process', document=self.document
-        )
-        self.main_window.register_sensor_with_producer()
+        producer_process = self.main_window.producer_process
+        if (
+            producer_process is not None
+            and producer_process.is_alive()
+            and sensor in producer_process.sensors
+        ):
+            # Reuse the producer process: the sensor port is open and the sensor has passed self test
+            producer_process.set_document(self.document)
+        else:
+            # Kill old producer process
+            if producer_process is not None:
+                producer_process.join()
+            # Create producer process and register connected sensor
+            process_class = (
+                AsyncProducerProcess if Config.ASYNC_SENSOR_READS else ProducerProcess
+            )
+            self.main_window.producer_process = process_class(
+                'Torque producer process',
+                document=self.document,
+                transport=Config.PRODUCER_TRANSPORT,
+                concurrent=Config.CONCURRENT_SENSOR_READS,
+            )
+            self.main_window.register_sensor_with_producer()
         # Start producing!
         self.main_window.measurement_widget.producer_process.start()
         # Set focus on Start button so that pressing Enter will trigger it
@@ -207,8 +253,20 @@ class MeasurementState(MyState):
             return
         self.main_window.measurement_widget.producer_process.pause()
         self.main_window.measurement_widget.update_timer.stop()
-        # Update to ensure that all data is inserted to database
+        # Update and wait for the writer to ensure that all data is inserted to database
         self.main_window.measurement_widget.update()
+        if not self.main_window.measurement_widget.writer.flush():
+            self.error_dialog.setText(
+                'Failed to save all measurements to the database. See the log for details.'
+            )
+            self.error_dialog.open()
+        logger.info(
+            f'Plot redraw statistics: {self.main_window.measurement_widget.frame_stats()}'
+        )
+        # Precompute the plot and the region statistics for event detection in the writer thread
+        self.machine().series_index_future = self.main_window.measurement_widget.writer.call(
+            index_document, self.database, self.document
+        )
 
 
 class EventDetectionState(MyState):
@@ -229,7 +287,12 @@ class EventDetectionState(MyState):
         :return:
         """
         super().onEntry(event)
-        self.dialog.plot(*self.document.get_related_time_series(self.database))
+        # Wait for the pyramid and the index built after the measurement (see MeasurementState)
+        series_index = self.series_index
+        if series_index is None:
+            series_index = index_document(self.database, self.document)
+        self.dialog.plot_pyramid(self.document.get_related_pyramid(self.database))
+        self.dialog.set_series_index(series_index)
         # Clear existing regions
         self.dialog.clear_regions()
         # Add as many regions as there are turns in one full turn
@@ -432,3 +495,4 @@ class FinalState(QFinalState, StateMixin, StateMachineContextMixin):
         super().onEntry(event)
         if self.machine().producer_process is not None:
             self.machine().producer_process.join()
+        self.main_window.measurement_widget.writer.stop()
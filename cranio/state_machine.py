@@ -35,6 +35,8 @@ class StateMachine(QStateMachine):
         self.main_window = MainWindow(database)
         self.document = None
         self.annotated_events = None
+        # Future of the index of the document time series for region statistics (see SeriesIndex)
+        self.series_index_future = None
         self._session = None
         self._initialize_states()
         self._initialize_transitions()
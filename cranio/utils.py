@@ -8,10 +8,11 @@ import logging
 import logging.config
 import random
 import uuid
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timedelta
 from contextlib import suppress
 from pathlib import Path
-from typing import Union, Dict
+from typing import Union, Dict, Tuple
 from ruamel import yaml
 from PyQt5.QtCore import QStateMachine
 from cranio.constants import DEFAULT_LOGGING_CONFIG_PATH
@@ -59,6 +60,39 @@ def generate_unique_id():
     return str(uuid.uuid1())
 
 
+try:
+    _perf_counter_ns = time.perf_counter_ns
+except AttributeError:
+    # Python < 3.7
+    def _perf_counter_ns() -> int:
+        return int(time.perf_counter() * 1e9)
+
+
+def monotonic_ns() -> int:
+    """
+    Return time of the high-resolution monotonic clock (time.perf_counter()) in nanoseconds.
+    Unlike the wall clock, the time never jumps (e.g., on clock synchronization). The reference point is
+    undefined and may differ between processes (e.g., on Windows with Python < 3.10), so only compare times
+    taken in the same process. See monotonic_to_utc_offset_ns() for converting to UTC+0.
+
+    .. note:: On Python < 3.7, the time is converted from the float seconds of time.perf_counter(), which
+        resolves 1 ns up to about 97 days since the reference point (e.g., boot), 2 ns up to 194 days and so on.
+
+    :return: Nanoseconds
+    """
+    return _perf_counter_ns()
+
+
+def monotonic_to_utc_offset_ns() -> int:
+    """
+    Return the current offset from monotonic_ns() to UTC+0 nanoseconds since epoch.
+    Monotonic timestamps are converted to UTC+0 by adding an offset taken once (e.g., per recording).
+
+    :return: Nanoseconds
+    """
+    return datetime_to_ns(utc_datetime()) - monotonic_ns()
+
+
 def utc_datetime():
     """
 
@@ -67,6 +101,16 @@ def utc_datetime():
     return datetime.utcnow()
 
 
+def datetime_to_ns(value: datetime) -> int:
+    """
+    Convert naive UTC+0 datetime to nanoseconds since epoch.
+
+    :param value: Datetime
+    :return: Nanoseconds since epoch
+    """
+    return (value - datetime(1970, 1, 1)) // timedelta(microseconds=1) * 1000
+
+
 def try_remove(name: Union[str, Path]):
     """ Try and remove a file from the filesystem. """
     if name is not None:
@@ -142,6 +186,86 @@ def attach_excepthook(excepthook=None):
     sys.excepthook = excepthook
 
 
+class RingBuffer:
+    """
+    Fixed-capacity buffer for one or more numeric columns of equal length.
+
+    The samples are stored in a preallocated array of twice the capacity. When the end of the array is reached,
+    the newest samples are moved to the beginning. Views to the buffered data are therefore always contiguous
+    and an append costs amortized constant time per sample. If capacity is None, the buffer grows without bound.
+    """
+
+    def __init__(self, capacity: int = None, columns: int = 2, dtype=np.float64):
+        """
+
+        :param capacity: Maximum number of samples. None for no limit.
+        :param columns: Number of columns
+        :param dtype: Column data type
+        """
+        if capacity is not None and capacity < 1:
+            raise ValueError(f'Invalid capacity {capacity}')
+        self.capacity = capacity
+        size = 1024 if capacity is None else 2 * capacity
+        self._data = np.empty((columns, size), dtype=dtype)
+        self._start = 0
+        self._stop = 0
+
+    def __len__(self):
+        return self._stop - self._start
+
+    @property
+    def columns(self) -> Tuple[np.ndarray, ...]:
+        """ Return views to the buffered columns (oldest sample first). """
+        return tuple(self._data[:, self._start : self._stop])
+
+    def clear(self) -> None:
+        """ Remove all samples from the buffer. """
+        self._start = 0
+        self._stop = 0
+
+    def extend(self, *arrays) -> None:
+        """
+        Append samples to the buffer. If the capacity is exceeded, the oldest samples are discarded.
+
+        :param arrays: One array-like per column
+        :return: None
+        :raises ValueError: if number of arrays does not match the number of columns or the arrays differ in length
+        """
+        if len(arrays) != len(self._data):
+            raise ValueError(f'Expected {len(self._data)} arrays, got {len(arrays)}')
+        values = np.array([np.asarray(a, dtype=self._data.dtype) for a in arrays])
+        if values.ndim != 2:
+            raise ValueError('Arrays must be one-dimensional and of equal length')
+        n = values.shape[1]
+        if self.capacity is not None and n > self.capacity:
+            values = values[:, -self.capacity :]
+            n = self.capacity
+        self._reserve(n)
+        self._data[:, self._stop : self._stop + n] = values
+        self._stop += n
+        if self.capacity is not None and len(self) > self.capacity:
+            self._start = self._stop - self.capacity
+
+    def _reserve(self, n: int) -> None:
+        """ Make room for n samples at the end of the array. """
+        size = self._data.shape[1]
+        if self._stop + n <= size:
+            return
+        keep = len(self)
+        if self.capacity is not None:
+            # Move the newest samples that remain after the append to the front
+            keep = min(keep, self.capacity - n)
+        elif keep + n > size:
+            # Unbounded buffer is full -> grow
+            data = np.empty((len(self._data), 2 * (keep + n)), dtype=self._data.dtype)
+            data[:, :keep] = self._data[:, self._start : self._stop]
+            self._data = data
+            self._start, self._stop = 0, keep
+            return
+        self._data[:, :keep] = self._data[:, self._stop - keep : self._stop]
+        self._start, self._stop = 0, keep
+
+
 def utc_offset() -> float:
     """
     Return UTC offset of local time.
@@ -0,0 +1,214 @@
+"""
+Write-behind persistence of measurements.
+"""
+import time
+import queue
+import atexit
+import threading
+import numpy as np
+from concurrent.futures import Future
+from typing import Iterable, Tuple, Callable
+from cranio.model import Database
+from cranio.utils import logger
+
+
+class MeasurementWriter:
+    """
+    Insert measurements to a database off the caller's thread.
+
+    Submitted measurement batches are coalesced and inserted by a writer thread in a single transaction
+    when enough samples are pending or the oldest pending sample is old enough. Call flush() to wait until
+    all submitted measurements have been inserted, or call() to process them in the writer thread once
+    they have been inserted.
+
+    .. note:: An in-memory SQLite database is private to the connection that created it.
+        For in-memory databases, the measurements are inserted in the caller's thread using the same policy,
+        and call() calls the function in the caller's thread.
+
+    The writer thread is stopped at interpreter exit at the latest (see stop()), so submitted measurements
+    are inserted even if the application exits without stopping the writer.
+    """
+
+    # Insert when at least this many samples are pending
+    max_samples = 1000
+    # Insert when the oldest pending sample has waited this long (in seconds)
+    max_delay = 0.5
+    # Time (in seconds) to wait for the submitted measurements to be inserted at interpreter exit
+    exit_timeout = 10
+
+    def __init__(self, database: Database):
+        self.database = database
+        self.threaded = not database.is_in_memory()
+        self._queue = queue.Queue()
+        self._thread = None
+        # Pending measurements as (document_id, time_s, torque_Nm) tuples
+        self._pending = []
+        self._pending_count = 0
+        self._pending_since = None
+        # Number of measurements that could not be inserted since the last flush()
+        # (incremented in the writer thread)
+        self._failed_count = 0
+        self._failed_lock = threading.Lock()
+
+    def submit(
+        self, document_id: str, time_s: Iterable[float], torque_Nm: Iterable[float]
+    ) -> None:
+        """
+        Submit measurements to be inserted to the database.
+
+        :param document_id: Related document identifier
+        :param time_s: Time since start of data collection in seconds
+        :param torque_Nm: Torque values
+        :return: None
+        """
+        item = (
+            document_id,
+            np.array(time_s, dtype=np.float64),
+            np.array(torque_Nm, dtype=np.float64),
+        )
+        if not self.threaded:
+            return self._add(item)
+        self._start()
+        self._queue.put(item)
+
+    def call(self, function: Callable, *args) -> Future:
+        """
+        Call a function after all submitted measurements have been inserted to the database.
+        The function is called in the writer thread so that the caller is not blocked.
+
+        :param function: Function to be called
+        :param args: Function arguments
+        :return: Future of the return value
+        """
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(function(*args))
+            except Exception as e:
+                logger.exception(f'Measurement writer call {function.__name__} failed')
+                future.set_exception(e)
+
+        if not self.threaded:
+            self._insert_pending()
+            run()
+            return future
+        self._start()
+        self._queue.put(run)
+        return future
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until all submitted measurements have been inserted to the database.
+
+        :param timeout: Timeout in seconds. None for no timeout.
+        :return: False if the timeout expired or measurements failed to be inserted since the last flush,
+            True otherwise
+        """
+        if not self.threaded or self._thread is None:
+            self._insert_pending()
+        else:
+            done = threading.Event()
+            self._queue.put(done)
+            if not done.wait(timeout):
+                logger.error(f'Measurement writer did not flush in {timeout} s')
+                return False
+        with self._failed_lock:
+            failed_count, self._failed_count = self._failed_count, 0
+        if failed_count > 0:
+            logger.error(
+                f'Measurement writer failed to insert {failed_count} measurements'
+            )
+            return False
+        return True
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Insert all submitted measurements and stop the writer thread.
+
+        :param timeout: Timeout in seconds. None for no timeout.
+        :return: None
+        """
+        if self._thread is None:
+            return self._insert_pending()
+        atexit.unregister(self._stop_at_exit)
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f'Measurement writer did not stop in {timeout} s')
+        self._thread = None
+
+    def _stop_at_exit(self) -> None:
+        """ Stop the writer thread at interpreter exit (the daemon thread would be killed). """
+        self.stop(self.exit_timeout)
+
+    def _start(self) -> None:
+        """ Start the writer thread if needed. """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                name='Measurement writer', target=self._run, daemon=True
+            )
+            self._thread.start()
+            atexit.register(self._stop_at_exit)
+
+    def _run(self) -> None:
+        """ Writer thread main loop. """
+        while True:
+            timeout = None
+            if self._pending_since is not None:
+                timeout = max(
+                    0, self._pending_since + self.max_delay - time.monotonic()
+                )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._insert_pending()
+                continue
+            if item is None:
+                self._insert_pending()
+                break
+            if isinstance(item, threading.Event):
+                self._insert_pending()
+                item.set()
+                continue
+            if callable(item):
+                self._insert_pending()
+                item()
+                continue
+            self._add(item)
+
+    def _add(self, item: Tuple[str, np.ndarray, np.ndarray]) -> None:
+        """ Add measurements to the pending measurements and insert if needed. """
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+        self._pending.append(item)
+        self._pending_count += len(item[1])
+        if (
+            self._pending_count >= self.max_samples
+            or time.monotonic() - self._pending_since >= self.max_delay
+        ):
+            self._insert_pending()
+
+    def _insert_pending(self) -> None:
+        """ Insert pending measurements to the database in a single transaction per document. """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._pending_count = 0
+        self._pending_since = None
+        documents = {}
+        for document_id, time_s, torque_Nm in pending:
+            documents.setdefault(document_id, []).append((time_s, torque_Nm))
+        for document_id, arrays in documents.items():
+            time_s, torque_Nm = (np.concatenate(a) for a in zip(*arrays))
+            try:
+                self.database.insert_measurements(document_id, time_s, torque_Nm)
+            except Exception:
+                with self._failed_lock:
+                    self._failed_count += len(time_s)
+                logger.exception(
+                    f'Failed to insert {len(time_s)} measurements '
+                    f'(document_id = {document_id})'
+                )
@@ -67,7 +67,10 @@ def run(args):
     if args.enable_dummy_sensor:
         Config.ENABLE_DUMMY_SENSOR = True
     database = DefaultDatabase.SQLITE
+    database.measurement_storage = Config.MEASUREMENT_STORAGE
     database.create_engine()
+    # Create missing tables and migrate tables created by an earlier version
+    database.init()
     machine = StateMachine(database)
     # Initialize session
     with database.session_scope() as s:
@@ -80,6 +83,8 @@ def run(args):
     ret = app.exec_()
     logger.info('Stop state machine')
     machine.stop()
+    # Insert the measurements still pending if the app was closed without going through the final state
+    machine.main_window.measurement_widget.writer.stop()
     return ret
 
 
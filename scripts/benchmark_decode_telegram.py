@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+Microbenchmark of Imada telegram decoding.
+
+Compares the previous decoder (uncompiled regex), decode_telegram() per telegram and decode_telegrams()
+on a list of telegrams, a buffer of EOL-terminated telegrams and a pandas column.
+"""
+import argparse
+import re
+import timeit
+import numpy as np
+import pandas as pd
+from cranio.imada import decode_telegram, decode_telegrams, IMADA_EOL
+from cranio.utils import logger, configure_logging
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n', '--telegrams', help='Number of telegrams', type=int, default=10 ** 5
+)
+parser.add_argument('-r', '--repeat', help='Number of repeats', type=int, default=5)
+
+
+def previous_decode_telegram(telegram: str):
+    """ decode_telegram() before precompiling. """
+    str_ = telegram.replace(IMADA_EOL, '')
+    value = float(re.findall(r'[-+]?\d*\.\d+|\d+', str_)[0])
+    unit, mode, condition = str_[-3:]
+    return value, unit, mode, condition
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    telegrams = [f'{v:.3f}KTO' for v in np.random.uniform(-5, 5, args.telegrams)]
+    buffer = ''.join(t + IMADA_EOL for t in telegrams).encode('utf-8')
+    column = pd.Series(telegrams)
+    cases = {
+        'previous decoder (per telegram)': lambda: [
+            previous_decode_telegram(t) for t in telegrams
+        ],
+        'decode_telegram (per telegram)': lambda: [
+            decode_telegram(t) for t in telegrams
+        ],
+        'Series.map(decode_telegram)': lambda: column.map(
+            lambda t: decode_telegram(t)[0]
+        ),
+        'decode_telegrams (list)': lambda: decode_telegrams(telegrams),
+        'decode_telegrams (buffer)': lambda: decode_telegrams(buffer),
+        'decode_telegrams (pandas column)': lambda: decode_telegrams(column),
+    }
+    for name, func in cases.items():
+        elapsed = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        logger.info(
+            f'{name}: {elapsed / args.telegrams * 1e9:.0f} ns/telegram '
+            f'({args.telegrams / elapsed / 1e6:.2f}M telegrams/s)'
+        )
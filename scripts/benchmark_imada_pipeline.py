@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""
+Measure the Imada sample rate with different pipeline depths (display value requests in flight).
+
+The sensor is emulated with ImadaEmulator, which replies to each request after a round trip latency
+and processes one request at a time.
+"""
+import argparse
+import time
+from cranio.imada import Imada
+from cranio.loopback import ImadaEmulator
+from cranio.utils import logger, configure_logging
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-n', '--samples', help='Number of samples', type=int, default=500)
+parser.add_argument(
+    '-l', '--latency', help='Round trip latency in seconds', type=float, default=0.005
+)
+parser.add_argument(
+    '-p',
+    '--processing-time',
+    help='Device processing time per request in seconds',
+    type=float,
+    default=0.0005,
+)
+parser.add_argument(
+    '-d',
+    '--pipeline-depth',
+    help='Pipeline depths',
+    type=int,
+    nargs='+',
+    default=[1, 2, 4, 8],
+)
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    for pipeline_depth in args.pipeline_depth:
+        emulator = ImadaEmulator(
+            latency=args.latency, processing_time=args.processing_time
+        )
+        imada = Imada(emulator, pipeline_depth=pipeline_depth)
+        t_start = time.perf_counter()
+        for _ in range(args.samples):
+            imada.read()
+        elapsed = time.perf_counter() - t_start
+        logger.info(
+            f'pipeline depth {pipeline_depth}: {args.samples / elapsed:.1f} samples/s'
+        )
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Compare the byte-by-byte Imada telegram reader (before buffering) and the buffered Imada.readline().
+
+Recorded telegrams are replayed from a ReplaySerial serial port stand-in. Telegrams/s and CPU time per
+telegram are reported for each reader. Use --chunk-size to emulate bytes arriving in pieces.
+"""
+import argparse
+import time
+import numpy as np
+from cranio.imada import Imada, IMADA_EOL
+from cranio.loopback import ReplaySerial
+from cranio.utils import logger, configure_logging
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n', '--telegrams', help='Number of telegrams', type=int, default=10 ** 5
+)
+parser.add_argument(
+    '-c',
+    '--chunk-size',
+    help='Maximum number of bytes available at once',
+    type=int,
+    default=None,
+)
+
+
+def bytewise_readline(serial_port) -> str:
+    """ Imada.readline() before buffering. """
+    line = []
+    while True:
+        c = serial_port.read().decode('utf-8')
+        if c == IMADA_EOL:
+            break
+        line.append(c)
+    return ''.join(line)
+
+
+def benchmark(readline, telegrams: int) -> dict:
+    t_start, cpu_start = time.perf_counter(), time.process_time()
+    for _ in range(telegrams):
+        readline()
+    elapsed, cpu = time.perf_counter() - t_start, time.process_time() - cpu_start
+    return {
+        'telegrams/s': telegrams / elapsed,
+        'CPU per telegram (us)': cpu / telegrams * 1e6,
+    }
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    recorded = [f'{value:.3f}KTO' for value in np.random.uniform(-5, 5, 1000)]
+
+    def serial_port():
+        return ReplaySerial.from_telegrams(
+            recorded, chunk_size=args.chunk_size, loop=True
+        )
+
+    bytewise_serial = serial_port()
+    readers = {
+        'bytewise': lambda: bytewise_readline(bytewise_serial),
+        'buffered': Imada(serial_port()).readline,
+    }
+    for name, readline in readers.items():
+        result = benchmark(readline, args.telegrams)
+        logger.info(
+            f'{name}: '
+            + ', '.join(f'{key} = {value:.3f}' for key, value in result.items())
+        )
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Compare measurement insert throughput of the ORM path (Database.bulk_insert) and
+the Core executemany path (Database.insert_measurements).
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from cranio.model import (
+    Database,
+    Document,
+    Measurement,
+    Patient,
+    Session,
+    SensorInfo,
+    DistractorType,
+)
+from cranio.utils import logger, configure_logging, generate_unique_id
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n',
+    '--rows',
+    help='Number of rows',
+    type=int,
+    nargs='+',
+    default=[10 ** 4, 10 ** 5, 10 ** 6],
+)
+
+
+def create_database(path: Path) -> Database:
+    database = Database(drivername='sqlite', database=str(path))
+    database.create_engine()
+    database.init()
+    return database
+
+
+def add_document(database: Database) -> Document:
+    with database.session_scope() as s:
+        session = Session()
+        patient = Patient(patient_id=generate_unique_id())
+        sensor_info = SensorInfo(sensor_serial_number='benchmark', turns_in_full_turn=3)
+        s.add_all([session, patient])
+        s.merge(sensor_info)
+        s.flush()
+        document = Document(
+            session_id=session.session_id,
+            patient_id=patient.patient_id,
+            sensor_serial_number=sensor_info.sensor_serial_number,
+            distractor_type=DistractorType.KLS_RED,
+        )
+        s.add(document)
+    return document
+
+
+def insert_orm(database: Database, document: Document, time_s, torque_Nm):
+    database.bulk_insert(
+        [
+            Measurement(document_id=document.document_id, time_s=x, torque_Nm=y)
+            for x, y in zip(time_s.tolist(), torque_Nm.tolist())
+        ]
+    )
+
+
+def insert_core(database: Database, document: Document, time_s, torque_Nm):
+    document.insert_time_series(database, time_s, torque_Nm)
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for n in args.rows:
+            time_s = np.arange(n) * 0.01
+            torque_Nm = np.random.rand(n)
+            rates = {}
+            for name, insert in (('ORM', insert_orm), ('Core', insert_core)):
+                database = create_database(Path(directory) / f'{name}_{n}.db')
+                document = add_document(database)
+                t_start = time.perf_counter()
+                insert(database, document, time_s, torque_Nm)
+                rates[name] = n / (time.perf_counter() - t_start)
+                database.engine.dispose()
+            logger.info(
+                f'{n} rows: ORM {rates["ORM"]:.0f} rows/s, Core {rates["Core"]:.0f} rows/s '
+                f'(speedup {rates["Core"] / rates["ORM"]:.1f}x)'
+            )
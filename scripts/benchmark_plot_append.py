@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Compare the per-tick overhead of appending a sample batch to the real-time plot via a pandas DataFrame
+(VMultiPlotWidget.plot, as before) and via arrays (VMultiPlotWidget.append).
+
+Each tick appends the samples received in one update interval (see MeasurementWidget.update) to a plot
+windowed to the last PLOT_N_SECONDS seconds. Drawing is not included as no window is shown.
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from cranio.app import app
+from cranio.app.widget import VMultiPlotWidget, PlotMode
+from cranio.constants import SAMPLE_RATE_HZ
+from cranio.utils import logger, configure_logging
+
+parser = argparse.ArgumentParser()
+parser.add_argument('-n', '--ticks', help='Number of ticks', type=int, default=5000)
+parser.add_argument(
+    '-c', '--channels', help='Number of plotted channels', type=int, default=1
+)
+parser.add_argument(
+    '-i', '--interval', help='Update interval in seconds', type=float, default=0.05
+)
+
+LABEL = 'torque {} (Nm)'
+
+
+def dataframe_tick(widget: VMultiPlotWidget, x_arr: np.ndarray, y_arrs: list):
+    df = pd.DataFrame(
+        {LABEL.format(i): y_arr for i, y_arr in enumerate(y_arrs)}, index=x_arr
+    )
+    widget.plot(df, mode=PlotMode.APPEND)
+
+
+def array_tick(widget: VMultiPlotWidget, x_arr: np.ndarray, y_arrs: list):
+    widget.append({LABEL.format(i): (x_arr, y_arr) for i, y_arr in enumerate(y_arrs)})
+
+
+def benchmark(tick, ticks: int, channels: int, interval: float) -> dict:
+    widget = VMultiPlotWidget()
+    samples_per_tick = max(1, int(SAMPLE_RATE_HZ * interval))
+    durations = []
+    for i in range(ticks):
+        x_arr = (i * samples_per_tick + np.arange(samples_per_tick)) / SAMPLE_RATE_HZ
+        y_arrs = [np.random.rand(samples_per_tick) for _ in range(channels)]
+        t_start = time.perf_counter()
+        tick(widget, x_arr, y_arrs)
+        durations.append(time.perf_counter() - t_start)
+    durations = np.array(durations) * 1e6
+    return {
+        'median tick (us)': np.median(durations),
+        '99th percentile tick (us)': np.percentile(durations, 99),
+    }
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    for name, tick in (('DataFrame', dataframe_tick), ('arrays', array_tick)):
+        result = benchmark(tick, args.ticks, args.channels, args.interval)
+        logger.info(
+            f'{name}: '
+            + ', '.join(f'{key} = {value:.1f}' for key, value in result.items())
+        )
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Compare start-to-first-sample latency of consecutive recordings with a new producer process per recording
+(as before) and with a reused producer process (ProducerProcess.set_document).
+
+Latency is the time from the start of a recording (document creation) to the timestamp of the first read
+sample. Use --start-method spawn to include the cost of importing the application in a new process.
+"""
+import argparse
+import time
+import multiprocessing as mp
+import numpy as np
+from cranio.model import Document
+from cranio.producer import ProducerProcess, ChannelInfo, Sensor, TIME_FIELD
+from cranio.utils import (
+    logger,
+    configure_logging,
+    generate_unique_id,
+    utc_datetime,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n', '--recordings', help='Number of recordings', type=int, default=20
+)
+parser.add_argument(
+    '-s',
+    '--start-method',
+    help='Multiprocessing start method',
+    choices=mp.get_all_start_methods(),
+    default=None,
+)
+
+
+def create_document() -> Document:
+    return Document(document_id=generate_unique_id(), started_at=utc_datetime())
+
+
+def create_process(document: Document) -> ProducerProcess:
+    process = ProducerProcess('benchmark', document=document)
+    sensor = Sensor()
+    sensor.register_channel(ChannelInfo('torque', 'Nm'))
+    process.producer.register_sensor(sensor)
+    return process
+
+
+def first_sample_latency(process: ProducerProcess) -> float:
+    """ Wait for the first sample and return its latency from the document start in seconds. """
+    while True:
+        batch = process.get_all()
+        if len(batch):
+            latency = process.seconds_since_document_start(batch[TIME_FIELD][0])
+            process.pause()
+            process.get_all()
+            return latency
+        time.sleep(0.001)
+
+
+def benchmark(recordings: int, reuse: bool) -> dict:
+    latencies = []
+    process = None
+    for _ in range(recordings):
+        document = create_document()
+        if reuse and process is not None:
+            process.set_document(document)
+        else:
+            if process is not None:
+                process.join()
+            process = create_process(document)
+        process.start()
+        latencies.append(first_sample_latency(process))
+    process.join()
+    latencies = np.array(latencies) * 1e3
+    return {
+        'median latency (ms)': np.median(latencies),
+        'max latency (ms)': np.max(latencies),
+    }
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    if args.start_method is not None:
+        mp.set_start_method(args.start_method)
+    for name, reuse in (('new process', False), ('reused process', True)):
+        result = benchmark(args.recordings, reuse)
+        logger.info(
+            f'{name}: '
+            + ', '.join(f'{key} = {value:.3f}' for key, value in result.items())
+        )
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Measure producer process wake-up latency and CPU usage while paused (Linux only).
+
+The producer process is paused and resumed repeatedly. Wake-up latency is the time from resume() to the
+timestamp of the first read sample. Idle CPU is the CPU time used by the paused process (from /proc).
+"""
+import argparse
+import os
+import time
+import numpy as np
+from cranio.model import Document
+from cranio.producer import ProducerProcess, ChannelInfo, Sensor, TIME_FIELD
+from cranio.utils import (
+    logger,
+    configure_logging,
+    generate_unique_id,
+    utc_datetime,
+    datetime_to_ns,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n', '--cycles', help='Number of pause/resume cycles', type=int, default=50
+)
+parser.add_argument(
+    '-p', '--pause', help='Pause duration in seconds', type=float, default=0.2
+)
+
+
+def process_cpu_time(pid: int) -> float:
+    """ Return user and system CPU time of a process in seconds. """
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def benchmark(cycles: int, pause: float) -> dict:
+    process = ProducerProcess(
+        'benchmark',
+        document=Document(document_id=generate_unique_id(), started_at=utc_datetime()),
+    )
+    sensor = Sensor()
+    sensor.register_channel(ChannelInfo('torque', 'Nm'))
+    process.producer.register_sensor(sensor)
+    process.start()
+    time.sleep(0.1)
+    latencies = []
+    idle_cpu = 0
+    for _ in range(cycles):
+        process.pause()
+        process.get_all()
+        cpu_start = process_cpu_time(process._process.pid)
+        time.sleep(pause)
+        idle_cpu += process_cpu_time(process._process.pid) - cpu_start
+        resumed_at = datetime_to_ns(utc_datetime())
+        process.resume()
+        time.sleep(0.05)
+        process.pause()
+        batch = process.get_all()
+        latencies.append(batch[TIME_FIELD][0] + process.utc_offset_ns - resumed_at)
+    process.join()
+    latencies = np.array(latencies) * 1e-6
+    return {
+        'median wake-up latency (ms)': np.median(latencies),
+        'max wake-up latency (ms)': np.max(latencies),
+        'idle CPU (%)': idle_cpu / (cycles * pause) * 100,
+    }
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    result = benchmark(args.cycles, args.pause)
+    logger.info(', '.join(f'{key} = {value:.3f}' for key, value in result.items()))
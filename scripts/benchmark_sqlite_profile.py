@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Compare SQLite profiles (SQLiteProfile.DURABLE vs SQLiteProfile.PERFORMANCE) during a simulated recording.
+
+The main process commits measurement batches at the recording rate while a reader process repeatedly reads
+the time series of the recorded document. Commit latency and the number of completed (and failed) reads
+are reported for each profile.
+"""
+import argparse
+import tempfile
+import multiprocessing as mp
+import time
+import numpy as np
+from pathlib import Path
+from cranio.model import (
+    Database,
+    Document,
+    Patient,
+    Session,
+    SensorInfo,
+    DistractorType,
+    SQLiteProfile,
+)
+from cranio.utils import logger, configure_logging, generate_unique_id
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n', '--batches', help='Number of committed batches', type=int, default=500
+)
+parser.add_argument(
+    '-b', '--batch-size', help='Measurements per batch', type=int, default=50
+)
+parser.add_argument(
+    '-i',
+    '--interval',
+    help='Interval between commits in seconds',
+    type=float,
+    default=0.01,
+)
+
+
+def add_document(database: Database) -> Document:
+    with database.session_scope() as s:
+        session = Session()
+        patient = Patient(patient_id=generate_unique_id())
+        sensor_info = SensorInfo(sensor_serial_number='benchmark', turns_in_full_turn=3)
+        s.add_all([session, patient])
+        s.merge(sensor_info)
+        s.flush()
+        document = Document(
+            session_id=session.session_id,
+            patient_id=patient.patient_id,
+            sensor_serial_number=sensor_info.sensor_serial_number,
+            distractor_type=DistractorType.KLS_RED,
+        )
+        s.add(document)
+    return document
+
+
+def read(path: Path, profile: dict, document: Document, stop, reads, failed_reads):
+    database = Database(drivername='sqlite', database=str(path), sqlite_profile=profile)
+    database.create_engine()
+    while not stop.is_set():
+        try:
+            document.get_related_time_series(database)
+            reads.value += 1
+        except Exception:
+            failed_reads.value += 1
+
+
+def benchmark(
+    path: Path, profile: dict, batches: int, batch_size: int, interval: float
+) -> dict:
+    database = Database(drivername='sqlite', database=str(path), sqlite_profile=profile)
+    database.create_engine()
+    database.init()
+    document = add_document(database)
+    stop = mp.Event()
+    reads, failed_reads = mp.Value('i', 0), mp.Value('i', 0)
+    reader = mp.Process(
+        target=read, args=(path, profile, document, stop, reads, failed_reads)
+    )
+    reader.start()
+    latencies = []
+    for i in range(batches):
+        time_s = (np.arange(batch_size) + i * batch_size) * 0.01
+        t_start = time.perf_counter()
+        try:
+            document.insert_time_series(database, time_s, np.random.rand(batch_size))
+        except Exception:
+            logger.exception('Commit failed')
+        latencies.append(time.perf_counter() - t_start)
+        time.sleep(interval)
+    stop.set()
+    reader.join()
+    database.engine.dispose()
+    latencies = np.array(latencies) * 1e3
+    return {
+        'median commit latency (ms)': np.median(latencies),
+        '99th percentile commit latency (ms)': np.percentile(latencies, 99),
+        'reads': reads.value,
+        'failed reads': failed_reads.value,
+    }
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ('DURABLE', 'PERFORMANCE'):
+            result = benchmark(
+                Path(directory) / f'{name}.db',
+                getattr(SQLiteProfile, name),
+                args.batches,
+                args.batch_size,
+                args.interval,
+            )
+            logger.info(
+                f'{name}: '
+                + ', '.join(f'{key} = {value:.3f}' for key, value in result.items())
+            )
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Compare measurement storages (MeasurementStorage.ROWS vs MeasurementStorage.CHUNKS).
+
+A recording is inserted in batches (as the measurement writer does) to a new database for each storage.
+Database file size and the time to read the recording with Document.get_related_time_series are reported.
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+from cranio.model import (
+    Database,
+    Document,
+    Patient,
+    Session,
+    SensorInfo,
+    DistractorType,
+    MeasurementStorage,
+)
+from cranio.utils import logger, configure_logging, generate_unique_id
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n', '--samples', help='Number of samples', type=int, default=360000
+)
+parser.add_argument(
+    '-b', '--batch-size', help='Samples per inserted batch', type=int, default=50
+)
+
+
+def add_document(database: Database) -> Document:
+    with database.session_scope() as s:
+        session = Session()
+        patient = Patient(patient_id=generate_unique_id())
+        sensor_info = SensorInfo(sensor_serial_number='benchmark', turns_in_full_turn=3)
+        s.add_all([session, patient])
+        s.merge(sensor_info)
+        s.flush()
+        document = Document(
+            session_id=session.session_id,
+            patient_id=patient.patient_id,
+            sensor_serial_number=sensor_info.sensor_serial_number,
+            distractor_type=DistractorType.KLS_RED,
+        )
+        s.add(document)
+    return document
+
+
+def benchmark(path: Path, storage: str, samples: int, batch_size: int) -> dict:
+    database = Database(
+        drivername='sqlite', database=str(path), measurement_storage=storage
+    )
+    database.create_engine()
+    database.init()
+    document = add_document(database)
+    # 100 Hz torque signal with noise quantized to the sensor resolution
+    time_s = np.arange(samples) * 0.01
+    torque_Nm = np.round(np.sin(time_s) + 0.01 * np.random.randn(samples), 3)
+    t_start = time.perf_counter()
+    for i in range(0, samples, batch_size):
+        document.insert_time_series(
+            database, time_s[i : i + batch_size], torque_Nm[i : i + batch_size]
+        )
+    insert_s = time.perf_counter() - t_start
+    database.engine.dispose()
+    t_start = time.perf_counter()
+    document.get_related_time_series(database)
+    read_s = time.perf_counter() - t_start
+    database.engine.dispose()
+    return {
+        'size (MB)': os.path.getsize(path) / 1024 ** 2,
+        'insert (s)': insert_s,
+        'read (s)': read_s,
+    }
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        for storage in (MeasurementStorage.ROWS, MeasurementStorage.CHUNKS):
+            result = benchmark(
+                Path(directory) / f'{storage}.db',
+                storage,
+                args.samples,
+                args.batch_size,
+            )
+            logger.info(
+                f'{storage}: '
+                + ', '.join(f'{key} = {value:.3f}' for key, value in result.items())
+            )
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Compare sample transports between a producer process and a consumer.
+
+A writer process pushes timestamped sample batches to the transport as fast as possible while the consumer
+drains the transport in a loop. Throughput and sample latency (from write to read) are reported for each
+transport type.
+"""
+import argparse
+import time
+import multiprocessing as mp
+import numpy as np
+from cranio.producer import TransportType, create_transport, sample_dtype, TIME_FIELD
+from cranio.utils import logger, configure_logging, monotonic_ns
+
+parser = argparse.ArgumentParser()
+parser.add_argument(
+    '-n', '--samples', help='Number of samples', type=int, default=10 ** 6
+)
+parser.add_argument(
+    '-b', '--batch-size', help='Samples per batch', type=int, default=16
+)
+
+
+def write(transport, dtype: np.dtype, samples: int, batch_size: int):
+    batch = np.zeros(batch_size, dtype=dtype)
+    for _ in range(samples // batch_size):
+        batch[TIME_FIELD] = monotonic_ns()
+        transport.put(batch)
+
+
+def benchmark(transport_type: str, samples: int, batch_size: int) -> dict:
+    dtype = sample_dtype(['torque (Nm)'])
+    transport = create_transport(transport_type)
+    transport.create(dtype)
+    samples = samples // batch_size * batch_size
+    process = mp.Process(target=write, args=(transport, dtype, samples, batch_size))
+    received = 0
+    latencies = []
+    t_start = time.perf_counter()
+    process.start()
+    while received < samples:
+        batch = transport.get_all()
+        if len(batch) == 0:
+            continue
+        latencies.append(monotonic_ns() - batch[TIME_FIELD])
+        received += len(batch)
+    elapsed = time.perf_counter() - t_start
+    process.join()
+    transport.close()
+    latencies = np.concatenate(latencies) * 1e-6
+    return {
+        'samples/s': samples / elapsed,
+        'median latency (ms)': np.median(latencies),
+        '99th percentile latency (ms)': np.percentile(latencies, 99),
+    }
+
+
+if __name__ == '__main__':
+    configure_logging()
+    args = parser.parse_args()
+    for transport_type in (TransportType.QUEUE, TransportType.SHARED_MEMORY):
+        result = benchmark(transport_type, args.samples, args.batch_size)
+        logger.info(
+            f'{transport_type}: '
+            + ', '.join(f'{key} = {value:.3f}' for key, value in result.items())
+        )
@@ -7,7 +7,8 @@ import matplotlib.pyplot as plt
 
 from contextlib import contextmanager
 from pathlib import Path
-from cranio.imada import decode_telegram, TelegramError
+import numpy as np
+from cranio.imada import decode_telegrams, TelegramError
 from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -71,7 +72,10 @@ def transform(df: pd.DataFrame) -> pd.DataFrame:
     # rename columns (torque and time)
     df_out = df.rename({0: 'torque (Nm)', 1: 'time (s)'}, axis=1)
     # decode torque strings to float
-    df_out['torque (Nm)'] = df_out['torque (Nm)'].map(lambda x: decode_telegram(x)[0])
+    values = decode_telegrams(df_out['torque (Nm)'].astype(str))['value']
+    if np.isnan(values).any():
+        raise TelegramError('Invalid telegram')
+    df_out['torque (Nm)'] = values
     return df_out
 
 
@@ -0,0 +1,233 @@
+import os
+import time
+import queue
+import asyncio
+import pytest
+import numpy as np
+import serial
+from cranio.async_producer import (
+    AsyncSensor,
+    AsyncProducer,
+    AsyncProducerProcess,
+    create_dummy_async_sensor,
+)
+from cranio.imada import AsyncImada
+from cranio.loopback import PtyImadaEmulator
+from cranio.producer import ChannelInfo, SensorError, TIME_FIELD
+from cranio.model import Document
+from cranio.utils import utc_datetime, generate_unique_id
+
+pty_required = pytest.mark.skipif(
+    not hasattr(os, 'openpty'), reason='Pseudo terminals not available'
+)
+
+
+def run_until_complete(coroutine):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+def create_async_sensor(name: str, rate_hz: float) -> AsyncSensor:
+    sensor = AsyncSensor()
+    sensor.rate_hz = rate_hz
+    sensor.register_channel(ChannelInfo(name, 'Nm'))
+    sensor.value_generator = lambda: 1.0
+    return sensor
+
+
+def drain(q: queue.Queue) -> np.ndarray:
+    batches = []
+    while not q.empty():
+        batches.append(q.get())
+    return np.concatenate(batches) if batches else np.array([])
+
+
+def test_async_producer_read_returns_due_sensors():
+    producer = AsyncProducer()
+    producer.register_sensor(create_async_sensor('torque 0', 100))
+    producer.register_sensor(create_async_sensor('torque 1', 100))
+
+    async def main():
+        await producer.open()
+        result = await producer.read()
+        await producer.close()
+        return result
+
+    result = run_until_complete(main())
+    assert [list(value_dict) for _, value_dict in result] == [
+        ['torque 0 (Nm)'],
+        ['torque 1 (Nm)'],
+    ]
+
+
+def test_async_producer_reads_while_running_and_stops():
+    producer = AsyncProducer()
+    producer.register_sensor(create_async_sensor('torque 0', 100))
+    producer.register_sensor(create_async_sensor('torque 1', 50))
+    q = queue.Queue()
+
+    async def main():
+        task = asyncio.ensure_future(producer.run(q))
+        await asyncio.sleep(0.1)
+        # Paused initially
+        assert q.empty()
+        producer.resume()
+        await asyncio.sleep(0.5)
+        await producer.pause()
+        paused = drain(q)
+        await asyncio.sleep(0.1)
+        assert q.empty()
+        await producer.stop()
+        await task
+        return paused
+
+    samples = run_until_complete(main())
+    counts = [
+        np.count_nonzero(~np.isnan(samples[name])) for name in samples.dtype.names[1:]
+    ]
+    assert counts[0] == pytest.approx(50, rel=0.2)
+    assert counts[1] == pytest.approx(25, rel=0.2)
+
+
+def test_paused_async_producer_uses_no_cpu():
+    producer = AsyncProducer()
+    for i in range(10):
+        producer.register_sensor(create_async_sensor(f'torque {i}', 100))
+
+    async def main():
+        task = asyncio.ensure_future(producer.run(queue.Queue()))
+        producer.resume()
+        await asyncio.sleep(0.1)
+        await producer.pause()
+        cpu_start = time.process_time()
+        await asyncio.sleep(0.5)
+        cpu = time.process_time() - cpu_start
+        await producer.stop()
+        await task
+        return cpu
+
+    assert run_until_complete(main()) < 0.05
+
+
+def test_async_producer_raises_sensor_error_if_read_fails():
+    producer = AsyncProducer()
+    producer.register_sensor(create_async_sensor('torque 0', 100))
+    failing_sensor = create_async_sensor('torque 1', 100)
+
+    def fail():
+        raise ValueError('Sensor disconnected')
+
+    failing_sensor.value_generator = fail
+    producer.register_sensor(failing_sensor)
+
+    async def main():
+        task = asyncio.ensure_future(producer.run(queue.Queue()))
+        producer.resume()
+        await asyncio.wait_for(task, timeout=1)
+
+    with pytest.raises(SensorError) as exc_info:
+        run_until_complete(main())
+    assert isinstance(exc_info.value.__cause__, ValueError)
+
+
+@pty_required
+def test_async_imada_reads_pty_emulator():
+    with PtyImadaEmulator(latency=0.001) as emulator:
+        sensor = AsyncImada(serial.Serial(emulator.port, timeout=0))
+
+        async def main():
+            await sensor.open()
+            values = [await sensor.read() for _ in range(5)]
+            await sensor.close()
+            return values
+
+        values = run_until_complete(main())
+    assert [value_dict['torque (Nm)'] for _, value_dict in values] == [
+        0.0,
+        1.0,
+        2.0,
+        3.0,
+        4.0,
+    ]
+    assert not sensor.serial.is_open
+
+
+@pty_required
+def test_async_producer_multiplexes_pty_sensors():
+    n = 4
+    emulators = [PtyImadaEmulator(latency=0.002) for _ in range(n)]
+    producer = AsyncProducer()
+    for i, emulator in enumerate(emulators):
+        emulator.start()
+        sensor = AsyncImada(serial.Serial(emulator.port, timeout=0))
+        sensor.channels = [ChannelInfo(f'torque {i}', 'Nm')]
+        producer.register_sensor(sensor)
+    q = queue.Queue()
+
+    async def main():
+        task = asyncio.ensure_future(producer.run(q))
+        producer.resume()
+        await asyncio.sleep(0.5)
+        await producer.stop()
+        await task
+
+    try:
+        run_until_complete(main())
+    finally:
+        for emulator in emulators:
+            emulator.stop()
+    samples = drain(q)
+    for i, emulator in enumerate(emulators):
+        values = samples[f'torque {i} (Nm)']
+        values = values[~np.isnan(values)]
+        # Replies are received in request order
+        assert list(values) == list(range(emulator.request_count))
+        assert len(values) == pytest.approx(50, rel=0.2)
+
+
+def create_async_producer_process() -> AsyncProducerProcess:
+    return AsyncProducerProcess(
+        'test_process',
+        document=Document(document_id=generate_unique_id(), started_at=utc_datetime()),
+    )
+
+
+def test_async_producer_process_records_and_pauses():
+    p = create_async_producer_process()
+    p.producer.register_sensor(create_dummy_async_sensor())
+    p.start()
+    time.sleep(0.5)
+    p.pause()
+    batch = p.get_all()
+    assert len(batch) > 20
+    assert np.all(np.diff(batch[TIME_FIELD]) > 0)
+    assert np.all(p.seconds_since_document_start(batch[TIME_FIELD]) >= 0)
+    # Nothing is read while paused
+    time.sleep(0.2)
+    assert len(p.get_all()) == 0
+    p.resume()
+    time.sleep(0.2)
+    p.pause()
+    assert len(p.get_all()) > 0
+    assert p.join() == 0
+    assert not p.is_alive()
+
+
+def test_async_producer_process_exits_if_read_fails():
+    class FailingSensor(AsyncSensor):
+        async def read(self):
+            raise IOError('Sensor disconnected')
+
+    p = create_async_producer_process()
+    sensor = FailingSensor()
+    sensor.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(sensor)
+    p.start()
+    p._process.join(5)
+    assert not p.is_alive()
+    assert p.join() != 0
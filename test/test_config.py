@@ -1,6 +1,29 @@
-from config import Config
+import pytest
+from config import Config, getenv_bool
 from cranio.model import DistractorType
 
 
 def test_default_distractor_is_kls_red():
     assert Config.DEFAULT_DISTRACTOR == DistractorType.KLS_RED
+
+
+@pytest.mark.parametrize(
+    'value, expected',
+    [
+        ('1', True),
+        ('true', True),
+        ('Yes', True),
+        ('0', False),
+        ('false', False),
+        ('', False),
+    ],
+)
+def test_getenv_bool_parses_flag(monkeypatch, value, expected):
+    monkeypatch.setenv('CRANIO_TEST_FLAG', value)
+    assert getenv_bool('CRANIO_TEST_FLAG') is expected
+
+
+def test_getenv_bool_returns_default_if_not_set(monkeypatch):
+    monkeypatch.delenv('CRANIO_TEST_FLAG', raising=False)
+    assert getenv_bool('CRANIO_TEST_FLAG') is False
+    assert getenv_bool('CRANIO_TEST_FLAG', default=True) is True
@@ -1,6 +1,13 @@
+import time
 import pytest
-from cranio.imada import decode_telegram, Imada
-from cranio.producer import Sensor
+import numpy as np
+import pandas as pd
+from cranio.imada import decode_telegram, decode_telegrams, Imada
+from cranio.exc import TelegramError
+from cranio.loopback import ReplaySerial, ImadaEmulator
+from cranio.utils import monotonic_ns
+from cranio.producer import Sensor, Producer
+from cranio.constants import SAMPLE_RATE_HZ
 from cranio.model import SensorInfo
 
 
@@ -8,7 +15,167 @@ def test_decode_telegram():
     assert (-1.234, 'K', 'T', 'O') == decode_telegram('-1.234KTO\r')
 
 
+@pytest.mark.parametrize(
+    'telegram', ['', 'KTO', '1.234', '1.234KT', 'x1.234KTO', '1.2.3KTO']
+)
+def test_decode_invalid_telegram_raises_telegram_error(telegram):
+    with pytest.raises(TelegramError):
+        decode_telegram(telegram)
+
+
+TELEGRAMS = [
+    '-1.234KTO\r',
+    '12KTO',
+    '+.5NPH',
+    'bad',
+    '1.234KT',
+    '1.2.3KTO',
+    '0.000KTO',
+    'nanKTO',
+    'infKTO',
+    '-infKTO',
+    '1e3KTO',
+    '1_0KTO',
+    ' 1.5KTO',
+    '1.5 KTO',
+    '1 5KTO',
+    '+-1KTO',
+    '1-KTO',
+    '.KTO',
+    '1.KTO',
+    '1.0KTO\r\r',
+    '\r1.0KTO',
+]
+
+
+def test_decode_telegrams_matches_decode_telegram():
+    decoded = decode_telegrams(TELEGRAMS)
+    assert len(decoded) == len(TELEGRAMS)
+    for telegram, row in zip(TELEGRAMS, decoded):
+        try:
+            expected = decode_telegram(telegram)
+        except TelegramError:
+            assert np.isnan(row['value'])
+            assert (row['unit'], row['mode'], row['condition']) == ('', '', '')
+        else:
+            assert tuple(row) == expected
+
+
+@pytest.mark.parametrize(
+    'telegrams',
+    [
+        b'-1.234KTO\r12KTO\r',
+        pd.Series(['-1.234KTO', '12KTO']),
+        np.array([b'-1.234KTO', b'12KTO']),
+    ],
+)
+def test_decode_telegrams_from_buffer_and_columns(telegrams):
+    decoded = decode_telegrams(telegrams)
+    np.testing.assert_array_equal(decoded['value'], [-1.234, 12])
+    np.testing.assert_array_equal(decoded['unit'], ['K', 'K'])
+
+
+def test_decode_telegrams_with_non_ascii_characters():
+    decoded = decode_telegrams(['1.0KTO', '\u00e41.0KTO'])
+    np.testing.assert_array_equal(decoded['value'], [1.0, np.nan])
+
+
+def test_decode_no_telegrams():
+    assert len(decode_telegrams(b'')) == 0
+    assert len(decode_telegrams([])) == 0
+
+
 @pytest.mark.parametrize('SensorClass', [Imada, Sensor])
 def test_imada_and_dummy_sensor_contain_sensor_info_with_serial_number(SensorClass):
     assert type(SensorClass.sensor_info) == SensorInfo
     assert len(SensorClass.sensor_info.sensor_serial_number) > 0
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 3, 64])
+def test_imada_readline_splits_telegrams_received_in_pieces(chunk_size):
+    telegrams = ['-1.234KTO', '0.000KTO', '12.5KTO']
+    imada = Imada(ReplaySerial.from_telegrams(telegrams, chunk_size=chunk_size))
+    assert [imada.readline() for _ in telegrams] == telegrams
+
+
+def test_imada_readlines_returns_available_telegrams_without_waiting():
+    imada = Imada(ReplaySerial(b'1.0KTO\r2.0KTO\r3.0'))
+    assert imada.readlines() == ['1.0KTO', '2.0KTO']
+    assert imada.readlines() == []
+
+
+def test_imada_read_polls_and_decodes_display_value():
+    serial_port = ReplaySerial.from_telegrams(['-1.234KTO'])
+    imada = Imada(serial_port)
+    _, value_dict = imada.read()
+    assert serial_port.written == b'D\r'
+    assert list(value_dict.values()) == [-1.234]
+
+
+def test_imada_pipelined_read_keeps_sample_order_and_increases_sample_rate():
+    n = 50
+    elapsed = {}
+    for pipeline_depth in (1, 4):
+        imada = Imada(ImadaEmulator(latency=0.005), pipeline_depth=pipeline_depth)
+        t_start = time.perf_counter()
+        values = [list(imada.read()[1].values())[0] for _ in range(n)]
+        elapsed[pipeline_depth] = time.perf_counter() - t_start
+        assert values == list(range(n))
+        assert imada.serial.request_count <= n + pipeline_depth - 1
+    assert elapsed[4] < 0.5 * elapsed[1]
+
+
+def test_imada_read_timestamps_telegrams_on_arrival():
+    imada = Imada(ImadaEmulator(latency=0.01))
+    t_start = monotonic_ns()
+    received_at, _ = imada.read()
+    assert received_at - t_start >= 0.01e9
+
+
+def test_imada_pipelined_replies_read_together_have_increasing_timestamps():
+    imada = Imada(ImadaEmulator(latency=0.005), pipeline_depth=4)
+    t_start = monotonic_ns()
+    stamps = [imada.read()[0]]
+    # Let the replies to the requests in flight arrive to be read together
+    time.sleep(0.05)
+    stamps += [imada.read()[0] for _ in range(3)]
+    assert t_start < stamps[0]
+    assert np.all(np.diff(stamps) > 0)
+
+
+def test_producer_reads_imada_as_fast_as_pipelined_replies_arrive():
+    producer = Producer()
+    producer.register_sensor(Imada(ImadaEmulator(latency=0.005), pipeline_depth=4))
+    samples = []
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < 0.5:
+        samples += producer.read()
+    # Not limited to SAMPLE_RATE_HZ
+    assert len(samples) > 2 * SAMPLE_RATE_HZ * 0.5
+
+
+def test_imada_reset_discards_replies_to_requests_in_flight():
+    imada = Imada(ImadaEmulator(latency=0.005), pipeline_depth=4)
+    _, value_dict = imada.read()
+    assert list(value_dict.values()) == [0]
+    imada.reset()
+    time.sleep(0.05)
+    t_start = monotonic_ns()
+    received_at, value_dict = imada.read()
+    # Reply to a request made after reset
+    assert list(value_dict.values()) == [4]
+    assert received_at - t_start >= 0.005e9
+
+
+def test_imada_reset_discards_bytes_available_from_replay_serial():
+    imada = Imada(
+        ReplaySerial.from_telegrams(['1.0KTO', '2.0KTO', '3.0KTO'], chunk_size=7)
+    )
+    assert list(imada.read()[1].values()) == [1.0]
+    imada.reset()
+    assert list(imada.read()[1].values()) == [3.0]
+
+
+def test_imada_with_invalid_pipeline_depth_raises_value_error():
+    with pytest.raises(ValueError):
+        Imada(ImadaEmulator(), pipeline_depth=0)
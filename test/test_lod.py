@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+from cranio.lod import MinMaxPyramid, samples_to_bins, merge_bins
+
+
+def test_merge_bins_keeps_minimum_and_maximum_with_their_x_values():
+    x = np.arange(10.0)
+    y = np.array([0, 5, -1, 2, np.nan, np.nan, np.nan, 3, 1, -2])
+    merged = merge_bins(samples_to_bins(x, y), 4)
+    assert len(merged) == 3
+    np.testing.assert_array_equal(merged['x_start'], [0, 4, 8])
+    np.testing.assert_array_equal(merged['x_stop'], [3, 7, 9])
+    np.testing.assert_array_equal(merged['y_min'], [-1, 3, -2])
+    np.testing.assert_array_equal(merged['x_of_min'], [2, 7, 9])
+    np.testing.assert_array_equal(merged['y_max'], [5, 3, 1])
+    np.testing.assert_array_equal(merged['x_of_max'], [1, 7, 8])
+
+
+def test_merge_bins_of_nan_values_are_nan():
+    merged = merge_bins(samples_to_bins(np.arange(4.0), np.full(4, np.nan)), 4)
+    assert np.isnan(merged['y_min'][0]) and np.isnan(merged['y_max'][0])
+
+
+@pytest.mark.parametrize('n', [0, 1, 5, 1000, 123457])
+def test_min_max_pyramid_window_preserves_extremes_and_bounds_point_count(n):
+    x = np.arange(n) * 0.01
+    y = np.random.randn(n)
+    pyramid = MinMaxPyramid(x, y)
+    max_points = 200
+    for x_start, x_stop in (
+        (-1, x[-1] + 1 if n else 1),
+        (0.3 * n * 0.01, 0.6 * n * 0.01),
+    ):
+        x_window, y_window = pyramid.window(x_start, x_stop, max_points)
+        assert len(x_window) <= max_points + 4
+        assert np.all(np.diff(x_window) >= 0)
+        visible = (x >= x_start) & (x <= x_stop)
+        if visible.any():
+            # Peaks are never dropped
+            assert y[visible].max() in y_window
+            assert y[visible].min() in y_window
+
+
+def test_min_max_pyramid_window_returns_samples_when_zoomed_in():
+    x = np.arange(10000) * 0.01
+    y = np.random.randn(10000)
+    x_window, y_window = MinMaxPyramid(x, y).window(10, 11, max_points=200)
+    # One sample beyond the range on both sides
+    np.testing.assert_array_equal(x_window, x[999:1102])
+    np.testing.assert_array_equal(y_window, y[999:1102])
+
+
+def test_min_max_pyramid_with_invalid_arguments_raises_value_error():
+    with pytest.raises(ValueError):
+        MinMaxPyramid([0, 1], [0, 1], factor=1)
+    with pytest.raises(ValueError):
+        MinMaxPyramid([0, 1], [0])
@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 from cranio.app.widget import MeasurementWidget
 
 
@@ -34,3 +35,17 @@ def test_distractor_widget_up_has_no_effect_when_distractor_is_ten(measurement_w
     measurement_widget.distractor_widget.value = 10
     measurement_widget.distractor_widget.step_up()
     assert measurement_widget.distractor_widget.value == 10
+
+
+def test_append_is_drawn_when_widget_is_shown(measurement_widget, qtbot):
+    measurement_widget.append({'torque (Nm)': (np.arange(3.0), np.ones(3))})
+    plot_widget = measurement_widget.get_plot('torque (Nm)')
+    np.testing.assert_array_equal(plot_widget.x_arr, np.arange(3.0))
+    # Not drawn while hidden
+    qtbot.wait(50)
+    assert plot_widget.curve.xData is None or len(plot_widget.curve.xData) == 0
+    measurement_widget.show()
+    qtbot.waitUntil(lambda: not measurement_widget.redraw_scheduler.pending)
+    np.testing.assert_array_equal(plot_widget.curve.xData, np.arange(3.0))
+    assert measurement_widget.frame_stats().frames == 1
+    measurement_widget.close()
@@ -1,6 +1,7 @@
 import pytest
 import time
 import numpy as np
+from sqlalchemy import Float
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.inspection import inspect
 from cranio.utils import (
@@ -11,10 +12,15 @@ from cranio.utils import (
     log_level_to_name,
 )
 from cranio.model import (
+    Database,
+    SQLiteProfile,
     Patient,
     Session,
     Document,
     Measurement,
+    MeasurementChunk,
+    MeasurementPyramid,
+    MeasurementStorage,
     session_scope,
     AnnotatedEvent,
     EventType,
@@ -22,6 +28,7 @@ from cranio.model import (
     DistractorType,
 )
 from cranio.producer import Sensor
+from cranio.lod import MinMaxPyramid
 
 
 def assert_add_query_and_delete(rows, session, Table):
@@ -84,6 +91,26 @@ def test_create_query_and_delete_measurement(database_fixture):
         assert_add_query_and_delete(measurements, s, Measurement)
 
 
+@pytest.mark.parametrize(
+    'profile, journal_mode, synchronous',
+    [(SQLiteProfile.DURABLE, 'delete', 2), (SQLiteProfile.PERFORMANCE, 'wal', 1)],
+)
+def test_database_applies_sqlite_profile_on_connect(
+    tmp_path, profile, journal_mode, synchronous
+):
+    database = Database(
+        drivername='sqlite',
+        database=str(tmp_path / 'cranio.db'),
+        sqlite_profile=profile,
+    )
+    database.create_engine()
+    with database.engine.connect() as con:
+        assert con.execute('pragma journal_mode').scalar() == journal_mode
+        assert con.execute('pragma synchronous').scalar() == synchronous
+        assert con.execute('pragma foreign_keys').scalar() == 1
+    database.engine.dispose()
+
+
 def test_database_init_populate_lookup_tables(database_fixture):
     with session_scope(database_fixture) as s:
         # Event types
@@ -146,6 +173,306 @@ def test_get_time_series_related_to_document(database_fixture):
     np.testing.assert_array_almost_equal(y, y_arr)
 
 
+def test_insert_time_series_inserts_measurements_with_a_single_statement(
+    database_fixture,
+):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    n = 1000
+    x_arr = np.linspace(0, 10, n)
+    y_arr = np.random.rand(n)
+    assert document.insert_time_series(database_fixture, x_arr, y_arr) == n
+    x, y = document.get_related_time_series(database_fixture)
+    np.testing.assert_array_almost_equal(x, x_arr)
+    np.testing.assert_array_almost_equal(y, y_arr)
+
+
+def test_get_time_series_related_to_document_returns_float_arrays(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    document.insert_time_series(database_fixture, [0, 1, 2], [3, 4, 5])
+    for arr in document.get_related_time_series(database_fixture):
+        assert isinstance(arr, np.ndarray)
+        assert arr.dtype == np.float64
+
+
+def test_iter_time_series_related_to_document_in_chunks(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    n = 1050
+    x_arr = np.linspace(0, 10, n)
+    y_arr = np.random.rand(n)
+    document.insert_time_series(database_fixture, x_arr, y_arr)
+    chunks = list(document.iter_related_time_series(database_fixture, chunk_size=100))
+    assert [len(x) for x, _ in chunks] == [100] * 10 + [50]
+    x, y = (np.concatenate(a) for a in zip(*chunks))
+    np.testing.assert_array_almost_equal(x, x_arr)
+    np.testing.assert_array_almost_equal(y, y_arr)
+
+
+def test_get_time_series_related_to_document_in_time_order(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    document.insert_time_series(database_fixture, [2, 0, 1], [5, 3, 4])
+    x, y = document.get_related_time_series(database_fixture)
+    np.testing.assert_array_equal(x, [0, 1, 2])
+    np.testing.assert_array_equal(y, [3, 4, 5])
+
+
+def test_time_series_query_uses_covering_index_without_sorting(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    query = document._time_series_query().compile(
+        database_fixture.engine, compile_kwargs={'literal_binds': True}
+    )
+    with database_fixture.engine.connect() as con:
+        plan = ' '.join(
+            row[-1] for row in con.execute(f'explain query plan {query}').fetchall()
+        )
+    assert 'USING COVERING INDEX ix_fact_measurement_document_id_time_s' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_database_init_creates_missing_indexes(tmp_path):
+    database = Database(drivername='sqlite', database=str(tmp_path / 'cranio.db'))
+    database.create_engine()
+    database.init()
+    index_name = 'ix_fact_measurement_document_id_time_s'
+    # Simulate database created by an earlier version
+    with database.engine.connect() as con:
+        con.execute(f'drop index {index_name}')
+    database.init()
+    index_names = [
+        index['name']
+        for index in inspect(database.engine).get_indexes('fact_measurement')
+    ]
+    assert index_name in index_names
+    database.engine.dispose()
+
+
+def test_database_init_rebuilds_numeric_measurement_columns_as_float(tmp_path):
+    database = Database(drivername='sqlite', database=str(tmp_path / 'cranio.db'))
+    database.create_engine()
+    database.init()
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database)
+    # Simulate database created by an earlier version
+    with database.engine.begin() as con:
+        con.execute('drop table fact_measurement')
+        con.execute(
+            'create table fact_measurement ('
+            'measurement_id INTEGER NOT NULL, document_id VARCHAR NOT NULL, '
+            'time_s NUMERIC NOT NULL, torque_Nm NUMERIC NOT NULL, '
+            'PRIMARY KEY (measurement_id), '
+            f'FOREIGN KEY(document_id) REFERENCES {Document.__tablename__} (document_id))'
+        )
+        con.execute(
+            'insert into fact_measurement (document_id, time_s, torque_Nm) '
+            f"values ('{document.document_id}', 0, 1.5), ('{document.document_id}', 1, 2)"
+        )
+    database.init()
+    columns = {
+        c['name']: c['type']
+        for c in inspect(database.engine).get_columns('fact_measurement')
+    }
+    assert isinstance(columns['time_s'], Float)
+    assert isinstance(columns['torque_Nm'], Float)
+    assert [
+        index['name']
+        for index in inspect(database.engine).get_indexes('fact_measurement')
+    ] == ['ix_fact_measurement_document_id_time_s']
+    with database.engine.connect() as con:
+        types = con.execute(
+            'select distinct typeof(time_s), typeof(torque_Nm) from fact_measurement'
+        ).fetchall()
+    assert types == [('real', 'real')]
+    x, y = document.get_related_time_series(database)
+    np.testing.assert_array_equal(x, [0, 1])
+    np.testing.assert_array_equal(y, [1.5, 2])
+    with session_scope(database) as s:
+        measurement = s.query(Measurement).first()
+        assert isinstance(measurement.time_s, float)
+    database.engine.dispose()
+
+
+def test_database_init_adds_missing_annotated_event_columns(tmp_path):
+    database = Database(drivername='sqlite', database=str(tmp_path / 'cranio.db'))
+    database.create_engine()
+    database.init()
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database)
+    # Simulate database created by an earlier version
+    with database.engine.begin() as con:
+        con.execute('drop table fact_annotated_event')
+        con.execute(
+            'create table fact_annotated_event ('
+            'event_type VARCHAR NOT NULL, event_num INTEGER NOT NULL, '
+            'document_id VARCHAR NOT NULL, event_begin NUMERIC, event_end NUMERIC, '
+            'annotation_done BOOLEAN NOT NULL, recorded BOOLEAN NOT NULL, '
+            'PRIMARY KEY (event_type, event_num, document_id))'
+        )
+        con.execute(
+            'insert into fact_annotated_event values '
+            f"('D', 1, '{document.document_id}', 0, 1, 1, 1)"
+        )
+    database.init()
+    column_names = [
+        c['name'] for c in inspect(database.engine).get_columns('fact_annotated_event')
+    ]
+    assert column_names == [c.name for c in AnnotatedEvent.__table__.columns]
+    database.insert(
+        AnnotatedEvent(
+            event_type='D',
+            event_num=2,
+            document_id=document.document_id,
+            annotation_done=True,
+            recorded=True,
+            peak_torque_Nm=1.5,
+            mean_torque_Nm=0.5,
+            torque_integral_Nms=2.5,
+            duration_s=5,
+        )
+    )
+    with session_scope(database) as s:
+        events = s.query(AnnotatedEvent).order_by(AnnotatedEvent.event_num).all()
+        assert [e.peak_torque_Nm for e in events] == [None, 1.5]
+        assert [e.duration_s for e in events] == [None, 5]
+    database.engine.dispose()
+
+
+def test_measurement_chunk_encode_and_decode():
+    time_s = 20 + np.arange(1000) * 0.01
+    torque_Nm = np.random.rand(1000)
+    chunk = MeasurementChunk(**MeasurementChunk.encode(2, time_s, torque_Nm))
+    assert chunk.sample_count == 1000
+    assert chunk.time_begin_s == time_s[0] and chunk.time_end_s == time_s[-1]
+    assert chunk.torque_min_Nm == torque_Nm.min()
+    assert chunk.torque_max_Nm == torque_Nm.max()
+    x, y = MeasurementChunk.decode(chunk)
+    np.testing.assert_allclose(x, time_s, atol=1e-6)
+    np.testing.assert_array_equal(y, torque_Nm.astype(np.float32))
+
+
+def test_insert_and_get_time_series_with_chunk_storage(database_fixture):
+    database_fixture.measurement_storage = MeasurementStorage.CHUNKS
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    n = 2500
+    x_arr = np.arange(n) * 0.01
+    y_arr = np.random.rand(n)
+    # Insert in batches that do not align with chunk boundaries
+    for x, y in zip(np.array_split(x_arr, 37), np.array_split(y_arr, 37)):
+        assert document.insert_time_series(database_fixture, x, y) == len(x)
+    with session_scope(database_fixture) as s:
+        chunks = (
+            s.query(MeasurementChunk)
+            .filter(MeasurementChunk.document_id == document.document_id)
+            .order_by(MeasurementChunk.chunk_index)
+            .all()
+        )
+        assert s.query(Measurement).count() == 0
+    assert [c.chunk_index for c in chunks] == [0, 1, 2]
+    assert [c.sample_count for c in chunks] == [1000, 1000, 500]
+    x, y = document.get_related_time_series(database_fixture)
+    np.testing.assert_allclose(x, x_arr, atol=1e-6)
+    np.testing.assert_allclose(y, y_arr, rtol=1e-6)
+    x, y = (
+        np.concatenate(a)
+        for a in zip(*document.iter_related_time_series(database_fixture))
+    )
+    np.testing.assert_allclose(x, x_arr, atol=1e-6)
+
+
+def test_get_time_series_merges_measurement_storages(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    document.insert_time_series(database_fixture, [0, 2], [0, 2])
+    database_fixture.measurement_storage = MeasurementStorage.CHUNKS
+    document.insert_time_series(database_fixture, [1, 3], [1, 3])
+    x, y = document.get_related_time_series(database_fixture)
+    np.testing.assert_allclose(x, [0, 1, 2, 3])
+    np.testing.assert_allclose(y, [0, 1, 2, 3])
+
+
+@pytest.mark.parametrize(
+    'storage', [MeasurementStorage.ROWS, MeasurementStorage.CHUNKS]
+)
+def test_get_time_series_within_time_range(database_fixture, storage):
+    database_fixture.measurement_storage = storage
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    x_arr = np.arange(3000) * 0.01
+    document.insert_time_series(database_fixture, x_arr, x_arr)
+    x, y = document.get_related_time_series(database_fixture, 5, 15.005)
+    np.testing.assert_allclose(x, x_arr[500:1501], atol=1e-6)
+    x, _ = document.get_related_time_series(database_fixture, start_s=29.5)
+    assert len(x) == 50
+
+
+@pytest.mark.parametrize(
+    'storage', [MeasurementStorage.ROWS, MeasurementStorage.CHUNKS]
+)
+def test_document_pyramid_window_matches_min_max_pyramid(database_fixture, storage):
+    database_fixture.measurement_storage = storage
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    n = 50000
+    x_arr = np.arange(n) * 0.01
+    y_arr = np.round(np.random.randn(n), 3)
+    document.insert_time_series(database_fixture, x_arr, y_arr)
+    # Built on first use
+    pyramid = document.get_related_pyramid(database_fixture)
+    assert len(pyramid) == n
+    assert pyramid.x_range() == pytest.approx((0, x_arr[-1]))
+    expected = MinMaxPyramid(*document.get_related_time_series(database_fixture))
+    for x_start, x_stop in ((-10, 1000), (100, 300), (123, 124.5)):
+        for actual, desired in zip(
+            pyramid.window(x_start, x_stop, 500), expected.window(x_start, x_stop, 500)
+        ):
+            np.testing.assert_allclose(actual, desired)
+
+
+def test_document_pyramid_window_with_cache_smaller_than_window(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    n = 50000
+    x_arr = np.arange(n) * 0.01
+    y_arr = np.round(np.random.randn(n), 3)
+    document.insert_time_series(database_fixture, x_arr, y_arr)
+    pyramid = document.get_related_pyramid(database_fixture)
+    pyramid.cache_size = 2
+    expected = MinMaxPyramid(x_arr, y_arr)
+    # Pan a window spanning more blocks than are cached
+    for x_start in np.arange(0, 300, 20):
+        x_stop = x_start + 100
+        for actual, desired in zip(
+            pyramid.window(x_start, x_stop, 5000),
+            expected.window(x_start, x_stop, 5000),
+        ):
+            np.testing.assert_allclose(actual, desired)
+
+
+def test_build_pyramid_replaces_existing_pyramid(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    document.insert_time_series(database_fixture, np.arange(5000), np.zeros(5000))
+    blocks = document.build_pyramid(database_fixture)
+    # Level 1 has 1250 bins, i.e., two blocks
+    assert blocks == len(MinMaxPyramid(np.arange(5000), np.zeros(5000)).levels) + 1
+    document.insert_time_series(database_fixture, [5000], [1])
+    assert document.build_pyramid(database_fixture) == blocks
+    with session_scope(database_fixture) as s:
+        assert s.query(MeasurementPyramid).count() == blocks
+    pyramid = document.get_related_pyramid(database_fixture)
+    assert len(pyramid) == 5001
+    _, y = pyramid.window(0, 5000, 10)
+    assert y.max() == 1
+
+
+def test_get_pyramid_of_document_without_measurements(database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
+    pyramid = document.get_related_pyramid(database_fixture)
+    assert len(pyramid) == 0
+    x, y = pyramid.window(0, 1, 100)
+    assert len(x) == len(y) == 0
+
+
+def test_database_with_invalid_measurement_storage_raises_value_error():
+    with pytest.raises(ValueError):
+        Database(drivername='sqlite', measurement_storage='foo')
+    database = Database(drivername='sqlite')
+    with pytest.raises(ValueError):
+        database.measurement_storage = 'foo'
+    assert database.measurement_storage == MeasurementStorage.ROWS
+
+
 def test_get_non_existing_time_series_related_to_document(database_fixture):
     document, *_ = pytest.helpers.add_document_and_foreign_keys(database_fixture)
     x, y = document.get_related_time_series(database_fixture)
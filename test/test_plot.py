@@ -1,3 +1,4 @@
+import time
 import string
 import random
 import pytest
@@ -6,15 +7,20 @@ import pandas as pd
 import cranio.constants
 from functools import partial
 from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtWidgets import QApplication, QMessageBox
+from PyQt5.QtWidgets import QApplication, QMessageBox, QWidget
 from cranio.app.widget import (
     PlotWidget,
     VMultiPlotWidget,
+    RedrawScheduler,
     RegionPlotWidget,
     PlotMode,
     filter_last_n_seconds,
+    window_last_n_seconds,
+    window_from_filter,
 )
 from cranio.app.window import RegionPlotWindow
+from cranio.lod import MinMaxPyramid
+from cranio.series_index import SeriesIndex
 
 left_edge = 0
 right_edge = 99
@@ -34,11 +40,11 @@ def test_plot_widget_overwrite_plot_data():
         x = np.random.rand(i)
         y = np.random.rand(i)
         w.plot(x, y, PlotMode.OVERWRITE)
-        assert w.x_arr == list(x)
-        assert w.y_arr == list(y)
+        np.testing.assert_array_equal(w.x_arr, x)
+        np.testing.assert_array_equal(w.y_arr, y)
     w.clear_plot()
-    assert w.x_arr == []
-    assert w.y_arr == []
+    assert len(w.x_arr) == 0
+    assert len(w.y_arr) == 0
 
 
 def test_plot_widget_append_plot_data():
@@ -51,11 +57,26 @@ def test_plot_widget_append_plot_data():
         X += list(x)
         Y += list(y)
         w.plot(x, y, PlotMode.APPEND)
-        assert w.x_arr == X
-        assert w.y_arr == Y
+        np.testing.assert_array_equal(w.x_arr, X)
+        np.testing.assert_array_equal(w.y_arr, Y)
     w.clear_plot()
-    assert w.x_arr == []
-    assert w.y_arr == []
+    assert len(w.x_arr) == 0
+    assert len(w.y_arr) == 0
+
+
+def test_plot_widget_append_beyond_capacity_keeps_newest_samples():
+    capacity = 50
+    w = PlotWidget(capacity=capacity)
+    curve = w.curve
+    X = np.arange(1000, dtype=float)
+    for x in np.array_split(X, 37):
+        w.plot(x, 2 * x, PlotMode.APPEND)
+        assert len(w.x_arr) <= capacity
+    np.testing.assert_array_equal(w.x_arr, X[-capacity:])
+    np.testing.assert_array_equal(w.y_arr, 2 * X[-capacity:])
+    # The same plot item is updated in place
+    assert w.curve is curve
+    assert w.getPlotItem().listDataItems() == [curve]
 
 
 def test_plot_widget_dtypes():
@@ -65,8 +86,8 @@ def test_plot_widget_dtypes():
 
     def _assert_plot(x_in, y_in):
         w.plot(x, y, PlotMode.OVERWRITE)
-        assert w.x_arr == list(x)
-        assert w.y_arr == list(y)
+        np.testing.assert_array_equal(w.x_arr, x)
+        np.testing.assert_array_equal(w.y_arr, y)
 
     # numpy array
     x_np = np.array(x)
@@ -115,6 +136,25 @@ def test_plot_widget_filter_last_10_seconds_excludes_entries_older_than_10_secon
     assert min(w.x_arr) == n - 1 - 10
 
 
+def test_plot_widget_window_last_10_seconds_excludes_entries_older_than_10_seconds_from_the_plot():
+    w = PlotWidget()
+    w.add_window(partial(window_last_n_seconds, n=10))
+    for i in range(20):
+        w.plot([i], [np.random.rand()], mode=PlotMode.APPEND)
+        assert w.x_arr[-1] == i
+        assert w.x_arr[0] == max(0, i - 10)
+    # Plotted data is a view to the buffer
+    assert np.shares_memory(w.x_arr, w.buffer.columns[0])
+
+
+@pytest.mark.parametrize('n', [0, 1, 10, 1000])
+def test_window_from_filter_matches_vectorized_window(n):
+    x_arr = np.sort(np.random.rand(n)) * 100
+    assert window_from_filter(partial(filter_last_n_seconds, n=10))(
+        x_arr
+    ) == window_last_n_seconds(x_arr, n=10)
+
+
 @pytest.mark.parametrize('rows', [100, 1000])
 def test_vmulti_plot_widget_plot_and_overwrite(rows):
     p = VMultiPlotWidget()
@@ -127,8 +167,8 @@ def test_vmulti_plot_widget_plot_and_overwrite(rows):
         # assert data in each plot widget
         for c in data.columns:
             pw = p.find_plot_widget_by_label(c)
-            assert pw.x_arr == data[c].index.tolist()
-            assert pw.y_arr == data[c].tolist()
+            np.testing.assert_array_equal(pw.x_arr, data[c].index)
+            np.testing.assert_array_equal(pw.y_arr, data[c])
 
 
 def test_vmulti_plot_widget_placeholder():
@@ -139,6 +179,33 @@ def test_vmulti_plot_widget_placeholder():
     assert p.find_plot_widget_by_label('foo') == plot_widget
 
 
+def test_vmulti_plot_widget_append_arrays():
+    p = VMultiPlotWidget()
+    x_arr, y_arr = np.arange(20.0), np.random.rand(2, 20)
+    for start, stop in ((0, 5), (5, 6), (6, 20)):
+        p.append(
+            {label: (x_arr[start:stop], y[start:stop]) for label, y in zip('AB', y_arr)}
+        )
+    assert len(p.plot_widgets) == 2
+    for label, y in zip('AB', y_arr):
+        pw = p.find_plot_widget_by_label(label)
+        assert pw.y_label == label
+        np.testing.assert_array_equal(pw.x_arr, x_arr)
+        np.testing.assert_array_equal(pw.y_arr, y)
+    with pytest.raises(ValueError):
+        p.add_plot_widget('A')
+
+
+def test_vmulti_plot_widget_reset_removes_plots():
+    p = VMultiPlotWidget()
+    p.append({'A': (np.arange(3.0), np.arange(3.0))})
+    p.reset()
+    assert p.plot_widgets == []
+    assert p.find_plot_widget_by_label('A') is None
+    p.append({'A': (np.arange(3.0), np.arange(3.0))})
+    assert len(p.find_plot_widget_by_label('A').x_arr) == 3
+
+
 def test_vmulti_plot_widget_clear_all_plots():
     p = VMultiPlotWidget()
     n = 100
@@ -230,3 +297,163 @@ def test_region_plot_widget_add_and_remove_all_buttons(database_fixture):
 def test_region_plot_window_has_maximize_button():
     region_plot_window = RegionPlotWindow()
     assert int(region_plot_window.windowFlags() & Qt.WindowMaximizeButtonHint)
+
+
+def test_region_plot_widget_draws_decimated_envelope_and_refines_on_zoom(
+    region_plot_widget,
+):
+    n = 360000
+    x = np.arange(n) * 0.01
+    y = np.random.randn(n)
+    y[123456] = 100
+    region_plot_widget.plot(x, y)
+    plot_widget = region_plot_widget.plot_widget
+    # All data is available, but the drawn curve is bounded by the plot width
+    np.testing.assert_array_equal(region_plot_widget.x_arr, x)
+    x_drawn, y_drawn = plot_widget.curve.getData()
+    max_points = 2 * int(plot_widget.getViewBox().width())
+    assert len(x_drawn) <= max_points + 4
+    assert y_drawn.max() == 100
+    plot_widget.setXRange(1230, 1240, padding=0)
+    x_drawn, y_drawn = plot_widget.curve.getData()
+    np.testing.assert_array_equal(x_drawn, x[122999:124002])
+    assert y_drawn.max() == 100
+
+
+def test_region_plot_widget_adds_regions_over_plotted_pyramid(region_plot_widget):
+    x = np.arange(10000) * 0.01
+    region_plot_widget.plot_pyramid(MinMaxPyramid(x, np.random.randn(len(x))))
+    assert len(region_plot_widget.x_arr) == 0
+    assert region_plot_widget.x_range() == (0, x[-1])
+    region_plot_widget.set_add_count(4)
+    region_plot_widget.add_button_clicked()
+    assert region_plot_widget.region_count() == 4
+    assert region_plot_widget.get_region_edit(3).right_edge() == pytest.approx(x[-1])
+
+
+def test_plot_widget_deferred_redraw_draws_copy_of_buffer():
+    w = PlotWidget(capacity=10)
+    w.plot(np.arange(5.0), np.arange(5.0))
+    # Appended data is windowed immediately but drawn on redraw()
+    w.plot(
+        np.arange(5.0, 10.0), np.arange(5.0, 10.0), mode=PlotMode.APPEND, redraw=False
+    )
+    assert w.stale
+    np.testing.assert_array_equal(w.x_arr, np.arange(10.0))
+    np.testing.assert_array_equal(w.curve.xData, np.arange(5.0))
+    w.redraw()
+    assert not w.stale
+    np.testing.assert_array_equal(w.curve.xData, np.arange(10.0))
+    # The drawn data is not changed by appends that move data in the buffer
+    for i in range(10, 30):
+        w.plot([i], [i], mode=PlotMode.APPEND, redraw=False)
+    np.testing.assert_array_equal(w.curve.xData, np.arange(10.0))
+    np.testing.assert_array_equal(w.curve.yData, np.arange(10.0))
+
+
+@pytest.fixture
+def shown_widget():
+    widget = QWidget()
+    widget.show()
+    yield widget
+    widget.close()
+
+
+def test_redraw_scheduler_coalesces_requests(shown_widget, qtbot):
+    frames = []
+    scheduler = RedrawScheduler(
+        shown_widget, lambda: frames.append(time.perf_counter()), refresh_rate_hz=20
+    )
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < 0.5:
+        scheduler.request()
+        qtbot.wait(1)
+    qtbot.waitUntil(lambda: not scheduler.pending)
+    # At most one frame per refresh period
+    assert len(frames) == pytest.approx(10, abs=2)
+    assert np.min(np.diff(frames)) >= 0.045
+    stats = scheduler.stats()
+    assert stats.frames == len(frames)
+    assert stats.dropped_frames == 0
+    assert stats.interval_s == pytest.approx(0.05)
+
+
+def test_redraw_scheduler_skips_hidden_widget(qtbot):
+    widget = QWidget()
+    frames = []
+    scheduler = RedrawScheduler(widget, lambda: frames.append(1), refresh_rate_hz=100)
+    scheduler.request()
+    qtbot.wait(50)
+    assert frames == []
+    assert scheduler.pending
+    assert scheduler.stats().skipped_frames == 1
+    widget.show()
+    scheduler.request()
+    qtbot.waitUntil(lambda: frames == [1])
+    assert not scheduler.pending
+    widget.close()
+
+
+def test_redraw_scheduler_throttles_slow_frames(shown_widget, qtbot):
+    scheduler = RedrawScheduler(
+        shown_widget, lambda: time.sleep(0.03), refresh_rate_hz=100
+    )
+    for _ in range(5):
+        scheduler.request()
+        qtbot.waitUntil(lambda: not scheduler.pending)
+    stats = scheduler.stats()
+    assert stats.frames == 5
+    # Each frame takes three refresh periods
+    assert stats.dropped_frames >= 10
+    assert stats.mean_frame_time_s >= 0.03
+    # Drawing takes at most half of the interval
+    assert stats.interval_s >= 0.06
+    # Fast frames restore the frame budget
+    scheduler.render = lambda: None
+    for _ in range(30):
+        scheduler.request()
+        qtbot.waitUntil(lambda: not scheduler.pending)
+    assert scheduler.stats().interval_s == pytest.approx(0.01)
+
+
+def test_region_edit_widget_shows_and_stores_region_statistics(region_plot_widget):
+    x_arr = np.arange(100.0)
+    y_arr = np.arange(100.0) % 10
+    region_plot_widget.plot(x_arr, y_arr)
+    edit_widget = region_plot_widget.add_region([0, 20])
+    # No statistics without a series index
+    assert edit_widget.stats() is None
+    assert edit_widget.stats_label.text() == ''
+    event = edit_widget.get_annotated_event()
+    assert event.peak_torque_Nm is None and event.duration_s is None
+    region_plot_widget.set_series_index(SeriesIndex(x_arr, y_arr))
+    assert edit_widget.stats() == SeriesIndex(x_arr, y_arr).stats(0, 20)
+    assert 'Peak: 9.00 Nm' in edit_widget.stats_label.text()
+    # Statistics are updated when the region is dragged
+    edit_widget.set_region([25, 27])
+    stats = edit_widget.stats()
+    assert stats.peak == 7
+    assert stats.mean == pytest.approx(6)
+    assert stats.integral == pytest.approx(12)
+    assert stats.duration == pytest.approx(2)
+    assert 'Torque-time: 12.00 Nms' in edit_widget.stats_label.text()
+    event = edit_widget.get_annotated_event()
+    assert (
+        event.peak_torque_Nm,
+        event.mean_torque_Nm,
+        event.torque_integral_Nms,
+        event.duration_s,
+    ) == pytest.approx(stats)
+    # New regions use the series index
+    assert region_plot_widget.add_region([50, 60]).stats().peak == 9
+
+
+def test_region_statistics_without_samples_are_stored_as_null(region_plot_widget):
+    x_arr = np.array([0.0, 10.0])
+    region_plot_widget.plot(x_arr, np.ones(2))
+    region_plot_widget.set_series_index(SeriesIndex(x_arr, np.ones(2)))
+    event = region_plot_widget.add_region([2, 4]).get_annotated_event()
+    assert event.peak_torque_Nm is None
+    assert event.mean_torque_Nm is None
+    assert event.torque_integral_Nms == pytest.approx(2)
+    assert event.duration_s == pytest.approx(2)
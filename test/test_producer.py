@@ -1,6 +1,18 @@
+import time
+import queue
+import pytest
 import numpy as np
 import datetime
-from cranio.producer import datetime_to_seconds, create_dummy_sensor, Sensor
+from cranio.utils import datetime_to_ns, monotonic_ns
+from cranio.producer import (
+    datetime_to_seconds,
+    create_dummy_sensor,
+    Sensor,
+    Producer,
+    AcquisitionScheduler,
+    SensorError,
+    ChannelInfo,
+)
 
 
 def test_datetime_to_seconds():
@@ -14,5 +26,199 @@ def test_datetime_to_seconds():
         datetime_to_seconds(arr, t0)
 
 
+def test_datetime_to_seconds_converts_nanosecond_arrays():
+    t0 = datetime.datetime(2020, 1, 1)
+    t0_ns = datetime_to_ns(t0)
+    time_ns = t0_ns + np.array([0, 1500000000, 3000000000], dtype=np.int64)
+    np.testing.assert_allclose(datetime_to_seconds(time_ns, t0), [0, 1.5, 3])
+    np.testing.assert_allclose(datetime_to_seconds(time_ns, t0_ns), [0, 1.5, 3])
+    assert datetime_to_seconds(t0 + datetime.timedelta(seconds=2), t0) == 2
+    assert datetime_to_seconds(
+        [np.datetime64('2020-01-01T00:00:00.25')], t0
+    ) == pytest.approx([0.25])
+
+
+def test_sensor_timestamps_are_monotonic():
+    sensor = Sensor()
+    sensor.register_channel(ChannelInfo('torque', 'Nm'))
+    t_start = monotonic_ns()
+    timestamps = [sensor.read()[0] for _ in range(1000)]
+    assert all(isinstance(t, int) for t in timestamps)
+    assert np.all(np.diff(timestamps) >= 0)
+    assert 0 <= timestamps[0] - t_start < 1e9
+
+
 def test_create_dummy_sensor_returns_sensor():
     assert type(create_dummy_sensor()) == Sensor
+
+
+def test_acquisition_scheduler_reads_at_target_rate_without_drift():
+    scheduler = AcquisitionScheduler(rate_hz=200)
+    n = 100
+    t_start = time.perf_counter()
+    for _ in range(n):
+        scheduler.wait()
+        scheduler.tick()
+    elapsed = time.perf_counter() - t_start
+    # The first read is immediate
+    assert elapsed == pytest.approx((n - 1) / 200, rel=0.1)
+    stats = scheduler.stats()
+    assert stats.reads == n
+    assert stats.max_jitter_s >= 0
+
+
+def test_acquisition_scheduler_counts_overruns_and_resynchronizes():
+    scheduler = AcquisitionScheduler(rate_hz=100)
+    scheduler.tick(now=0)
+    # Second read is 25 ms late (more than one period)
+    scheduler.tick(now=0.035)
+    assert scheduler.stats().overruns == 1
+    assert scheduler.deadline == pytest.approx(0.045)
+    # Third read is on time
+    scheduler.tick(now=0.045)
+    stats = scheduler.stats()
+    assert stats.overruns == 1
+    assert stats.max_jitter_s == pytest.approx(0.025)
+    assert stats.mean_jitter_s == pytest.approx(0.0125)
+
+
+def test_acquisition_scheduler_without_rate_does_not_wait():
+    scheduler = AcquisitionScheduler(rate_hz=None)
+    t_start = time.perf_counter()
+    for _ in range(1000):
+        scheduler.wait()
+        scheduler.tick()
+    assert time.perf_counter() - t_start < 0.1
+
+
+def test_producer_reads_each_sensor_at_its_rate():
+    fast, slow = create_dummy_sensor(), create_dummy_sensor()
+    fast.rate_hz, slow.rate_hz = 200, 50
+    producer = Producer()
+    producer.register_sensor(fast)
+    producer.register_sensor(slow)
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < 0.5:
+        producer.read()
+    fast_stats, slow_stats = producer.scheduler_stats()
+    assert fast_stats.reads == pytest.approx(100, abs=10)
+    assert slow_stats.reads == pytest.approx(25, abs=5)
+
+
+class SlowSensor(Sensor):
+    """ Dummy sensor with a 10 ms read latency (e.g., serial round trip). """
+
+    rate_hz = None
+
+    def read(self):
+        time.sleep(0.01)
+        return super().read()
+
+
+class LateSensor(Sensor):
+    """ Dummy sensor that returns samples 10 ms after stamping them (e.g., stamp on arrival, then decode). """
+
+    rate_hz = None
+
+    def read(self):
+        sample = super().read()
+        time.sleep(0.01)
+        return sample
+
+
+class FailingSensor(Sensor):
+    def read(self):
+        raise OSError('Device disconnected')
+
+
+def read_for(producer: Producer, seconds: float) -> list:
+    samples = []
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < seconds:
+        samples.extend(producer.read())
+    producer.stop_readers()
+    return samples
+
+
+def add_slow_sensors(producer: Producer, n: int) -> Producer:
+    for i in range(n):
+        sensor = SlowSensor()
+        sensor.register_channel(ChannelInfo(f'torque {i}', 'Nm'))
+        producer.register_sensor(sensor)
+    return producer
+
+
+def test_concurrent_producer_throughput_scales_with_number_of_sensors():
+    sequential = len(read_for(add_slow_sensors(Producer(), 3), 0.5))
+    concurrent = len(read_for(add_slow_sensors(Producer(concurrent=True), 3), 0.5))
+    assert concurrent > 2 * sequential
+
+
+def test_concurrent_producer_merges_samples_in_time_order_and_exposes_stats():
+    producer = add_slow_sensors(Producer(concurrent=True), 2)
+    merged = []
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < 0.3:
+        merged.append(producer.read())
+    stats = producer.reader_stats()
+    producer.stop_readers()
+    assert len(stats) == 2
+    for s in stats:
+        assert s.reads > 0
+        assert s.rate_hz > 0
+        assert s.mean_latency_s >= 0.01
+    assert sum(len(samples) for samples in merged) > 0
+    for samples in merged:
+        times = [index for index, _ in samples]
+        assert times == sorted(times)
+
+
+def test_concurrent_producer_merges_samples_in_time_order_across_reads():
+    producer = Producer(concurrent=True)
+    late_sensor = LateSensor()
+    late_sensor.register_channel(ChannelInfo('torque 0', 'Nm'))
+    producer.register_sensor(late_sensor)
+    fast_sensor = Sensor()
+    fast_sensor.rate_hz = 1000
+    fast_sensor.register_channel(ChannelInfo('torque 1', 'Nm'))
+    producer.register_sensor(fast_sensor)
+    times = []
+    t_start = time.perf_counter()
+    while time.perf_counter() - t_start < 0.3:
+        times += [index for index, _ in producer.read()]
+    producer.stop_readers()
+    assert len(times) > 0
+    assert times == sorted(times)
+
+
+@pytest.mark.parametrize('stop_readers', [False, True])
+def test_concurrent_producer_pushes_samples_exceeding_batch_size(stop_readers):
+    producer = Producer(concurrent=True)
+    sensor = Sensor()
+    sensor.rate_hz = None
+    sensor.register_channel(ChannelInfo('torque', 'Nm'))
+    producer.register_sensor(sensor)
+    producer.start_readers()
+    # Stall so that the readers accumulate more samples than fit in a batch
+    time.sleep(0.1)
+    q = queue.Queue()
+    if stop_readers:
+        producer.stop_readers(q)
+    else:
+        assert len(producer.read(q)) > producer.batch_size
+        producer.stop_readers()
+    producer.flush(q)
+    batches = [q.get() for _ in range(q.qsize())]
+    assert all(len(batch) <= producer.batch_size for batch in batches)
+    assert sum(len(batch) for batch in batches) > producer.batch_size
+
+
+def test_concurrent_producer_raises_sensor_error_if_read_fails():
+    producer = Producer(concurrent=True)
+    sensor = FailingSensor()
+    sensor.register_channel(ChannelInfo('torque', 'Nm'))
+    producer.register_sensor(sensor)
+    with pytest.raises(SensorError):
+        for _ in range(100):
+            producer.read()
+    producer.stop_readers()
@@ -1,8 +1,24 @@
+import os
+import datetime
 import pytest
 import random
 import time
+import multiprocessing as mp
+import numpy as np
 import pandas as pd
-from cranio.producer import ChannelInfo, Sensor, Producer, get_all_from_queue
+from cranio.producer import (
+    ChannelInfo,
+    Sensor,
+    Producer,
+    get_all_from_queue,
+    sample_dtype,
+    ProducerProcess,
+    SharedMemoryTransport,
+    TransportType,
+    TIME_FIELD,
+)
+from cranio.model import Document
+from cranio.utils import utc_datetime, datetime_to_ns, generate_unique_id
 
 
 def random_value_generator():
@@ -49,9 +65,9 @@ def test_producer_process_start_and_join(producer_process):
     assert p.is_alive()
     p.pause()
     # Read values from queue
-    index_arr, value_arr = get_all_from_queue(p.queue)
+    batch = p.transport.get_all()
     # No sensors -> empty data
-    assert len(index_arr) == 0
+    assert len(batch) == 0
 
 
 def test_producer_process_with_sensors(producer_process):
@@ -72,8 +88,241 @@ def test_producer_process_with_sensors(producer_process):
     time.sleep(2)
     p.pause()
     # Read values from queue
-    index_arr, value_arr = get_all_from_queue(p.queue)
-    # Convert value_arr (list of dicts) to a DataFrame
-    df = pd.DataFrame(value_arr, index=index_arr)
+    batch = p.transport.get_all()
+    assert len(batch) > 0
+    # Samples are in chronological order
+    assert np.all(np.diff(batch[TIME_FIELD]) >= 0)
+    # Convert batch (structured array) to a DataFrame
+    df = pd.DataFrame(batch)
     for c in channels:
         assert str(c) in df
+
+
+def test_producer_pushes_samples_to_queue_in_batches():
+    p = Producer()
+    p.batch_size = 10
+    p.batch_interval = 60
+    s = Sensor()
+    s.value_generator = random_value_generator
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.register_sensor(s)
+    queue = mp.Queue()
+    for _ in range(25):
+        p.read(queue=queue)
+    # Wait for the queue feeder thread
+    time.sleep(0.1)
+    assert len(get_all_from_queue(queue)) == 20
+    p.flush(queue)
+    time.sleep(0.1)
+    batch = get_all_from_queue(queue)
+    assert len(batch) == 5
+    assert batch.dtype.names == (TIME_FIELD, 'torque (Nm)')
+
+
+def test_shared_memory_transport_returns_samples_in_order_across_wraparound():
+    dtype = sample_dtype(['torque (Nm)'])
+    transport = SharedMemoryTransport(capacity=8)
+    transport.create(dtype)
+    try:
+        received = []
+        for i in range(0, 60, 5):
+            batch = np.zeros(5, dtype=dtype)
+            batch[TIME_FIELD] = np.arange(i, i + 5)
+            transport.put(batch)
+            received += transport.get_all()[TIME_FIELD].tolist()
+            # Free the read samples for the next put
+            transport.release()
+        assert received == list(range(60))
+    finally:
+        transport.close()
+
+
+def test_producer_process_with_shared_memory_transport(producer_process):
+    p = ProducerProcess(
+        'test_process',
+        document=producer_process.document,
+        transport=TransportType.SHARED_MEMORY,
+    )
+    s = Sensor()
+    s.value_generator = random_value_generator
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(s)
+    p.start()
+    time.sleep(1)
+    p.pause()
+    batch = p.get_all()
+    assert len(batch) > 0
+    assert np.all(np.diff(batch[TIME_FIELD]) >= 0)
+    assert not np.isnan(batch['torque (Nm)']).any()
+    # Samples are not copied from shared memory
+    assert np.shares_memory(batch, p.transport._records)
+    p.join()
+    assert not p.is_alive()
+
+
+def test_concurrent_producer_process_pushes_all_samples_before_pausing(
+    producer_process,
+):
+    p = ProducerProcess(
+        'test_process', document=producer_process.document, concurrent=True
+    )
+    for i in range(2):
+        s = Sensor()
+        s.value_generator = random_value_generator
+        s.register_channel(ChannelInfo(f'torque {i}', 'Nm'))
+        p.producer.register_sensor(s)
+    p.start()
+    time.sleep(1)
+    p.pause()
+    batch = p.get_all()
+    # Each row contains a sample of one sensor
+    counts = [np.count_nonzero(~np.isnan(batch[f'torque {i} (Nm)'])) for i in range(2)]
+    assert all(count > 50 for count in counts)
+    assert sum(counts) == len(batch)
+    p.join()
+    assert not p.is_alive()
+
+
+def process_cpu_time(pid: int) -> float:
+    """ Return user and system CPU time of a process in seconds (Linux only). """
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/stat'), reason='Requires procfs')
+def test_paused_producer_process_uses_no_cpu(producer_process):
+    p = producer_process
+    s = Sensor()
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(s)
+    p.start()
+    time.sleep(0.2)
+    p.pause()
+    cpu_start = process_cpu_time(p._process.pid)
+    time.sleep(1)
+    assert process_cpu_time(p._process.pid) - cpu_start < 0.05
+    p.join()
+
+
+def test_producer_process_wakes_up_on_resume(producer_process):
+    p = producer_process
+    s = Sensor()
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(s)
+    p.start()
+    time.sleep(0.2)
+    p.pause()
+    for _ in range(5):
+        p.get_all()
+        time.sleep(0.1)
+        resumed_at = datetime_to_ns(utc_datetime())
+        p.resume()
+        time.sleep(0.1)
+        p.pause()
+        # First sample is read promptly after resume
+        batch = p.get_all()
+        assert batch[TIME_FIELD][0] + p.utc_offset_ns - resumed_at < 20e6
+    p.join()
+    assert not p.is_alive()
+
+
+def test_producer_process_records_new_document_without_restarting(producer_process):
+    p = producer_process
+    s = Sensor()
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(s)
+    p.start()
+    time.sleep(0.2)
+    pid = p._process.pid
+    document = Document(document_id=generate_unique_id(), started_at=utc_datetime())
+    p.set_document(document)
+    assert p.document is document
+    p.start()
+    time.sleep(0.2)
+    p.pause()
+    assert p._process.pid == pid
+    batch = p.get_all()
+    assert len(batch) > 0
+    # Unread samples of the previous document are discarded
+    assert p.seconds_since_document_start(batch[TIME_FIELD])[0] >= 0
+    p.join()
+    assert not p.is_alive()
+
+
+def test_producer_process_anchors_recording_with_process_clock(
+    producer_process, monkeypatch
+):
+    p = producer_process
+    s = Sensor()
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(s)
+    p.start()
+    time.sleep(0.1)
+    # Emulate a monotonic clock that is not shared with the process (e.g., Windows with Python < 3.10)
+    monkeypatch.setattr('cranio.utils._perf_counter_ns', lambda: 2 ** 62)
+    document = Document(document_id=generate_unique_id(), started_at=utc_datetime())
+    p.set_document(document)
+    p.start()
+    time.sleep(0.2)
+    p.pause()
+    monkeypatch.undo()
+    times = p.get_all()[TIME_FIELD] + p.utc_offset_ns
+    assert len(times) > 0
+    assert datetime_to_ns(document.started_at) <= times[0]
+    assert times[-1] <= datetime_to_ns(utc_datetime())
+    p.join()
+
+
+def test_producer_process_sample_times_are_anchored_to_wall_clock_at_start(
+    producer_process, monkeypatch
+):
+    p = producer_process
+    s = Sensor()
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(s)
+    t_start = datetime_to_ns(utc_datetime())
+    p.start()
+    # Wall clock adjustments during the recording do not affect the sample times
+    monkeypatch.setattr(
+        'cranio.utils.utc_datetime', lambda: datetime.datetime(2000, 1, 1)
+    )
+    time.sleep(0.2)
+    p.pause()
+    monkeypatch.undo()
+    t_stop = datetime_to_ns(utc_datetime())
+    times = p.get_all()[TIME_FIELD] + p.utc_offset_ns
+    assert len(times) > 0
+    assert np.all(np.diff(times) >= 0)
+    assert t_start <= times[0] and times[-1] <= t_stop
+    p.join()
+
+
+@pytest.mark.parametrize(
+    'transport', [TransportType.QUEUE, TransportType.SHARED_MEMORY]
+)
+def test_producer_process_pause_receives_all_samples(transport):
+    p = ProducerProcess(
+        'test_process',
+        document=Document(document_id=generate_unique_id(), started_at=utc_datetime()),
+        transport=transport,
+    )
+    s = Sensor()
+    s.register_channel(ChannelInfo('torque', 'Nm'))
+    p.producer.register_sensor(s)
+    p.start()
+    try:
+        for _ in range(20):
+            p.resume()
+            time.sleep(random.uniform(0.01, 0.05))
+            p.pause()
+            assert len(p.get_all()) > 0
+            # No samples arrive after pause()
+            time.sleep(0.02)
+            assert len(p.get_all()) == 0
+        # Pausing a paused process does not wait for the timeout
+        t_start = time.monotonic()
+        p.pause()
+        assert time.monotonic() - t_start < 0.5
+    finally:
+        p.join()
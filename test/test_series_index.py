@@ -0,0 +1,68 @@
+import pytest
+import numpy as np
+from cranio.series_index import SeriesIndex, sparse_table, sparse_table_max
+
+
+def trapezoid(x: np.ndarray, y: np.ndarray, x_start: float, x_stop: float) -> float:
+    """ Integral of the linearly interpolated series over [x_start, x_stop] within the sampled range. """
+    x_start, x_stop = np.clip([x_start, x_stop], x[0], x[-1])
+    xs = np.concatenate(([x_start], x[(x > x_start) & (x < x_stop)], [x_stop]))
+    ys = np.interp(xs, x, y)
+    return np.sum(np.diff(xs) * (ys[1:] + ys[:-1]) / 2)
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 63, 64, 65, 1000, 12345])
+def test_series_index_stats_match_samples(n):
+    x = np.sort(np.random.rand(n)) * 100
+    y = np.random.randn(n)
+    index = SeriesIndex(x, y, block_size=16)
+    for _ in range(100):
+        x_start, x_stop = np.random.rand(2) * 110 - 5
+        stats = index.stats(x_start, x_stop)
+        x_start, x_stop = min(x_start, x_stop), max(x_start, x_stop)
+        selected = (x >= x_start) & (x <= x_stop)
+        if selected.any():
+            assert stats.peak == y[selected].max()
+            assert stats.mean == pytest.approx(y[selected].mean())
+        else:
+            assert np.isnan(stats.peak) and np.isnan(stats.mean)
+        if n >= 2:
+            assert stats.integral == pytest.approx(
+                trapezoid(x, y, x_start, x_stop), abs=1e-9
+            )
+        else:
+            assert stats.integral == 0
+        assert stats.duration == pytest.approx(x_stop - x_start)
+
+
+def test_series_index_ignores_nan_samples():
+    x = np.arange(6.0)
+    y = np.array([1, np.nan, 3, np.nan, 2, 1])
+    stats = SeriesIndex(x, y).stats(0, 5)
+    assert stats.peak == 3
+    assert stats.mean == pytest.approx(7 / 4)
+    # Linear interpolation over the NaN samples
+    assert stats.integral == pytest.approx(2 * 2 + 2.5 * 2 + 1.5)
+    assert len(SeriesIndex(x, y)) == 4
+
+
+def test_series_index_integral_interpolates_at_region_edges():
+    index = SeriesIndex([0, 1, 2], [0, 2, 0])
+    assert index.stats(0.5, 1.5).integral == pytest.approx(1.5)
+    assert index.stats(-1, 3).integral == pytest.approx(2)
+
+
+@pytest.mark.parametrize('n', [1, 2, 7, 16, 100])
+def test_sparse_table_max(n):
+    values = np.random.randn(n)
+    table = sparse_table(values)
+    for start in range(n):
+        for stop in range(start + 1, n + 1):
+            assert sparse_table_max(table, start, stop) == values[start:stop].max()
+
+
+def test_series_index_invalid_arguments_raise_value_error():
+    with pytest.raises(ValueError):
+        SeriesIndex(np.arange(3), np.arange(4))
+    with pytest.raises(ValueError):
+        SeriesIndex(np.arange(3), np.arange(3), block_size=0)
@@ -58,6 +58,26 @@ def test_stop_measurement_pauses_producer_and_inserts_measurements_to_database(m
             .all()
         )
         assert len(measurements) > 0
+    # Region statistics are indexed from the recording in the background
+    assert len(machine.series_index_future.result(timeout=5)) == len(measurements)
+
+
+def test_stop_measurement_alerts_user_if_measurements_failed_to_be_inserted(
+    machine, monkeypatch
+):
+    def fail(*args, **kwargs):
+        raise RuntimeError('Database is locked')
+
+    monkeypatch.setattr(machine.database, 'insert_measurements', fail)
+    pytest.helpers.transition_machine_to_s1(machine)
+    machine.main_window.measurement_widget.start_button.clicked.emit()
+    time.sleep(1)
+    app.processEvents()
+    assert not machine.s2.error_dialog.isVisible()
+    machine.main_window.measurement_widget.stop_button.clicked.emit()
+    app.processEvents()
+    assert machine.s2.error_dialog.isVisible()
+    machine.s2.error_dialog.close()
 
 
 def test_transition_from_initial_state_to_note_state_and_back_to_initial_state(machine):
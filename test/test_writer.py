@@ -0,0 +1,123 @@
+import sys
+import time
+import subprocess
+import pytest
+import numpy as np
+from cranio.model import Database, Measurement, session_scope
+from cranio.writer import MeasurementWriter
+
+
+@pytest.fixture
+def file_database_fixture(tmp_path):
+    database = Database(drivername='sqlite', database=str(tmp_path / 'cranio.db'))
+    database.create_engine()
+    database.init()
+    yield database
+    database.engine.dispose()
+
+
+def measurement_count(database: Database, document_id: str) -> int:
+    with session_scope(database) as s:
+        return (
+            s.query(Measurement).filter(Measurement.document_id == document_id).count()
+        )
+
+
+@pytest.mark.parametrize('database', ['database_fixture', 'file_database_fixture'])
+def test_measurement_writer_flush_inserts_all_submitted_measurements(database, request):
+    database = request.getfixturevalue(database)
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database)
+    writer = MeasurementWriter(database)
+    writer.max_delay = 60
+    n = 0
+    for i in range(10):
+        writer.submit(
+            document.document_id,
+            np.linspace(i, i + 1, 10, endpoint=False),
+            np.random.rand(10),
+        )
+        n += 10
+    assert writer.flush(timeout=5)
+    assert measurement_count(database, document.document_id) == n
+    writer.stop()
+
+
+def test_measurement_writer_inserts_in_background_when_max_delay_expires(
+    file_database_fixture,
+):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(file_database_fixture)
+    writer = MeasurementWriter(file_database_fixture)
+    assert writer.threaded
+    writer.max_delay = 0.1
+    writer.submit(document.document_id, [0, 1, 2], [0, 1, 2])
+    time.sleep(1)
+    assert measurement_count(file_database_fixture, document.document_id) == 3
+    writer.stop()
+
+
+def test_measurement_writer_stop_inserts_pending_measurements(file_database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(file_database_fixture)
+    writer = MeasurementWriter(file_database_fixture)
+    writer.max_delay = 60
+    writer.submit(document.document_id, [0, 1, 2], [0, 1, 2])
+    writer.stop(timeout=5)
+    assert measurement_count(file_database_fixture, document.document_id) == 3
+
+
+@pytest.mark.parametrize('database', ['database_fixture', 'file_database_fixture'])
+def test_measurement_writer_call_is_called_after_submitted_measurements_are_inserted(
+    database, request
+):
+    database = request.getfixturevalue(database)
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database)
+    writer = MeasurementWriter(database)
+    writer.max_delay = 60
+    writer.submit(document.document_id, [0, 1, 2], [0, 1, 2])
+    future = writer.call(measurement_count, database, document.document_id)
+    assert future.result(timeout=5) == 3
+    writer.stop()
+
+
+def test_measurement_writer_call_sets_exception_if_function_fails(
+    file_database_fixture,
+):
+    def fail():
+        raise ValueError('Failed')
+
+    writer = MeasurementWriter(file_database_fixture)
+    future = writer.call(fail)
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+    writer.stop()
+
+
+@pytest.mark.parametrize('database', ['database_fixture', 'file_database_fixture'])
+def test_measurement_writer_flush_returns_false_if_insert_failed(database, request):
+    database = request.getfixturevalue(database)
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(database)
+    writer = MeasurementWriter(database)
+    writer.max_delay = 60
+    # Foreign key constraint fails
+    writer.submit('invalid document_id', [0, 1, 2], [0, 1, 2])
+    assert not writer.flush(timeout=5)
+    # Failures are reported once
+    writer.submit(document.document_id, [0, 1, 2], [0, 1, 2])
+    assert writer.flush(timeout=5)
+    assert measurement_count(database, document.document_id) == 3
+    writer.stop()
+
+
+def test_measurement_writer_inserts_pending_measurements_at_exit(file_database_fixture):
+    document, *_ = pytest.helpers.add_document_and_foreign_keys(file_database_fixture)
+    # Exit without stopping the writer
+    script = (
+        'from cranio.model import Database\n'
+        'from cranio.writer import MeasurementWriter\n'
+        f'database = Database("sqlite", database={file_database_fixture.url.database!r})\n'
+        'database.create_engine()\n'
+        'writer = MeasurementWriter(database)\n'
+        'writer.max_delay = 60\n'
+        f'writer.submit({document.document_id!r}, [0, 1, 2], [0, 1, 2])\n'
+    )
+    subprocess.run([sys.executable, '-c', script], check=True, timeout=30)
+    assert measurement_count(file_database_fixture, document.document_id) == 3